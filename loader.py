@@ -1,14 +1,13 @@
 import importlib
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process
 from shutil import copyfile
-from time import sleep
-
-import firebase_admin
-from firebase_admin import credentials, db, storage
+from time import sleep, time
 
 from polaris.bot import Bot
+from polaris.database import get_storage
 from polaris.types import AutosaveDict
 from polaris.utils import (catch_exception, load_plugin_list, set_logger,
                            wait_until_received)
@@ -17,14 +16,23 @@ from polaris.utils import (catch_exception, load_plugin_list, set_logger,
 # Loads the bots from the /bots/ #
 def get_bots():
     botlist = []
+    started = time()
+
+    # Bots are initialized at the same time, in the order of the configuration. #
+    with ThreadPoolExecutor(max_workers=max(len(bots), 1)) as executor:
+        futures = [(bot, executor.submit(Bot, bot)) for bot in bots]
 
-    for bot in bots:
+    for name, future in futures:
         try:
-            botlist.append(Bot(bot))
+            bot = future.result()
+            botlist.append(bot)
+            logging.info('  [OK] "%s" initialized in %.2fs (%s)' % (name, sum(bot.timings.values()), ', '.join(
+                '%s %.2fs' % (phase, seconds) for phase, seconds in bot.timings.items())))
         except Exception as e:
             catch_exception(e)
-            logging.error('  [Failed] "%s" failed to initialize' % bot)
+            logging.error('  [Failed] "%s" failed to initialize' % name)
 
+    logging.info('  Initialized: %s/%s bots in %.2fs' % (len(botlist), len(bots), time() - started))
     return botlist
 
 
@@ -176,11 +184,7 @@ def setup():
 # setup()
 copyfile('/logs/bot.log', '/logs/bot.old.log')
 set_logger()
-cred = credentials.Certificate('serviceAccountKey.json')
-default_app = firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://polaris-bot.firebaseio.com/',
-    'storageBucket': 'polaris-bot.appspot.com'
-})
+get_storage()
 
 bots = wait_until_received('bots')
 
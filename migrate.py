@@ -0,0 +1,33 @@
+import argparse
+import logging
+
+from polaris.database import load_storage
+
+# Copies the data between storage backends, for example: #
+# python migrate.py firebase sqlite --target-path data/polaris.sqlite #
+parser = argparse.ArgumentParser(description='Copies the data of Polaris between storage backends.')
+parser.add_argument('source', choices=['firebase', 'sqlite', 'local'])
+parser.add_argument('target', choices=['firebase', 'sqlite', 'local'])
+parser.add_argument('--source-path', help='credentials of Firebase or file of the local backends')
+parser.add_argument('--target-path', help='credentials of Firebase or file of the local backends')
+parser.add_argument('--only', nargs='+', metavar='PATH', help='paths to copy instead of the whole database')
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+source = load_storage(args.source, args.source_path)
+target = load_storage(args.target, args.target_path)
+
+if args.only:
+    paths = args.only
+else:
+    paths = list(source.get('') or {})
+
+for path in paths:
+    value = source.get(path)
+    if value is None:
+        logging.warning('  [Empty] {}'.format(path))
+        continue
+    target.set(path, value)
+    logging.info('  [OK] {}'.format(path))
+
+logging.info('Copied {} paths from {} to {}'.format(len(paths), args.source, args.target))
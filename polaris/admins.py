@@ -0,0 +1,81 @@
+import logging
+from threading import Event, Lock, Thread
+from time import time
+
+
+# Administrators of every chat, kept for a while instead of being requested for every check. #
+# They are dropped when the bindings see someone join, leave, be promoted or be kicked. #
+class AdminCache(object):
+    def __init__(self, bot, ttl=300):
+        self.bot = bot
+        self.ttl = ttl
+        self.chats = {}
+        self.loading = {}
+        self.lock = Lock()
+
+    def configure(self, ttl):
+        self.ttl = ttl
+
+    def is_fresh(self, conversation_id):
+        return conversation_id in self.chats and self.chats[conversation_id][0] > time()
+
+    def get(self, conversation_id):
+        return self.load(conversation_id)[1]
+
+    def get_ids(self, conversation_id):
+        return self.load(conversation_id)[2]
+
+    # The bindings get the id as it was given, the cache uses it as a string. #
+    def load(self, id):
+        conversation_id = str(id)
+        with self.lock:
+            if self.is_fresh(conversation_id):
+                return self.chats[conversation_id]
+
+            # Only one request per chat, the others wait for its result. #
+            if conversation_id in self.loading:
+                event = self.loading[conversation_id]
+                owner = False
+            else:
+                event = self.loading[conversation_id] = Event()
+                owner = True
+
+        if not owner:
+            event.wait()
+            return self.load(id)
+
+        try:
+            admins = self.bot.bindings.get_chat_administrators(id) or []
+            entry = (time() + self.ttl, admins, set(str(admin.id) for admin in admins))
+            with self.lock:
+                # A failed request gives no administrators, it isn't kept. #
+                if admins and self.loading.get(conversation_id) is event:
+                    self.chats[conversation_id] = entry
+        finally:
+            with self.lock:
+                if self.loading.get(conversation_id) is event:
+                    del self.loading[conversation_id]
+            event.set()
+        return entry
+
+    def prefetch(self, conversation_id):
+        with self.lock:
+            if self.is_fresh(str(conversation_id)) or str(conversation_id) in self.loading:
+                return
+        Thread(target=self.worker, args=(conversation_id,), daemon=True).start()
+
+    def worker(self, conversation_id):
+        try:
+            self.load(conversation_id)
+        except Exception as e:
+            logging.warning('Unable to prefetch the administrators of {}: {}'.format(conversation_id, e))
+
+    def invalidate(self, conversation_id=None):
+        with self.lock:
+            if conversation_id is None:
+                self.chats.clear()
+                self.loading.clear()
+            else:
+                self.chats.pop(str(conversation_id), None)
+                # A request that started before the change won't be kept. #
+                self.loading.pop(str(conversation_id), None)
@@ -147,19 +147,15 @@ class bindings(object):
                 catch_exception(e, self.bot)
 
     async def cron_task(self):
-        await self.wait_until_ready()
+        await self.client.wait_until_ready()
 
-        while not self.is_closed() and self.started:
-            for plugin in self.plugins:
-                try:
-                    if hasattr(plugin, 'cron'):
-                        plugin.cron()
+        try:
+            await self.discord_loop.run_in_executor(None, self.bot.scheduler.run)
 
-                except KeyboardInterrupt:
-                    pass
-                except Exception as e:
-                    catch_exception(e, self)
-            await asyncio.sleep(5)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            catch_exception(e, self.bot)
 
         logging.info('is closed')
 
@@ -257,6 +253,7 @@ class bindings(object):
         return False
 
     def kick_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         if int(conversation_id) > 0:
             return False
         channel = self.client.get_channel(positive(conversation_id))
@@ -1,6 +1,7 @@
 import json
 import logging
 
+from polaris.media import media
 from polaris.types import Conversation, Message, User
 from polaris.utils import (catch_exception, download, has_tag, replace_html,
                            send_request)
@@ -18,9 +19,52 @@ class bindings(object):
         try:
             res = send_request(url, params, headers, files,
                                data, post=True, bot=self.bot)
-            self.request_processing(params, res)
         except:
             return None
+        finally:
+            # Releases the files of the media cache. #
+            for file in (files or {}).values():
+                file.close()
+
+        try:
+            self.request_processing(params, res)
+        except Exception as e:
+            logging.debug('Unable to process the request {}: {}'.format(api_method, e))
+        return res
+
+    # Local files are uploaded once, then they are sent by the id Telegram gave them. #
+    def send_file(self, api_method, name, content, params):
+        if not content.startswith('/'):
+            params[name] = content
+            return self.api_request(api_method, params)
+
+        key = media.get_upload_key(self.bot, content)
+        remote_id = media.get_remote_id(key)
+        if remote_id:
+            result = self.api_request(api_method, dict(params, **{name: remote_id}))
+            # Only an id that isn't valid anymore is uploaded again, other errors would fail the upload too. #
+            if not result or result.ok or not media.is_invalid_remote_id(result.get('description')):
+                return result
+            media.set_remote_id(key, None)
+
+        result = self.api_request(api_method, params, files={name: media.open(content)})
+        if result and result.ok:
+            media.set_remote_id(key, self.get_file_id(result.result, name))
+        return result
+
+    @staticmethod
+    def get_file_id(message, name):
+        file = message.get(name)
+        # Photos are returned in every size, the biggest is the last one. #
+        if isinstance(file, list):
+            file = file[-1] if file else None
+        if not file:
+            # Some files are sent as a different type, like a gif sent as a document. #
+            for other in ['animation', 'document', 'video', 'audio', 'voice', 'sticker']:
+                if other in message:
+                    file = message[other]
+                    break
+        return file.get('file_id') if file else None
 
     def server_request(self, api_method, params=None):
         return None
@@ -356,6 +400,17 @@ class bindings(object):
 
         return Message(id, conversation, sender, content, type, date, reply, extra)
 
+    # Promotions, demotions and kicks, so the process that handles the chat drops its administrators. #
+    def convert_member_update(self, update):
+        conversation = Conversation(update.chat.id, update.chat.title if 'title' in update.chat else None)
+        sender = User(update['from'].id, update['from'].first_name)
+        member = update.new_chat_member
+        extra = {
+            'user': User(member.user.id, member.user.first_name),
+            'status': member.status
+        }
+        return Message(None, conversation, sender, 'chat_member_updated', 'chat_member', update.date, None, extra)
+
     def receiver_worker(self):
         logging.debug('Starting receiver worker...')
 
@@ -367,6 +422,9 @@ class bindings(object):
                 params['limit'] = limit
             if timeout:
                 params['timeout'] = timeout
+            # Member updates aren't sent unless they are requested. #
+            params['allowed_updates'] = json.dumps(['message', 'edited_message', 'channel_post', 'edited_channel_post',
+                                                    'inline_query', 'my_chat_member', 'chat_member'])
             return self.api_request('getUpdates', params)
 
         try:
@@ -402,6 +460,14 @@ class bindings(object):
                                     u.edited_channel_post)
                                 self.bot.inbox.put(message)
 
+                            elif 'chat_member' in u:
+                                message = self.convert_member_update(u.chat_member)
+                                self.bot.inbox.put(message)
+
+                            elif 'my_chat_member' in u:
+                                message = self.convert_member_update(u.my_chat_member)
+                                self.bot.inbox.put(message)
+
         except KeyboardInterrupt:
             pass
 
@@ -449,14 +515,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                photo = open(message.content, 'rb')
-                files = {'photo': photo}
-            else:
-                params['photo'] = message.content
-
-            self.api_request('sendPhoto', params, files=files)
+            self.send_file('sendPhoto', 'photo', message.content, params)
 
         elif message.type == 'audio':
             self.api_request('sendChatAction', params={
@@ -471,14 +530,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                audio = open(message.content, 'rb')
-                files = {'audio': audio}
-            else:
-                params['audio'] = message.content
-
-            self.api_request('sendAudio', params, files=files)
+            self.send_file('sendAudio', 'audio', message.content, params)
 
         elif message.type == 'document':
             self.api_request('sendChatAction', params={
@@ -493,14 +545,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                document = open(message.content, 'rb')
-                files = {'document': document}
-            else:
-                params['document'] = message.content
-
-            self.api_request('sendDocument', params, files=files)
+            self.send_file('sendDocument', 'document', message.content, params)
 
         elif message.type == 'sticker':
             params = {
@@ -513,14 +558,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                sticker = open(message.content, 'rb')
-                files = {'sticker': sticker}
-            else:
-                params['sticker'] = message.content
-
-            self.api_request('sendSticker', params, files=files)
+            self.send_file('sendSticker', 'sticker', message.content, params)
 
         elif message.type == 'video':
             self.api_request('sendChatAction', params={
@@ -535,14 +573,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                video = open(message.content, 'rb')
-                files = {'video': video}
-            else:
-                params['video'] = message.content
-
-            self.api_request('sendVideo', params, files=files)
+            self.send_file('sendVideo', 'video', message.content, params)
 
         elif message.type == 'voice':
             self.api_request('sendChatAction', params={
@@ -557,14 +588,7 @@ class bindings(object):
             if message.reply:
                 params['reply_to_message_id'] = message.reply
 
-            files = None
-            if message.content.startswith('/'):
-                voice = open(message.content, 'rb')
-                files = {'voice': voice}
-            else:
-                params['voice'] = message.content
-
-            self.api_request('sendVoice', params, files=files)
+            self.send_file('sendVoice', 'voice', message.content, params)
 
         elif message.type == 'location':
             self.api_request('sendChatAction', params={
@@ -670,7 +694,7 @@ class bindings(object):
 
             if message.extra and 'photo' in message.extra:
                 if message.extra['photo'].startswith('/'):
-                    photo = open(message.extra['photo'], 'rb')
+                    photo = media.open(message.extra['photo'])
                     files = {'photo': photo}
                 else:
                     params['photo'] = message.extra['photo']
@@ -740,11 +764,16 @@ class bindings(object):
         params = {
             "file_id": file_id
         }
+        # Files already downloaded are in the media cache. #
+        path = media.get('telegram:' + file_id) if not link else None
+        if path:
+            return path
+
         result = self.api_request('getFile', params)
         if link:
             return 'https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path)
         else:
-            return download('https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path))
+            return download('https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path), key='telegram:' + file_id)
 
     def check_invite_link(self, invite_link):
         return False
@@ -756,6 +785,7 @@ class bindings(object):
         return False
 
     def promote_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         params = {
             "chat_id": conversation_id,
             "user_id": user_id
@@ -769,6 +799,7 @@ class bindings(object):
         return True
 
     def kick_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         params = {
             "chat_id": conversation_id,
             "user_id": user_id
@@ -782,6 +813,7 @@ class bindings(object):
         return True
 
     def unban_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         params = {
             "chat_id": conversation_id,
             "user_id": user_id
@@ -824,7 +856,7 @@ class bindings(object):
         params = {
             "chat_id": conversation_id,
         }
-        photo = open(photo, 'rb')
+        photo = media.open(photo)
         files = {'photo': photo}
         result = self.api_request('setChatPhoto', params, files=files)
         if result.ok == False:
@@ -3,14 +3,30 @@ import json
 import logging
 import os
 import subprocess
+from threading import Lock
 from time import time
 
+from polaris.media import media
 from polaris.types import Conversation, Message, User
 from polaris.utils import (catch_exception, delete_data, download,
                            fix_telegram_link, has_tag, is_int, send_request,
                            set_data, split_large_message)
 from telegram.client import Telegram
 
+# Bots are initialized at the same time, but only one login can ask for its code. #
+login_lock = Lock()
+
+# Field of the input message content with the file of every type of message. #
+FILE_FIELDS = {
+    'photo': 'photo',
+    'animation': 'animation',
+    'audio': 'audio',
+    'document': 'document',
+    'sticker': 'sticker',
+    'video': 'video',
+    'voice': 'voice_note'
+}
+
 
 class bindings(object):
     def __init__(self, bot):
@@ -18,6 +34,8 @@ class bindings(object):
         self.no_threads = True
         self.phone = None
         self.bot_token = None
+        # Keys of the files that are being uploaded, by the temporary id of their message. #
+        self.uploads = {}
 
         if self.bot.config['bindings_token'].startswith('+'):
             self.phone=self.bot.config['bindings_token']
@@ -36,7 +54,11 @@ class bindings(object):
             application_version='1.0',
             tdlib_verbosity=1,
         )
-        self.client.login()
+        if self.phone:
+            with login_lock:
+                self.client.login()
+        else:
+            self.client.login()
 
     def get_me(self):
         result = self.client.get_me()
@@ -51,6 +73,10 @@ class bindings(object):
             return send_request(url, params, headers, files, data, post=True, bot=self.bot)
         except:
             return None
+        finally:
+            # Releases the files of the media cache. #
+            for file in (files or {}).values():
+                file.close()
 
     def server_request(self, api_method, params=None, ignore_errors=False, process_request=False, return_error=False):
         data = {
@@ -149,6 +175,22 @@ class bindings(object):
         for update_type in handle_types:
             self.client.add_update_handler(update_type, update_handler)
 
+        def member_handler(update):
+            self.bot.chat_admins.invalidate(update['chat_id'])
+
+        self.client.add_update_handler('updateChatMember', member_handler)
+
+        # The message gets its final id when the upload ends, with the id of the file in Telegram. #
+        def send_handler(update):
+            key = self.uploads.pop(update['old_message_id'], None)
+            if key and update['@type'] == 'updateMessageSendSucceeded':
+                media.set_remote_id(key, self.get_remote_id(update['message']['content']))
+            elif key and media.is_invalid_remote_id(update.get('error_message') or update.get('error', {}).get('message')):
+                media.set_remote_id(key, None)
+
+        self.client.add_update_handler('updateMessageSendSucceeded', send_handler)
+        self.client.add_update_handler('updateMessageSendFailed', send_handler)
+
     def update_chats(self, load_all=False):
         chats = self.server_request('getChats', {
             'chat_list': {'@type': 'chatListMain'},
@@ -425,6 +467,11 @@ class bindings(object):
             self.send_chat_action(message.conversation.id, message.type)
             data = None
             input_message_content = None
+            upload_key = None
+
+            # Local files that were already uploaded are sent by their id. #
+            if message.type in FILE_FIELDS and message.content.startswith('/'):
+                upload_key = media.get_upload_key(self.bot, message.content)
 
             if message.type == 'text':
                 if not message.content or (isinstance(message.content, str) and len(message.content) == 0):
@@ -470,7 +517,7 @@ class bindings(object):
             elif message.type == 'photo':
                 input_message_content = {
                     '@type': 'inputMessagePhoto',
-                    'photo': self.get_input_file(message.content)
+                    'photo': self.get_input_file(message.content, upload_key)
                 }
 
                 if message.extra and 'caption' in message.extra:
@@ -482,7 +529,7 @@ class bindings(object):
             elif message.type == 'animation':
                 input_message_content = {
                     '@type': 'inputMessageAnimation',
-                    'animation': self.get_input_file(message.content)
+                    'animation': self.get_input_file(message.content, upload_key)
                 }
 
                 if message.extra and 'caption' in message.extra:
@@ -494,7 +541,7 @@ class bindings(object):
             elif message.type == 'audio':
                 input_message_content = {
                     '@type': 'inputMessageAudio',
-                    'audio': self.get_input_file(message.content)
+                    'audio': self.get_input_file(message.content, upload_key)
                 }
 
                 if message.extra and 'caption' in message.extra:
@@ -506,7 +553,7 @@ class bindings(object):
             elif message.type == 'document':
                 input_message_content = {
                     '@type': 'inputMessageDocument',
-                    'document': self.get_input_file(message.content)
+                    'document': self.get_input_file(message.content, upload_key)
                 }
 
                 if message.extra and 'caption' in message.extra:
@@ -518,19 +565,19 @@ class bindings(object):
             elif message.type == 'sticker':
                 input_message_content = {
                     '@type': 'inputMessageSticker',
-                    'sticker': self.get_input_file(message.content)
+                    'sticker': self.get_input_file(message.content, upload_key)
                 }
 
             elif message.type == 'video':
                 input_message_content = {
                     '@type': 'inputMessageVideo',
-                    'video': self.get_input_file(message.content)
+                    'video': self.get_input_file(message.content, upload_key)
                 }
 
             elif message.type == 'voice':
                 input_message_content = {
                     '@type': 'inputMessageVoiceNote',
-                    'voice_note': self.get_input_file(message.content)
+                    'voice_note': self.get_input_file(message.content, upload_key)
                 }
 
                 if message.extra and 'caption' in message.extra:
@@ -591,7 +638,7 @@ class bindings(object):
 
                 if message.extra and 'photo' in message.extra:
                     if message.extra['photo'].startswith('/'):
-                        photo = open(message.extra['photo'], 'rb')
+                        photo = media.open(message.extra['photo'])
                         files = {'photo': photo}
                     else:
                         params['photo'] = message.extra['photo']
@@ -630,7 +677,20 @@ class bindings(object):
 
                 else:
                     result = self.server_request(
-                        data['@type'], data, process_request=True)
+                        data['@type'], data, process_request=True, return_error=True)
+                    error = result.get('message') if isinstance(result, dict) and result.get('@type') == 'error' else None
+                    if error is not None:
+                        result = False
+
+                    if upload_key:
+                        # Only an id that isn't valid anymore is uploaded again, other errors would fail the upload too. #
+                        if not result and media.get_remote_id(upload_key) and media.is_invalid_remote_id(error):
+                            media.set_remote_id(upload_key, None)
+                            data['input_message_content'][FILE_FIELDS[message.type]] = self.get_input_file(message.content)
+                            result = self.server_request(
+                                data['@type'], data, process_request=True)
+                        if result and 'id' in result:
+                            self.uploads[result['id']] = upload_key
                 self.send_chat_action(message.conversation.id, 'cancel')
 
         except KeyboardInterrupt:
@@ -641,8 +701,15 @@ class bindings(object):
             if self.bot.started:
                 catch_exception(e, self.bot)
 
-    def get_input_file(self, content):
-        if content.startswith('/'):
+    def get_input_file(self, content, upload_key=None):
+        remote_id = media.get_remote_id(upload_key) if upload_key else None
+        if remote_id:
+            return {
+                '@type': 'inputFileRemote',
+                'id': remote_id
+            }
+
+        elif content.startswith('/'):
             return {
                 '@type': 'inputFileLocal',
                 'path': content
@@ -665,6 +732,21 @@ class bindings(object):
                 'id': content
             }
 
+    @staticmethod
+    def get_remote_id(content):
+        try:
+            if content['@type'] == 'messagePhoto':
+                return content['photo']['sizes'][-1]['photo']['remote']['id']
+            elif content['@type'] == 'messageVoiceNote':
+                return content['voice_note']['voice']['remote']['id']
+            else:
+                for field in ['animation', 'audio', 'document', 'sticker', 'video']:
+                    if field in content:
+                        return content[field][field]['remote']['id']
+        except (KeyError, IndexError, TypeError):
+            pass
+        return None
+
     def send_chat_action(self, conversation_id, type='text'):
         action = 'chatActionTyping'
 
@@ -747,12 +829,17 @@ class bindings(object):
             params = {
                 "file_id": file_id
             }
+            # Files already downloaded are in the media cache. #
+            path = media.get('telegram:' + file_id) if not link else None
+            if path:
+                return path
+
             result = self.api_request('getFile', params)
             if 'result' in result:
                 if link:
                     return 'https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path)
                 else:
-                    return download('https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path))
+                    return download('https://api.telegram.org/file/bot{}/{}'.format(self.bot.config['bindings_token'], result.result.file_path), key='telegram:' + file_id)
 
         return None
 
@@ -782,6 +869,7 @@ class bindings(object):
         })
 
     def promote_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         return self.server_request('setChatMemberStatus', {
             'chat_id': conversation_id,
             'user_id': user_id,
@@ -789,6 +877,7 @@ class bindings(object):
         })
 
     def kick_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         return self.server_request('setChatMemberStatus', {
             'chat_id': conversation_id,
             'user_id': user_id,
@@ -796,6 +885,7 @@ class bindings(object):
         })
 
     def unban_conversation_member(self, conversation_id, user_id):
+        self.bot.chat_admins.invalidate(conversation_id)
         return self.server_request('setChatMemberStatus', {
             'chat_id': conversation_id,
             'user_id': user_id,
@@ -1,58 +1,184 @@
+import asyncio
+import functools
 import importlib
 import json
 import logging
 import os
-import re
 import signal
 import sys
 import traceback
-from multiprocessing import Process, Queue
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Event, Process, Queue
 from threading import Thread
-from time import sleep, time
-
-from firebase_admin import db
-
+from time import time
+
+from polaris.admins import AdminCache
+from polaris.bulkheads import Bulkheads
+from polaris.changes import ChangeFeed
+from polaris.context import MessageContext
+from polaris.database import DatabaseError, join_path, write_buffer
+from polaris.database import client as database
+from polaris.media import media
+from polaris.names import NameIndex
+from polaris.network import client as http
+from polaris.network import responses
+from polaris.routing import RoutingTable
+from polaris.scheduler import Scheduler
+from polaris.snapshots import snapshots
+from polaris.state import StateServer
+from polaris.tags import TagIndex
+from polaris.triggers import TriggerIndex
+from polaris.transport import MessageQueue, ShardedQueue
 from polaris.types import AutosaveDict, Conversation, Message, User
-from polaris.utils import (cancel_steps, catch_exception, get_plugin_name,
-                           get_step, has_tag, init_if_empty, is_int,
-                           is_trusted, load_plugin_list, set_input, set_logger,
-                           wait_until_received)
+from polaris.utils import (cancel_steps, catch_exception, flush_data,
+                           get_plugin_name, init_if_empty, is_int, is_owner,
+                           is_trusted, load_plugin_list, set_input, set_logger)
 
 
 class Bot(object):
     def __init__(self, name):
         self.name = name
-        self.inbox = Queue()
         self.outbox = Queue()
         self.started = False
         self.plugins = None
+        self.triggers = None
+        self.routes = None
         self.jobs = None
+        self.pid = None
+        self.stop_requested = Event()
+        self.stop_watcher = None
+        self.loop = None
+        self.timings = {}
+        self.snapshots = snapshots
+        self.changes = ChangeFeed(self)
+        self.changes.hooks.append(self.update_snapshots)
+        self.tag_index = TagIndex(self)
+        self.name_index = NameIndex(self)
+        self.chat_admins = AdminCache(self)
+        self.state = StateServer(self)
+        started = time()
         self.get_database()
+        self.timings['database'] = time() - started
+        self.chat_admins.configure(self.get_config_number('chat_admins_ttl', 300))
+        self.inbox = ShardedQueue(self.get_config_number('handlers', 1),
+                                  self.get_config_number('inbox_high_water', 1000),
+                                  self.get_config_number('priority_high_water', 1000),
+                                  self.get_config_number('max_message_age', 60 * 5),
+                                  self.is_priority, self.get_transport(),
+                                  self.get_config_number('ring_buffer_size', 4 * 1024 * 1024))
+        self.scheduler = Scheduler(self)
+        self.bulkheads = Bulkheads(self)
+        self.timings['queues'] = time() - started - self.timings['database']
+        started = time()
         self.bindings = importlib.import_module(
             'polaris.bindings.{}'.format(self.config['bindings'])).bindings(self)
         self.info = self.bindings.get_me()
+        self.timings['bindings'] = time() - started
+
+        # The outbox is only bounded when it is drained by its own process, so a full outbox slows down the handlers. #
+        if self.has_sender_worker():
+            self.outbox = MessageQueue(self.get_config_number('outbox_high_water', 1000), self.get_transport(),
+                                       self.get_config_number('ring_buffer_size', 4 * 1024 * 1024))
 
         if self.info is None:
             raise Exception
 
+    # Attributes of the bot loaded from the database and their paths. #
+    def get_trees(self):
+        return {
+            'config': 'bots/' + self.name,
+            'trans': 'translations/' + self.config['translation'],
+            'users': 'users/' + self.name,
+            'groups': 'groups/' + self.name,
+            'steps': 'steps/' + self.name,
+            'tags': 'tags/' + self.name,
+            'settings': 'settings/' + self.name,
+            'administration': 'administration/' + self.name,
+            'pins': 'pins/' + self.name,
+            'reminders': 'reminders/' + self.name,
+            'poles': 'poles/' + self.name
+        }
+
     def get_database(self):
         try:
-            self.config = wait_until_received('bots/' + self.name)
-            self.trans = wait_until_received(
-                'translations/' + self.config['translation'])
-            self.users = wait_until_received('users/' + self.name)
-            self.groups = wait_until_received('groups/' + self.name)
-            self.steps = wait_until_received('steps/' + self.name)
-            self.tags = wait_until_received('tags/' + self.name)
-            self.settings = wait_until_received('settings/' + self.name)
-            self.administration = wait_until_received(
-                'administration/' + self.name)
-            self.pins = wait_until_received('pins/' + self.name)
-            self.reminders = wait_until_received('reminders/' + self.name)
-            self.poles = wait_until_received('poles/' + self.name)
+            self.config = self.snapshots.get('bots/' + self.name)
+            # The rest of trees are fetched at the same time. #
+            paths = self.get_trees()
+            del paths['config']
+            with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+                trees = executor.map(self.snapshots.get, paths.values())
+                for attribute, tree in zip(paths, trees):
+                    setattr(self, attribute, tree)
+        # A bot can't start without its data. #
+        except DatabaseError:
+            raise
         except Exception as e:
             catch_exception(e, self)
 
+    # Changes made by the jobs reach the snapshots of this process with their values. #
+    def update_snapshots(self, attribute, keys, value):
+        self.snapshots.write(join_path(self.get_trees()[attribute], *keys), value)
+
+    # The clients are shared by every bot of the process, so bots are initialized at the same time without them. #
+    # Every job applies the settings of its bot, the process that starts the bots has the ones of the last started. #
+    def configure_clients(self):
+        database.configure(self.get_config_number('database_deadline', 30),
+                           self.get_config_number('database_max_backoff', 10),
+                           self.get_config_number('database_breaker_failures', 10),
+                           self.get_config_number('database_breaker_cooldown', 30))
+        write_buffer.configure(self.get_config_number('write_interval', 1),
+                               self.get_config_number('write_batch_size', 500))
+        http.configure(self.get_config_number('http_retries', 3),
+                       self.get_config_number('http_max_backoff', 30),
+                       self.get_config_number('http_max_retry_after', 60),
+                       self.get_config_number('http_timeout', 100),
+                       self.get_config_number('http_pool_size', 10))
+        responses.configure(self.get_config_number('http_cache_size', 1000),
+                            self.config.http_cache_file if 'http_cache_file' in self.config else None)
+        media.configure(self.get_config_number('media_quota', 512), self.get_config_number('media_max_age', 86400))
+        self.snapshots.configure(self.get_config_number('snapshot_check_interval', 60 * 60))
+
+    def get_config_number(self, key, default):
+        if key in self.config and is_int(self.config[key]) and int(self.config[key]) > 0:
+            return int(self.config[key])
+        return default
+
+    # Messages are sent between processes as msgpack by default, 'shared_memory' also avoids the pipes. #
+    def get_transport(self):
+        if 'transport' in self.config and self.config.transport in ['pickle', 'msgpack', 'shared_memory']:
+            return self.config.transport
+        return 'msgpack'
+
+    # Commands, inline queries and messages of the owner and trusted users go to the priority lane. #
+    def is_priority(self, msg):
+        if msg.type == 'inline_query':
+            return True
+
+        if msg.type == 'text' and isinstance(msg.content, str) and (msg.content.startswith('/') or msg.content.startswith(self.config.prefix)):
+            return True
+
+        return msg.sender and (is_owner(self, msg.sender.id) or is_trusted(self, msg.sender.id))
+
+    # Members joining, leaving or changing drop the administrators of the chat, commands request them before the plugins need them. #
+    def update_chat_admins(self, msg):
+        if not msg.conversation or not isinstance(msg.conversation.id, int) or msg.conversation.id >= 0:
+            return
+
+        if msg.type == 'chat_member' or (msg.type == 'notification' and msg.content in ['new_chat_member', 'left_chat_member']):
+            self.chat_admins.invalidate(msg.conversation.id)
+
+        elif msg.type == 'text' and isinstance(msg.content, str) and (msg.content.startswith('/') or msg.content.startswith(self.config.prefix)):
+            self.chat_admins.prefetch(msg.conversation.id)
+
+    # The stores are kept by this process and its jobs request them, instead of keeping a copy. #
+    def has_shared_state(self):
+        return 'shared_state' in self.config and self.config.shared_state
+
+    def has_sender_worker(self):
+        if hasattr(self.bindings, 'no_threads') and self.bindings.no_threads:
+            return False
+        return not hasattr(self.bindings, 'custom_sender') or not self.bindings.custom_sender
+
     def sender_worker(self):
         try:
             logging.debug('Starting sender worker...')
@@ -68,18 +194,20 @@ class Bot(object):
         except Exception as e:
             catch_exception(e, self)
 
-    def messages_handler(self):
+    def log_message(self, msg):
         try:
-            logging.debug('Starting message handler...')
-            while self.started:
-                msg = self.inbox.get()
-                try:
-                    logging.info(
-                        '[{}] {}@{} [{}] sent [{}] {}'.format(msg.sender.id, msg.sender.first_name, msg.conversation.title, msg.conversation.id, msg.type, msg.content))
-                except AttributeError:
-                    logging.info(
-                        '[{}] {}@{} [{}] sent [{}] {}'.format(msg.sender.id, msg.sender.title, msg.conversation.title, msg.conversation.id, msg.type, msg.content))
+            logging.info(
+                '[{}] {}@{} [{}] sent [{}] {}'.format(msg.sender.id, msg.sender.first_name, msg.conversation.title, msg.conversation.id, msg.type, msg.content))
+        except AttributeError:
+            logging.info(
+                '[{}] {}@{} [{}] sent [{}] {}'.format(msg.sender.id, msg.sender.title, msg.conversation.title, msg.conversation.id, msg.type, msg.content))
 
+    def messages_handler(self, shard=0):
+        try:
+            logging.debug('Starting message handler {}...'.format(shard))
+            while self.started:
+                msg = self.inbox.get(shard)
+                self.log_message(msg)
                 self.on_message_receive(msg)
 
         except KeyboardInterrupt:
@@ -88,32 +216,89 @@ class Bot(object):
         except Exception as e:
             catch_exception(e, self)
 
+    # ASYNCIO EXECUTION MODE #
+
+    def is_async(self):
+        return 'asyncio' in self.config and self.config.asyncio
+
+    # Coroutines are awaited in the loop, the rest of functions run in the executor of their plugin. #
+    async def call_plugin(self, function, *args):
+        return await self.bulkheads.call_async(self.loop, function, *args)
+
+    def async_messages_handler(self, shard=0):
+        try:
+            logging.debug('Starting asyncio message handler {}...'.format(shard))
+            asyncio.run(self.async_messages_loop(shard))
+
+        except KeyboardInterrupt:
+            pass
+
+        except Exception as e:
+            catch_exception(e, self)
+
+    async def async_messages_loop(self, shard=0):
+        self.loop = asyncio.get_running_loop()
+        reader = ThreadPoolExecutor(max_workers=1)
+        conversations = {}
+        slots = asyncio.Semaphore(self.bulkheads.get_capacity())
+
+        def release(conversation_id, task):
+            slots.release()
+            if conversations.get(conversation_id) is task:
+                del conversations[conversation_id]
+
+        try:
+            while self.started:
+                # A message is only taken when there is room for it, so the inbox fills up and sheds the load. #
+                await slots.acquire()
+                msg = await self.loop.run_in_executor(reader, self.inbox.get, shard)
+                self.log_message(msg)
+
+                # Messages of the same conversation wait for the previous one, the rest run concurrently. #
+                conversation_id = msg.conversation.id if msg.conversation else None
+                task = self.loop.create_task(self.on_message_receive_async(
+                    msg, conversations.get(conversation_id)))
+                conversations[conversation_id] = task
+                task.add_done_callback(functools.partial(release, conversation_id))
+        finally:
+            await http.close_async_session()
+
     def start(self):
         if not 'enabled' in self.config or self.config.enabled:
             if self.started:
                 self.stop()
 
             self.started = True
+            self.configure_clients()
             self.plugins = self.init_plugins()
 
             logging.info('Connected as {} (@{}) [{}]'.format
                          (self.info.first_name, self.info.username, 'bot' if self.info.is_bot else 'user'))
 
             self.jobs = []
-            if hasattr(self.bindings, 'no_threads') and self.bindings.no_threads:
-                self.bindings.start()
-            else:
+            self.pid = os.getpid()
+            self.watch_stop()
+            no_threads = hasattr(self.bindings, 'no_threads') and self.bindings.no_threads
+            if not no_threads:
                 self.started = True
-                self.jobs.append(
-                    Process(target=self.bindings.receiver_worker, name='{} R.'.format(self.name)))
+                self.add_job('{} R.'.format(self.name), self.bindings.receiver_worker)
                 if not hasattr(self.bindings, 'custom_sender') or not self.bindings.custom_sender:
-                    self.jobs.append(
-                        Process(target=self.sender_worker, name='{} S.'.format(self.name)))
-                self.jobs.append(
-                    Process(target=self.messages_handler, name='{}'.format(self.name)))
+                    self.add_job('{} S.'.format(self.name), self.sender_worker)
+                handler = self.async_messages_handler if self.is_async() else self.messages_handler
+                for shard in range(self.inbox.size):
+                    self.add_job('{}'.format(self.name) if self.inbox.size == 1 else '{} H{}.'.format(self.name, shard),
+                                 handler, shard)
             if not hasattr(self.bindings, 'custom_cron') or not self.bindings.custom_cron:
-                self.jobs.append(
-                    Process(target=self.cron_jobs, name='{} C.'.format(self.name)))
+                self.add_job('{} C.'.format(self.name), self.cron_jobs)
+
+            # This process and every job get their own channel of changes. #
+            self.changes.prepare(len(self.jobs) + 1)
+            self.changes.attach(0)
+            if self.has_shared_state():
+                self.state.start()
+
+            if no_threads:
+                self.bindings.start()
 
             for job in self.jobs:
                 # if job.name != self.name:
@@ -123,13 +308,62 @@ class Bot(object):
         else:
             logging.info('[{}] is not enabled!'.format(self.name))
 
+    # Processes are terminated gracefully first, so they can flush their pending writes. #
     def stop(self):
+        # Only the process that started the jobs can wait for them, the jobs ask it to stop the bot. #
+        if self.pid and self.pid != os.getpid():
+            self.started = False
+            self.stop_requested.set()
+            return
+
         self.started = False
         for job in self.jobs:
             # if job.daemon:
             logging.info(
                 'Terminating process [{}] with PID {}'.format(job.name, job.pid))
-            os.kill(job.pid, signal.SIGKILL)
+            job.terminate()
+
+        for job in self.jobs:
+            job.join(self.get_config_number('stop_timeout', 5))
+            if job.is_alive():
+                os.kill(job.pid, signal.SIGKILL)
+        flush_data()
+        self.snapshots.save()
+
+    def watch_stop(self):
+        if self.stop_watcher:
+            return
+
+        def watcher():
+            while True:
+                self.stop_requested.wait()
+                self.stop_requested.clear()
+                if self.started:
+                    logging.info('Stopping [{}] as one of its processes asked'.format(self.name))
+                    self.stop()
+
+        self.stop_watcher = Thread(target=watcher, daemon=True)
+        self.stop_watcher.start()
+
+    def add_job(self, name, target, *args):
+        self.jobs.append(Process(target=self.run_job, args=(len(self.jobs) + 1, target) + args, name=name))
+
+    def run_job(self, slot, target, *args):
+        signal.signal(signal.SIGTERM, self.terminate_job)
+        self.configure_clients()
+        self.changes.attach(slot)
+        if self.has_shared_state():
+            self.state.connect()
+        try:
+            target(*args)
+        finally:
+            flush_data()
+            # Jobs exit without the handlers of atexit. #
+            responses.save()
+
+    @staticmethod
+    def terminate_job(signum, frame):
+        raise KeyboardInterrupt
 
     def init_plugins(self):
         plugins = []
@@ -158,72 +392,135 @@ class Bot(object):
         logging.debug('  Loaded: ' + str(len(plugins)) +
                       '/' + str(len(plugins_to_load)))
 
-        return plugins
+        self.triggers = TriggerIndex(self, plugins)
+        self.routes = RoutingTable(self, plugins)
 
-    def on_message_receive(self, msg):
-        try:
-            ignore_message = False
-            if msg.content == None or (msg.type != 'inline_query' and msg.date < time() - 60 * 5):
-                return
+        return plugins
 
-            # if msg.sender.id != self.config['owner'] and not is_trusted(self, msg.sender.id, msg) and (has_tag(self, msg.conversation.id, 'spam') or has_tag(self, msg.sender.id, 'spam')):
-            #     ignore_message = True
-            #     self.send_message(msg, self.trans.errors.spammer_detected, extra={'format': 'HTML'})
+    # Compiles again the triggers if the plugins, their commands, the prefix or the username changed. #
+    def update_triggers(self):
+        if not self.triggers or self.triggers.is_stale(self.plugins):
+            self.triggers = TriggerIndex(self, self.plugins)
+        return self.triggers
+
+    def update_routes(self):
+        if not self.routes or self.routes.is_stale(self.plugins):
+            self.routes = RoutingTable(self, self.plugins)
+        return self.routes
+
+    def is_ignored(self, msg):
+        # if msg.sender.id != self.config['owner'] and not is_trusted(self, msg.sender.id, msg) and (has_tag(self, msg.conversation.id, 'spam') or has_tag(self, msg.sender.id, 'spam')):
+        #     ignore_message = True
+        #     self.send_message(msg, self.trans.errors.spammer_detected, extra={'format': 'HTML'})
+
+        return msg.sender.id != self.config['owner'] and not is_trusted(self, msg.sender.id, msg) and (msg.context.has_tag(msg.conversation.id, 'muted') or msg.context.has_tag(msg.sender.id, 'muted'))
+
+    def prepare_content(self, msg, plugin, ignore_message):
+        # If no query show help #
+        if msg.type == 'inline_query' and not ignore_message:
+            if msg.content == '':
+                msg.content = 'help'
+
+        if hasattr(plugin, 'commands') and not ignore_message and msg.content and isinstance(msg.content, str):
+            if msg.content.endswith('@' + self.info.username) and ' ' not in msg.content:
+                msg.content = msg.content.replace(
+                    '@' + self.info.username, '')
+            return True
+        return False
 
-            if msg.sender.id != self.config['owner'] and not is_trusted(self, msg.sender.id, msg) and (has_tag(self, msg.conversation.id, 'muted') or has_tag(self, msg.sender.id, 'muted')):
-                ignore_message = True
+    def get_candidates(self, msg):
+        friendly = not msg.context.has_tag(msg.sender.id, 'noreplies') and not msg.context.has_tag(msg.conversation.id, 'noreplies') and msg.conversation.id != self.config.alerts_conversation_id and msg.conversation.id != self.config.admin_conversation_id
+        return self.update_triggers().get_candidates(msg, friendly)
 
-            step = get_step(self, msg.conversation.id)
+    def call_plugin_sync(self, function, *args):
+        return self.bulkheads.call(function, *args)
 
-            if step:
-                if not ignore_message:
-                    for plugin in self.plugins:
-                        if get_plugin_name(plugin) == step.plugin and hasattr(plugin, 'steps'):
-                            if msg.content.startswith('/cancel'):
-                                plugin.steps(msg, -1)
-                                cancel_steps(self, msg.conversation.id)
+    # Handles a message the same way in both modes, the plugin calls are yielded and made by the mode. #
+    # The result of every call is sent back, and its exception is raised where the call was yielded. #
+    def dispatch(self, msg):
+        if msg.content == None or self.inbox.is_expired(msg):
+            return
 
-                            if msg.content.startswith('/done'):
-                                plugin.steps(msg, 0)
-                                cancel_steps(self, msg.conversation.id)
+        msg.context = MessageContext(self, msg)
+        self.update_chat_admins(msg)
+        # Changes of the members only update the administrators, they don't reach the plugins. #
+        if msg.type == 'chat_member':
+            return
 
-                            else:
-                                plugin.steps(msg, step['step'])
+        ignore_message = self.is_ignored(msg)
+        step = msg.context.get_step()
 
-            else:
+        if step:
+            if not ignore_message:
                 for plugin in self.plugins:
-                    # Always do this action for every message. #
-                    if hasattr(plugin, 'always'):
-                        plugin.always(msg)
-
-                    # If no query show help #
-                    if msg.type == 'inline_query' and not ignore_message:
-                        if msg.content == '':
-                            msg.content = 'help'
-
-                    if hasattr(plugin, 'commands') and not ignore_message:
-                        # Check if any command of a plugin matches. #
-                        for command in plugin.commands:
-                            if 'parameters' not in command:
-                                command['parameters'] = None
-
-                            if 'command' in command:
-                                if self.check_trigger(command['command'], command['parameters'], msg, plugin):
-                                    break
-                                if 'keep_default' in command and command['keep_default']:
-                                    if self.check_trigger(command['command'], command['parameters'], msg, plugin, False, True):
-                                        break
-
-                            if 'friendly' in command and not has_tag(self, msg.sender.id, 'noreplies') and not has_tag(self, msg.conversation.id, 'noreplies') and msg.conversation.id != self.config.alerts_conversation_id and msg.conversation.id != self.config.admin_conversation_id:
-                                if self.check_trigger(command['friendly'], command['parameters'], msg, plugin, True):
-                                    break
-
-                            if 'shortcut' in command:
-                                if self.check_trigger(command['shortcut'], command['parameters'], msg, plugin):
-                                    break
-                                if 'keep_default' in command and command['keep_default']:
-                                    if self.check_trigger(command['shortcut'], command['parameters'], msg, plugin, False, True):
-                                        break
+                    if get_plugin_name(plugin) == step.plugin and hasattr(plugin, 'steps'):
+                        if msg.content.startswith('/cancel'):
+                            yield (plugin.steps, msg, -1)
+                            cancel_steps(self, msg.conversation.id)
+
+                        if msg.content.startswith('/done'):
+                            yield (plugin.steps, msg, 0)
+                            cancel_steps(self, msg.conversation.id)
+
+                        else:
+                            yield (plugin.steps, msg, step['step'])
+
+        else:
+            candidates = None
+            candidates_content = None
+            hooks = self.update_routes().get_hooks(msg)
+
+            for index, plugin in enumerate(self.plugins):
+                # Always do this action for every message the plugin is subscribed to. #
+                if index in hooks:
+                    yield (plugin.always, msg)
+
+                if self.prepare_content(msg, plugin, ignore_message):
+                    # Only the triggers that could match the message are checked. #
+                    if candidates is None or candidates_content != msg.content:
+                        candidates = self.get_candidates(msg)
+                        candidates_content = msg.content
+
+                    # Check if any command of a plugin matches. #
+                    for trigger in candidates.get(index, []):
+                        if (yield from self.check_trigger(trigger, msg, plugin)):
+                            break
+
+    def check_trigger(self, trigger, message, plugin):
+        try:
+            match = trigger.search(message)
+            if match:
+                set_input(message, match)
+
+                if message.type == 'inline_query':
+                    if hasattr(plugin, 'inline'):
+                        yield (plugin.inline, message)
+
+                else:
+                    yield (plugin.run, message)
+
+                return True
+        except Exception as e:
+            catch_exception(e, self)
+            self.send_message(message, self.trans.errors.exception_found, extra={
+                              'format': 'HTML'})
+            return False
+        return False
+
+    def on_message_receive(self, msg):
+        calls = self.dispatch(msg)
+        try:
+            call = next(calls)
+            while True:
+                try:
+                    result = self.call_plugin_sync(*call)
+                except Exception as e:
+                    call = calls.throw(e)
+                else:
+                    call = calls.send(result)
+
+        except StopIteration:
+            pass
 
         except KeyboardInterrupt:
             pass
@@ -231,68 +528,39 @@ class Bot(object):
         except Exception as e:
             catch_exception(e, self)
 
-    def check_trigger(self, command, parameters, message, plugin, friendly=False, keep_default=False):
-        if isinstance(command, str):
-            command = command.lower()
-            if isinstance(message.content, str) and message.content.endswith('@' + self.info.username) and ' ' not in message.content:
-                message.content = message.content.replace(
-                    '@' + self.info.username, '')
+    async def on_message_receive_async(self, msg, previous=None):
+        if previous:
+            await asyncio.wait([previous])
 
-            # If the commands are not /start or /help, set the correct command start symbol. #
-            if isinstance(message.content, str) and ((command == '/start' and '/start' in message.content) or
-                                                     (command == '/help' and '/help' in message.content) or
-                                                     (command == '/config' and '/config' in message.content)):
-                trigger = command.replace('/', '^/')
-            else:
-                if message.type == 'inline_query':
-                    trigger = command.replace('/', '^')
-                elif keep_default:
-                    trigger = command.replace('/', '^/')
+        calls = self.dispatch(msg)
+        try:
+            call = next(calls)
+            while True:
+                try:
+                    result = await self.call_plugin(*call)
+                except Exception as e:
+                    call = calls.throw(e)
                 else:
-                    trigger = command.replace('/', '^' + self.config.prefix)
-
-                if not friendly:
-                    # trigger = trigger.replace('@' + self.info.username.lower(), '')
-                    if not parameters and trigger.startswith('^'):
-                        trigger += '$'
-                    elif parameters and message.content and isinstance(message.content, str) and ' ' not in message.content:
-                        trigger += '$'
-                    elif parameters and message.content and isinstance(message.content, str) and ' ' in message.content:
-                        trigger += ' '
-                # elif command.startswith('/'):
-                #     return False
-
-            try:
-                if message.content and isinstance(message.content, str) and re.compile(trigger, flags=re.IGNORECASE).search(message.content):
-                    set_input(message, trigger)
+                    call = calls.send(result)
 
-                    if message.type == 'inline_query':
-                        if hasattr(plugin, 'inline'):
-                            plugin.inline(message)
+        except StopIteration:
+            pass
 
-                    else:
-                        plugin.run(message)
+        except KeyboardInterrupt:
+            pass
 
-                    return True
-            except Exception as e:
-                catch_exception(e, self)
-                self.send_message(message, self.trans.errors.exception_found, extra={
-                                  'format': 'HTML'})
-                return False
-        return False
+        except Exception as e:
+            catch_exception(e, self)
 
     def cron_jobs(self):
-        while(self.started):
-            for plugin in self.plugins:
-                try:
-                    if hasattr(plugin, 'cron'):
-                        plugin.cron()
+        try:
+            self.scheduler.run()
 
-                except KeyboardInterrupt:
-                    pass
-                except Exception as e:
-                    catch_exception(e, self)
-            sleep(5)
+        except KeyboardInterrupt:
+            pass
+
+        except Exception as e:
+            catch_exception(e, self)
 
     # METHODS TO MANAGE MESSAGES #
 
@@ -323,7 +591,7 @@ class Bot(object):
         return self.bindings.join_by_invite_link(invite_link)
 
     def get_chat_admins(self, conversation_id):
-        return self.bindings.get_chat_administrators(conversation_id)
+        return self.chat_admins.get(conversation_id)
 
     def invite_user(self, msg, user_id):
         return self.bindings.invite_conversation_member(msg.conversation.id, user_id)
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, Lock
+from time import time
+
+from polaris.utils import catch_exception, get_plugin_name, run_coroutine
+
+
+class PluginTimeout(Exception):
+    pass
+
+
+# Every plugin runs in its own executor, a plugin that hangs or keeps failing is skipped for a while. #
+# A call waits for a free worker instead of being queued, a worker is only free again when its call ends. #
+class Bulkhead(object):
+    def __init__(self, bot, name, workers=2, timeout=30, max_failures=5, cooldown=60):
+        self.bot = bot
+        self.name = name
+        self.workers = workers
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.executor = None
+        self.slots = BoundedSemaphore(workers)
+        self.waiters = []
+        self.failures = 0
+        self.open_until = 0
+        self.lock = Lock()
+
+    def get_executor(self):
+        # Created when first used, so the threads belong to the process that runs the plugin. #
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self.executor
+
+    def submit(self, function, *args):
+        future = self.get_executor().submit(self.execute, function, *args)
+        future.add_done_callback(self.release)
+        return future
+
+    # Calls of the asyncio mode waiting for a worker are woken in their loop, they try to take it again. #
+    def release(self, future=None):
+        self.slots.release()
+        with self.lock:
+            waiters, self.waiters = self.waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(self.wake, waiter)
+
+    @staticmethod
+    def wake(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        deadline = time() + self.timeout
+        while not self.slots.acquire(blocking=False):
+            remaining = deadline - time()
+            if remaining <= 0:
+                return False
+
+            waiter = loop.create_future()
+            with self.lock:
+                self.waiters.append((loop, waiter))
+            # Released before the waiter was added. #
+            if self.slots.acquire(blocking=False):
+                return True
+
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    def is_open(self):
+        return self.open_until > time()
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            # A failure right after the circuit is closed again opens it at once. #
+            if self.failures >= self.max_failures or self.open_until:
+                self.failures = 0
+                self.open_until = time() + self.cooldown
+                logging.warning('Plugin {} disabled for {} seconds'.format(self.name, self.cooldown))
+
+    def timed_out(self, function):
+        self.failure()
+        try:
+            raise PluginTimeout('{}.{} took more than {} seconds'.format(self.name, function.__name__, self.timeout)) from None
+        except PluginTimeout as e:
+            catch_exception(e, self.bot, self.name)
+
+    @staticmethod
+    def execute(function, *args):
+        result = function(*args)
+        if asyncio.iscoroutine(result):
+            return run_coroutine(result)
+        return result
+
+    # Exceptions of the plugin are raised as before, timeouts and skipped calls return None. #
+    def call(self, function, *args):
+        if self.is_open():
+            logging.debug('Skipping {}.{}, circuit is open'.format(self.name, function.__name__))
+            return None
+
+        if not self.slots.acquire(timeout=self.timeout):
+            return self.timed_out(function)
+
+        future = self.submit(function, *args)
+        try:
+            result = future.result(self.timeout)
+        except FutureTimeoutError:
+            return self.timed_out(function)
+        except Exception:
+            self.failure()
+            raise
+
+        self.success()
+        return result
+
+    async def call_async(self, loop, function, *args):
+        if self.is_open():
+            logging.debug('Skipping {}.{}, circuit is open'.format(self.name, function.__name__))
+            return None
+
+        try:
+            if asyncio.iscoroutinefunction(function):
+                result = await asyncio.wait_for(function(*args), self.timeout)
+            else:
+                if not await self.acquire_async():
+                    return self.timed_out(function)
+                result = await asyncio.wait_for(asyncio.wrap_future(self.submit(function, *args)), self.timeout)
+        except asyncio.TimeoutError:
+            return self.timed_out(function)
+        except Exception:
+            self.failure()
+            raise
+
+        self.success()
+        return result
+
+
+class Bulkheads(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.bulkheads = {}
+
+    def get_timeout(self, name):
+        if 'plugin_timeouts' in self.bot.config and name in self.bot.config.plugin_timeouts:
+            return self.bot.config.plugin_timeouts[name]
+        return self.bot.get_config_number('plugin_timeout', 30)
+
+    # Messages handled at the same time by the asyncio mode, as many as the workers of all the plugins. #
+    def get_capacity(self):
+        return self.bot.get_config_number('plugin_workers', 2) * max(len(self.bot.plugins or []), 1)
+
+    def get(self, function):
+        if hasattr(function, '__self__'):
+            name = get_plugin_name(function.__self__)
+        else:
+            name = function.__module__
+
+        if name not in self.bulkheads:
+            self.bulkheads[name] = Bulkhead(self.bot, name,
+                                            self.bot.get_config_number('plugin_workers', 2),
+                                            self.get_timeout(name),
+                                            self.bot.get_config_number('breaker_failures', 5),
+                                            self.bot.get_config_number('breaker_cooldown', 60))
+        return self.bulkheads[name]
+
+    def call(self, function, *args):
+        return self.get(function).call(function, *args)
+
+    async def call_async(self, loop, function, *args):
+        return await self.get(function).call_async(loop, function, *args)
@@ -0,0 +1,83 @@
+import logging
+import os
+from multiprocessing import Queue
+from threading import Lock, Thread
+
+from polaris.database import split_path, write_buffer
+from polaris.state import SharedStore, replace_path
+
+
+# The writes of every process of a bot are applied to the stores of the rest of its processes. #
+class ChangeFeed(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.queues = []
+        self.slot = None
+        self.pid = None
+        self.hooks = []
+        self.lock = Lock()
+        write_buffer.hooks.append(self.publish)
+
+    def prepare(self, size):
+        self.close()
+        self.queues = [Queue() for _ in range(size)]
+
+    def attach(self, slot):
+        self.slot = slot
+        self.pid = os.getpid()
+        Thread(target=self.worker, args=(self.queues[slot],), daemon=True).start()
+
+    def close(self):
+        if self.slot is not None and self.pid == os.getpid():
+            self.queues[self.slot].put(None)
+        self.slot = None
+
+    def get_tree(self, path):
+        keys = split_path(path)
+        for attribute, tree in self.bot.get_trees().items():
+            tree_keys = split_path(tree)
+            if keys[:len(tree_keys)] == tree_keys:
+                return attribute, keys[len(tree_keys):]
+        return None, None
+
+    def publish(self, path, value):
+        if self.slot is None or self.pid != os.getpid():
+            return
+
+        attribute, keys = self.get_tree(path)
+        if not attribute:
+            return
+
+        # Shared stores are changed by their server, that broadcasts the change. #
+        store = getattr(self.bot, attribute, None)
+        if isinstance(store, SharedStore):
+            store.write(keys, value)
+        else:
+            self.broadcast(attribute, keys, value)
+
+    def broadcast(self, attribute, keys, value):
+        for slot, queue in enumerate(self.queues):
+            if slot != self.slot:
+                queue.put((attribute, keys, value))
+
+    def worker(self, queue):
+        while True:
+            change = queue.get()
+            if change is None:
+                break
+
+            try:
+                attribute, keys, value = change
+                store = getattr(self.bot, attribute, None)
+                if isinstance(store, SharedStore):
+                    store.invalidate(keys)
+                else:
+                    with self.lock:
+                        setattr(self.bot, attribute, replace_path(store, keys, value))
+                self.notify(attribute, keys, value)
+            except Exception as e:
+                logging.warning('Unable to apply a change of {}: {}'.format(change[0], e))
+
+    def notify(self, attribute, keys, value):
+        for hook in self.hooks:
+            hook(attribute, keys, value)
@@ -0,0 +1,66 @@
+from polaris.utils import get_step, has_tag, is_owner
+
+
+# Lazily computed facts about a message, shared by every plugin that handles it. #
+class MessageContext(object):
+    def __init__(self, bot, msg):
+        self.bot = bot
+        self.msg = msg
+        self.tags = {}
+        self.matches = {}
+        self.values = {}
+        self.admins = None
+
+    def get_tags(self, target):
+        target = str(target)
+        current = self.bot.tags.get(target) if self.bot.tags is not None else None
+        # The cached set is rebuilt if the tags of the target were added or removed meanwhile. #
+        version = (id(current), len(current)) if current is not None else None
+
+        if target not in self.tags or self.tags[target][0] != version:
+            self.tags[target] = (version, set(tag for tag in current if tag) if current else set())
+            self.matches = dict((key, value) for key, value in self.matches.items() if key[0] != target)
+        return self.tags[target][1]
+
+    def has_tag(self, target, tag):
+        tags = self.get_tags(target)
+        key = (str(target), tag)
+        if key not in self.matches:
+            if '?' in tag:
+                self.matches[key] = has_tag(self.bot, target, tag)
+            else:
+                self.matches[key] = tag in tags
+        return self.matches[key]
+
+    def get(self, key, function):
+        if key not in self.values:
+            self.values[key] = function()
+        return self.values[key]
+
+    def get_admins(self):
+        if self.admins is None:
+            self.admins = set()
+            if self.msg.conversation and self.msg.conversation.id < 0:
+                self.admins = self.bot.chat_admins.get_ids(self.msg.conversation.id)
+        return self.admins
+
+    def is_owner(self, uid=None):
+        uid = str(self.msg.sender.id if uid is None else uid)
+        return self.get(('owner', uid), lambda: is_owner(self.bot, uid))
+
+    def is_trusted(self, uid=None):
+        return self.has_tag(self.msg.sender.id if uid is None else uid, 'trusted')
+
+    def is_group_admin(self, uid=None):
+        return str(self.msg.sender.id if uid is None else uid) in self.get_admins()
+
+    def is_admin(self, uid=None):
+        return self.is_owner(uid) or self.is_trusted(uid) or self.is_group_admin(uid)
+
+    def is_mod(self, uid=None, gid=None):
+        uid = self.msg.sender.id if uid is None else uid
+        gid = self.msg.conversation.id if gid is None else gid
+        return self.has_tag(uid, 'globalmod') or self.has_tag(uid, 'mod:{}'.format(gid))
+
+    def get_step(self):
+        return self.get('step', lambda: get_step(self.bot, self.msg.conversation.id))
@@ -0,0 +1,350 @@
+import atexit
+import copy
+import importlib
+import logging
+import os
+import random
+from threading import Event, Lock, RLock, Thread
+from time import sleep, time
+
+
+class DatabaseError(Exception):
+    pass
+
+
+# Failed calls are retried with jittered exponential backoff until their deadline. #
+# After max_failures failed attempts in a row the calls fail at once during the cooldown. #
+class DatabaseClient(object):
+    def __init__(self, deadline=30, backoff=0.1, max_backoff=10, max_failures=10, cooldown=30):
+        self.deadline = deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0
+        self.lock = Lock()
+        self.counters = {'calls': 0, 'retries': 0, 'errors': 0, 'rejected': 0, 'opened': 0}
+
+    def configure(self, deadline=None, max_backoff=None, max_failures=None, cooldown=None):
+        if deadline:
+            self.deadline = deadline
+        if max_backoff:
+            self.max_backoff = max_backoff
+        if max_failures:
+            self.max_failures = max_failures
+        if cooldown:
+            self.cooldown = cooldown
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def get_counters(self):
+        with self.lock:
+            counters = dict(self.counters)
+        counters['open'] = self.is_open()
+        return counters
+
+    def is_open(self):
+        return self.open_until > time()
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            # A failure right after the circuit is closed again opens it at once. #
+            if self.failures >= self.max_failures or self.open_until:
+                self.failures = 0
+                self.open_until = time() + self.cooldown
+                self.counters['opened'] += 1
+                logging.warning('Database disabled for {} seconds'.format(self.cooldown))
+
+    def call(self, function, *args, deadline=None):
+        self.count('calls')
+        deadline = time() + (self.deadline if deadline is None else deadline)
+        delay = self.backoff
+
+        while True:
+            if self.is_open():
+                self.count('rejected')
+                raise DatabaseError('Database circuit is open')
+
+            try:
+                result = function(*args)
+                self.success()
+                return result
+
+            # Wrong paths or values won't work on a retry. #
+            except (TypeError, ValueError):
+                self.count('errors')
+                raise
+
+            except Exception as e:
+                self.failure()
+                if time() + delay > deadline:
+                    self.count('errors')
+                    raise DatabaseError('Database call failed: {}'.format(e)) from e
+
+            self.count('retries')
+            sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, self.max_backoff)
+
+
+def split_path(path):
+    return [key for key in str(path).split('/') if key]
+
+
+def join_path(*paths):
+    return '/'.join(key for path in paths for key in split_path(path))
+
+
+def is_inside(path, parent):
+    return not parent or path == parent or path.startswith(parent + '/')
+
+
+# Leaves of a value with their paths, empty values aren't stored, like in Firebase. #
+def flatten(path, value):
+    if isinstance(value, list):
+        value = dict((str(index), item) for index, item in enumerate(value))
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(join_path(path, key), item)
+    elif value is not None:
+        yield path, value
+
+
+# Nodes whose keys are 0, 1, 2... are returned as lists, like in Firebase. #
+def is_list(value):
+    return isinstance(value, dict) and value and all(str(key).isdigit() for key in value) and \
+        sorted(int(key) for key in value) == list(range(len(value)))
+
+
+def to_lists(value):
+    if not isinstance(value, dict):
+        return value
+
+    value = dict((key, to_lists(item)) for key, item in value.items())
+    if is_list(value):
+        return [value[str(index)] for index in range(len(value))]
+    return value
+
+
+# Builds the value of a path from its leaves. #
+def build_tree(path, leaves):
+    tree = None
+    for leaf_path, value in leaves:
+        keys = split_path(leaf_path)[len(split_path(path)):]
+        if not keys:
+            return value
+
+        if not isinstance(tree, dict):
+            tree = {}
+        node = tree
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    return to_lists(tree)
+
+
+# Remote backends also keep the time every child of the trees (like users/<bot>/<id>) was changed. #
+# A write to a whole tree is recorded as its '*' child. #
+def get_changes(paths, now):
+    changes = {}
+    for path in paths:
+        keys = split_path(path)
+        if len(keys) >= 2 and keys[0] != 'changes':
+            changes[join_path('changes', *(keys[:3] if len(keys) >= 3 else keys + ['*']))] = now
+    return changes
+
+
+# Subscriptions of the local backends check the changes every few seconds. #
+class Subscription(object):
+    def __init__(self, function, interval=1):
+        self.function = function
+        self.interval = interval
+        self.event = Event()
+        self.thread = Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def worker(self):
+        while not self.event.wait(self.interval):
+            try:
+                self.function()
+            except Exception as e:
+                logging.warning('Subscription failed: {}'.format(e))
+
+    def close(self):
+        self.event.set()
+
+
+# The storage backend is chosen with POLARIS_STORAGE (firebase, sqlite or local) and POLARIS_STORAGE_PATH. #
+storage = None
+
+
+def load_storage(name, path=None):
+    module = importlib.import_module('polaris.storage.{}'.format(name))
+    return module.storage(path) if path else module.storage()
+
+
+def set_storage(name, path=None):
+    global storage
+    storage = load_storage(name, path)
+    return storage
+
+
+def get_storage():
+    if not storage:
+        set_storage(os.environ.get('POLARIS_STORAGE', 'firebase'), os.environ.get('POLARIS_STORAGE_PATH'))
+    return storage
+
+
+# Sets or deletes (value is None) a relative path inside a copy of a pending value. #
+def apply_write(value, keys, new_value):
+    return write_child(copy.deepcopy(value), keys, new_value)
+
+
+# Lists are indexed like Firebase does, so a write inside a pending list keeps the rest of its items. #
+def write_child(node, keys, value):
+    if not keys:
+        return value
+
+    key = keys[0]
+    if isinstance(node, list):
+        if key.isdigit() and int(key) < len(node):
+            node[int(key)] = write_child(node[int(key)], keys[1:], value)
+            while node and node[-1] is None:
+                node.pop()
+            return node
+        elif key.isdigit() and int(key) == len(node):
+            if value is not None:
+                node.append(write_child(None, keys[1:], value))
+            return node
+        node = dict((str(index), item) for index, item in enumerate(node) if item is not None)
+
+    elif not isinstance(node, dict):
+        node = {}
+
+    child = write_child(node.get(key), keys[1:], value)
+    if child is None:
+        node.pop(key, None)
+    else:
+        node[key] = child
+    return node
+
+
+# Buffers the writes of a process and sends them as a single multi-path update. #
+# Writes to the same path are coalesced, only the last value is sent. #
+class WriteBuffer(object):
+    def __init__(self, interval=1, size=500):
+        self.interval = interval
+        self.size = size
+        self.pid = None
+        self.pending = {}
+        self.lock = RLock()
+        self.flush_lock = Lock()
+        self.event = Event()
+        self.requested = 0
+        self.written = 0
+        self.hooks = []
+
+    def configure(self, interval=None, size=None):
+        if interval:
+            self.interval = interval
+        if size:
+            self.size = size
+
+    # The buffer of a forked process starts empty, its parent flushes its own writes. #
+    # The locks are new too, another thread of the parent may have been holding them. #
+    def reset(self):
+        self.pid = None
+        self.pending = {}
+        self.lock = RLock()
+        self.flush_lock = Lock()
+        self.event = Event()
+
+    def start(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            Thread(target=self.worker, daemon=True).start()
+
+    def worker(self):
+        while True:
+            self.event.wait(self.interval)
+            self.event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning('Unable to flush {} pending writes: {}'.format(len(self.pending), e))
+                sleep(self.interval)
+
+    def add(self, path, value):
+        self.start()
+        with self.lock:
+            self.requested += 1
+            self.merge(path, value)
+            if len(self.pending) >= self.size:
+                self.event.set()
+
+        for hook in self.hooks:
+            hook(path, value)
+
+    def merge(self, path, value):
+        keys = split_path(path)
+        path = '/'.join(keys)
+
+        with self.lock:
+            # A pending write of a parent path already contains this one. #
+            for depth in range(len(keys) - 1, 0, -1):
+                parent = '/'.join(keys[:depth])
+                if parent in self.pending:
+                    self.pending[parent] = apply_write(self.pending[parent], keys[depth:], value)
+                    return
+
+            for pending_path in [p for p in self.pending if is_inside(p, path)]:
+                del self.pending[pending_path]
+            self.pending[path] = value
+
+    def has_pending(self, path):
+        path = '/'.join(split_path(path))
+        with self.lock:
+            return any(is_inside(p, path) or is_inside(path, p) for p in self.pending)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                batch = self.pending
+                self.pending = {}
+
+            if not batch:
+                return
+
+            values = dict(batch)
+            if getattr(get_storage(), 'remote', False):
+                values.update(get_changes(batch, time()))
+
+            try:
+                client.call(get_storage().update, values)
+            except Exception:
+                # The writes are kept, but the ones made meanwhile are newer. #
+                with self.lock:
+                    newer = self.pending
+                    self.pending = batch
+                    for path, value in newer.items():
+                        self.merge(path, value)
+                raise
+
+            self.written += 1
+            logging.debug('Flushed {} paths, {} writes in {} updates'.format(
+                len(batch), self.requested, self.written))
+
+
+client = DatabaseClient()
+write_buffer = WriteBuffer()
+atexit.register(write_buffer.flush)
+os.register_at_fork(after_in_child=write_buffer.reset)
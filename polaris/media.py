@@ -0,0 +1,235 @@
+import fcntl
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from threading import Lock
+from time import time
+
+import magic
+
+CHUNK_SIZE = 1024 * 1024
+
+# Files used less than this seconds ago are kept, they may still be waiting in the outbox. #
+GRACE_PERIOD = 300
+
+# Errors of Telegram that mean the id of an uploaded file can't be used anymore. #
+INVALID_REMOTE_ID_ERRORS = ['wrong file identifier', 'wrong remote file identifier', 'file reference expired',
+                            'file_reference_expired', 'file_id_invalid', 'file id invalid']
+
+
+def get_extension(mime):
+    # Servers that don't know the type say it's binary, the content tells more. #
+    if not mime or 'octet-stream' in mime:
+        return None
+    extension = mimetypes.guess_extension(mime.split(';')[0].strip(), strict=False)
+    # I hate to have to use this s***
+    if extension and extension.endswith('jpe'):
+        extension = extension.replace('jpe', 'jpg')
+    return extension
+
+
+# Files named by the hash of their content, so the same file is stored once. #
+# The urls or file ids they were downloaded from are small files in keys/ with the name of the content. #
+# The ids of the uploaded files are in uploads/, by bot and hash of the content. #
+# The least recently used files are removed when the cache is over its quota, unless they are open. #
+# Downloads are kept for max_age seconds, then they are downloaded again. #
+class MediaCache(object):
+    def __init__(self, directory=None, quota=512, max_age=86400):
+        self.directory = os.path.abspath(directory or os.environ.get('POLARIS_MEDIA', 'data/media'))
+        self.quota = quota * 1024 * 1024
+        self.max_age = max_age
+        self.size = None
+        self.scanned = 0
+        self.lock = Lock()
+
+    def configure(self, quota, max_age):
+        self.quota = quota * 1024 * 1024
+        self.max_age = max_age
+
+    def get_key_path(self, key, directory='keys'):
+        return os.path.join(self.directory, directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def read_key(self, key, directory='keys'):
+        try:
+            with open(self.get_key_path(key, directory)) as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def write_key(self, key, value, directory='keys'):
+        key_path = self.get_key_path(key, directory)
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(key_path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                file.write(value)
+            os.replace(temporary, key_path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+    # Keys are written when the file is downloaded, so they tell its age. #
+    def get(self, key, max_age=None):
+        if max_age is not None:
+            try:
+                if os.path.getmtime(self.get_key_path(key)) < time() - max_age:
+                    return None
+            except OSError:
+                return None
+
+        name = self.read_key(key)
+        if not name:
+            return None
+
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    def get_hash(self, path):
+        if os.path.dirname(path) == self.directory:
+            return os.path.splitext(os.path.basename(path))[0]
+
+        content = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                content.update(chunk)
+        return content.hexdigest()
+
+    # Ids that Telegram gave to the files uploaded by every bot, so the same content isn't uploaded again. #
+    def get_upload_key(self, bot, path):
+        return '{}:{}'.format(bot.name, self.get_hash(path))
+
+    def get_remote_id(self, key):
+        return self.read_key(key, 'uploads')
+
+    @staticmethod
+    def is_invalid_remote_id(error):
+        error = (error or '').lower()
+        return any(message in error for message in INVALID_REMOTE_ID_ERRORS)
+
+    def set_remote_id(self, key, remote_id):
+        if remote_id:
+            self.write_key(key, remote_id, 'uploads')
+        else:
+            try:
+                os.remove(self.get_key_path(key, 'uploads'))
+            except OSError:
+                pass
+
+    # Saves the chunks to the cache, the extension is guessed from the content if it isn't given. #
+    def store(self, chunks, key=None, extension=None):
+        os.makedirs(self.directory, exist_ok=True)
+        content = hashlib.sha256()
+        header = b''
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as file:
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        if len(header) < 2048:
+                            header += chunk[:2048]
+                        content.update(chunk)
+                        file.write(chunk)
+            except Exception:
+                os.remove(file.name)
+                raise
+
+        if not extension:
+            extension = get_extension(magic.from_buffer(header, mime=True)) or ''
+        return self.add(file.name, content.hexdigest() + extension, key)
+
+    # A file created by the bot is moved to the cache instead of copied. #
+    def store_file(self, path, key=None, extension=None, move=False):
+        def read():
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                    yield chunk
+
+        extension = extension if extension is not None else os.path.splitext(path)[1]
+        stored = self.store(read(), key, extension)
+        if move:
+            os.remove(path)
+        return stored
+
+    def add(self, temporary, name, key=None):
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            os.remove(temporary)
+            os.utime(path)
+        else:
+            os.replace(temporary, path)
+            with self.lock:
+                if self.size is not None:
+                    self.size += os.path.getsize(path)
+
+        if key:
+            self.write_key(key, os.path.basename(path))
+        self.evict()
+        return path
+
+    # The file is locked while it is open, so it isn't removed while it is uploaded. #
+    def open(self, path):
+        file = open(path, 'rb')
+        if os.path.dirname(path) == self.directory:
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH)
+            os.utime(path)
+        return file
+
+    def get_files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self):
+        with self.lock:
+            # Other processes add files too, so the size is counted again every minute. #
+            if self.size is None or self.scanned < time() - 60:
+                self.size = sum(size for used, size, path in self.get_files())
+                self.scanned = time()
+            if self.size <= self.quota:
+                return
+
+            files = sorted(self.get_files())
+            total = sum(size for used, size, path in files)
+            for used, size, path in files:
+                if total <= self.quota:
+                    break
+                if used > time() - GRACE_PERIOD:
+                    continue
+
+                try:
+                    with open(path, 'rb') as file:
+                        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.remove(path)
+                    total -= size
+                except OSError:
+                    # Open somewhere else. #
+                    continue
+            self.size = total
+            self.remove_keys()
+            logging.debug('Media cache reduced to {} MB'.format(int(total / 1024 / 1024)))
+
+    # Keys of removed files. #
+    def remove_keys(self):
+        directory = os.path.join(self.directory, 'keys')
+        if not os.path.isdir(directory):
+            return
+
+        for entry in os.scandir(directory):
+            try:
+                with open(entry.path) as file:
+                    name = file.read().strip()
+                if not os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+
+media = MediaCache()
@@ -0,0 +1,139 @@
+from threading import RLock
+
+from polaris.database import split_path, write_buffer
+
+# Length of the pieces of the names that are indexed. #
+GRAM_SIZE = 3
+
+
+def get_grams(text):
+    return set(text[index:index + GRAM_SIZE] for index in range(len(text) - GRAM_SIZE + 1))
+
+
+# The case folded usernames and names of the users or groups, and the ids with every piece of a name. #
+class NameTable(object):
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self.names = {}
+        self.usernames = {}
+        self.grams = {}
+
+    def get_name(self, item):
+        if self.attribute == 'groups':
+            parts = [item.get('title')]
+        else:
+            parts = [item.get('first_name'), item.get('last_name')]
+        return ' '.join(part for part in parts if isinstance(part, str) and part).casefold()
+
+    def add(self, id, item):
+        if not isinstance(item, dict):
+            return
+
+        username = item.get('username')
+        username = username.casefold() if isinstance(username, str) and username else None
+        name = self.get_name(item)
+        if not name and not username:
+            return
+
+        self.names[id] = (name, username)
+        if username:
+            self.usernames.setdefault(username, set()).add(id)
+        for gram in get_grams(name):
+            self.grams.setdefault(gram, set()).add(id)
+
+    def remove(self, id):
+        name, username = self.names.pop(id, (None, None))
+        keys = [(username, self.usernames)] if username else []
+        keys += [(gram, self.grams) for gram in get_grams(name or '')]
+        for key, index in keys:
+            if key in index:
+                index[key].discard(id)
+                if not index[key]:
+                    del index[key]
+
+    def find_username(self, username):
+        ids = self.usernames.get(username.casefold())
+        return min(ids) if ids else None
+
+    def search(self, text):
+        text = text.casefold()
+        grams = get_grams(text)
+        if grams:
+            sets = sorted((self.grams.get(gram, set()) for gram in grams), key=len)
+            candidates = set.intersection(*sets) if sets[0] else set()
+        else:
+            candidates = self.names
+
+        matches = [id for id in candidates if text in self.names[id][0]]
+        return min(matches) if matches else None
+
+
+# Usernames and names of the users and groups of the bot, so get_target doesn't go through all of them. #
+class NameIndex(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.tables = {'users': None, 'groups': None}
+        self.sources = {}
+        self.lock = RLock()
+        write_buffer.hooks.append(self.on_write)
+        bot.changes.hooks.append(self.on_change)
+
+    def get_table(self, attribute):
+        with self.lock:
+            store = getattr(self.bot, attribute)
+            if self.tables[attribute] is None or store is not self.sources.get(attribute):
+                self.build(attribute)
+            return self.tables[attribute]
+
+    def build(self, attribute):
+        with self.lock:
+            table = NameTable(attribute)
+            store = getattr(self.bot, attribute)
+            for id in list(store or {}):
+                table.add(str(id), store.get(id))
+            self.tables[attribute] = table
+            self.sources[attribute] = store
+
+    def update(self, attribute, id):
+        with self.lock:
+            table = self.tables[attribute]
+            if table is None:
+                return
+            table.remove(id)
+            table.add(id, getattr(self.bot, attribute).get(id))
+
+    def on_write(self, path, value):
+        keys = split_path(path)
+        if len(keys) < 2 or keys[0] not in self.tables or keys[1] != self.bot.name:
+            return
+
+        if len(keys) == 2:
+            self.tables[keys[0]] = None
+        else:
+            self.update(keys[0], keys[2])
+
+    def on_change(self, attribute, keys, value):
+        if attribute not in self.tables:
+            return
+
+        if not keys:
+            self.tables[attribute] = None
+        else:
+            self.update(attribute, keys[0])
+            self.sources[attribute] = getattr(self.bot, attribute)
+
+    def find_username(self, username):
+        with self.lock:
+            for attribute in ['users', 'groups']:
+                id = self.get_table(attribute).find_username(username)
+                if id:
+                    return id
+
+    # Groups are searched before users, like before the index. #
+    # The text is searched as it is, never as a regular expression, since it's written by the users. #
+    def search(self, text):
+        with self.lock:
+            for attribute in ['groups', 'users']:
+                id = self.get_table(attribute).search(text)
+                if id:
+                    return id
@@ -0,0 +1,338 @@
+import asyncio
+import atexit
+import copy
+import fcntl
+import json
+import logging
+import os
+import random
+import tempfile
+import weakref
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from threading import Event, Lock, Thread
+from time import sleep, time
+from urllib.parse import urlsplit
+
+import aiohttp
+import msgpack
+import requests
+from DictObject import DictObject
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Responses that can be requested again, the others are returned as they are. #
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+# Seconds to wait from the Retry-After header or the retry_after of the Telegram API. #
+def get_retry_after(headers, text):
+    value = headers.get('Retry-After') if headers else None
+    if value:
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time(), 0)
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict) and isinstance(result.get('parameters'), dict) and 'retry_after' in result['parameters']:
+            return max(float(result['parameters']['retry_after']), 0)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+# Files are read again when a request is retried. #
+def rewind(files):
+    for file in (files or {}).values():
+        if isinstance(file, (tuple, list)):
+            file = file[1] if len(file) > 1 else None
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
+
+# Keeps a session for every host, so the connections are reused instead of opened for every request. #
+# Failed requests are retried with exponential backoff, waiting at least what the server asks for. #
+class HttpClient(object):
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, max_retry_after=60, timeout=100, pool_size=10):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.async_sessions = weakref.WeakKeyDictionary()
+        self.lock = Lock()
+
+    def configure(self, retries, max_backoff, max_retry_after, timeout, pool_size):
+        self.retries = retries
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+    def get_session(self, url):
+        parts = urlsplit(url)
+        # Connections can't be shared with the forked processes. #
+        key = (os.getpid(), parts.scheme, parts.netloc)
+        with self.lock:
+            if key not in self.sessions:
+                session = requests.Session()
+                # Only a connection that was closed while it was idle is opened again here. #
+                retries = Retry(total=1, connect=1, read=False, status=0, respect_retry_after_header=False)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retries)
+                session.mount('{}://{}'.format(parts.scheme, parts.netloc), adapter)
+                self.sessions[key] = session
+            return self.sessions[key]
+
+    async def get_async_session(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_sessions:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self.async_sessions[loop] = aiohttp.ClientSession(connector=connector)
+        return self.async_sessions[loop]
+
+    # Sessions are closed with their loop, a closed loop can't close them later. #
+    async def close_async_session(self):
+        session = self.async_sessions.pop(asyncio.get_running_loop(), None)
+        if session:
+            await session.close()
+
+    # None if the server asks to wait longer than max_retry_after, the response is returned instead. #
+    def get_delay(self, attempt, retry_after=None):
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    # Errors of the server are only retried if the request can't have been applied twice. #
+    def can_retry(self, method, attempt, status=None, error=None):
+        if attempt >= self.retries:
+            return False
+        if status is not None:
+            return status == 429 or (status in RETRY_STATUSES and method == 'GET')
+        return method == 'GET' or isinstance(error, (requests.exceptions.ConnectTimeout, aiohttp.ClientConnectorError))
+
+    def request(self, method, url, timeout=None, files=None, **kwargs):
+        attempt = 0
+        while True:
+            rewind(files)
+            try:
+                response = self.get_session(url).request(method, url, files=files,
+                                                         timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if not self.can_retry(method, attempt, error=e):
+                    raise
+                delay = self.get_delay(attempt)
+                logging.warning('Request to {} failed, retrying in {:.1f} seconds: {}'.format(url, delay, e))
+            else:
+                if response.status_code not in RETRY_STATUSES or not self.can_retry(method, attempt, response.status_code):
+                    return response
+                delay = self.get_delay(attempt, get_retry_after(response.headers, response.text))
+                if delay is None:
+                    return response
+                logging.warning('Request to {} returned {}, retrying in {:.1f} seconds'.format(url, response.status_code, delay))
+                response.close()
+            sleep(delay)
+            attempt += 1
+
+    # Returns the status, the text and the final url, the response can't be used after its session is released. #
+    # Forms of aiohttp are consumed when sent, requests with files are sent once. #
+    async def request_async(self, method, url, timeout=None, retry=True, **kwargs):
+        session = await self.get_async_session()
+        attempt = 0 if retry else self.retries
+        while True:
+            try:
+                async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout or self.timeout), **kwargs) as response:
+                    status = response.status
+                    text = await response.text()
+                    final_url = str(response.url)
+                    headers = response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not self.can_retry(method, attempt, error=e):
+                    raise
+                delay = self.get_delay(attempt)
+                logging.warning('Request to {} failed, retrying in {:.1f} seconds: {}'.format(url, delay, e))
+            else:
+                delay = self.get_delay(attempt, get_retry_after(headers, text))
+                if status not in RETRY_STATUSES or not self.can_retry(method, attempt, status) or delay is None:
+                    return status, text, final_url
+                logging.warning('Request to {} returned {}, retrying in {:.1f} seconds'.format(url, status, delay))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+client = HttpClient()
+
+
+# Responses that aren't parsed are a different value, like the final url instead of the JSON. #
+def get_cache_key(method, url, params=None, data=None, headers=None, parse=True):
+    return json.dumps([method, url, params, data, headers, parse], sort_keys=True, default=str)
+
+
+# Responses kept for the seconds that every call asks for, and served for as long again while they are refreshed. #
+# Identical requests made at the same time wait for the first one instead of being sent again. #
+# Every process saves the responses it fetched to the file, merged with the ones saved by the rest. #
+class ResponseCache(object):
+    def __init__(self, size=1000, file=None):
+        self.size = size
+        self.file = file
+        self.entries = OrderedDict()
+        self.loading = {}
+        self.tasks = weakref.WeakKeyDictionary()
+        self.changed = False
+        self.lock = Lock()
+
+    def configure(self, size, file=None):
+        self.size = size
+        if file != self.file:
+            self.file = file
+            if file:
+                self.load()
+                atexit.unregister(self.save)
+                atexit.register(self.save)
+
+    def lookup(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None, None
+            self.entries.move_to_end(key)
+            expires, ttl, value = self.entries[key]
+
+        now = time()
+        if now < expires:
+            return 'fresh', copy.deepcopy(value)
+        elif now < expires + ttl:
+            return 'stale', copy.deepcopy(value)
+        return None, None
+
+    def store(self, key, ttl, value):
+        with self.lock:
+            self.entries[key] = (time() + ttl, ttl, value)
+            self.entries.move_to_end(key)
+            self.changed = True
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    # The fetch function returns the value and if it can be kept, errors aren't. #
+    def get(self, key, ttl, fetch):
+        state, value = self.lookup(key)
+        if state == 'fresh':
+            return value
+        elif state == 'stale':
+            with self.lock:
+                if key in self.loading:
+                    return value
+                self.loading[key] = Event()
+            Thread(target=self.refresh, args=(key, ttl, fetch), daemon=True).start()
+            return value
+
+        with self.lock:
+            event = self.loading.get(key)
+            if not event:
+                self.loading[key] = Event()
+        if event:
+            event.wait()
+            state, value = self.lookup(key)
+            if state:
+                return value
+        return self.refresh(key, ttl, fetch)
+
+    def refresh(self, key, ttl, fetch):
+        try:
+            value, cacheable = fetch()
+            if cacheable:
+                self.store(key, ttl, value)
+            return value
+        except Exception as e:
+            logging.warning('Unable to refresh {}: {}'.format(key, e))
+        finally:
+            with self.lock:
+                event = self.loading.pop(key, None)
+            if event:
+                event.set()
+
+    async def get_async(self, key, ttl, fetch):
+        state, value = self.lookup(key)
+        if state == 'fresh':
+            return value
+
+        loop = asyncio.get_running_loop()
+        tasks = self.tasks.setdefault(loop, {})
+        if key not in tasks:
+            tasks[key] = loop.create_task(self.refresh_async(key, ttl, fetch, tasks))
+        if state == 'stale':
+            return value
+        return copy.deepcopy(await asyncio.shield(tasks[key]))
+
+    async def refresh_async(self, key, ttl, fetch, tasks):
+        try:
+            value, cacheable = await fetch()
+            if cacheable:
+                self.store(key, ttl, value)
+            return value
+        finally:
+            tasks.pop(key, None)
+
+    def read(self):
+        try:
+            with open(self.file, 'rb') as file:
+                return msgpack.unpackb(file.read(), raw=False, strict_map_key=False)
+        except (OSError, ValueError, msgpack.UnpackException) as e:
+            logging.debug('No cached responses in {}: {}'.format(self.file, e))
+            return []
+
+    def load(self):
+        now = time()
+        with self.lock:
+            for key, expires, ttl, value in self.read():
+                if now < expires + ttl:
+                    self.entries[key] = (expires, ttl, DictObject(value) if isinstance(value, dict) else value)
+
+    def save(self):
+        if not self.file:
+            return
+
+        with self.lock:
+            if not self.changed:
+                return
+            entries = dict(self.entries)
+            self.changed = False
+
+        try:
+            directory = os.path.dirname(self.file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Processes save one at a time, so none of them loses the responses of another. #
+            with open(self.file + '.lock', 'w') as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                now = time()
+                for key, expires, ttl, value in self.read():
+                    if now < expires + ttl and (key not in entries or entries[key][0] < expires):
+                        entries[key] = (expires, ttl, value)
+                newest = sorted(entries.items(), key=lambda item: item[1][0])[-self.size:]
+                data = msgpack.packb([[key] + list(entry) for key, entry in newest], use_bin_type=True)
+
+                # Written to another file first, so a crash never leaves it half written. #
+                descriptor, temporary = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+                try:
+                    with os.fdopen(descriptor, 'wb') as file:
+                        file.write(data)
+                    os.replace(temporary, self.file)
+                except Exception:
+                    os.remove(temporary)
+                    raise
+        except OSError as e:
+            logging.warning('Unable to save the cached responses: {}'.format(e))
+
+
+responses = ResponseCache()
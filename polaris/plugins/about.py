@@ -1,7 +1,7 @@
 import subprocess
 
 from firebase_admin import db
-from polaris.utils import get_input, has_tag, is_command, set_data
+from polaris.utils import get_input, get_tagged, has_tag, is_command, set_data
 
 
 class plugin(object):
@@ -13,7 +13,7 @@ class plugin(object):
     # Plugin action #
     def run(self, m):
         text = None
-        if is_command(self, 1, m.content) or is_command(self, 3, m.content):
+        if is_command(self, 1, m) or is_command(self, 3, m):
             try:
                 tag = subprocess.check_output(
                     ['git', 'rev-parse', '--short', 'HEAD']).decode('ascii').rstrip('\n')
@@ -30,7 +30,7 @@ class plugin(object):
             stats = self.bot.trans.plugins.about.strings.stats % (
                 len(self.bot.users), len(self.bot.groups))
 
-            if is_command(self, 1, m.content):
+            if is_command(self, 1, m):
                 text = '%s\n\n%s\n\n%s\n%s\n\n%s\n%s\n\n%s\n\n%s' % (
                     greeting, notice, help, about, version, donations, license, stats)
 
@@ -38,12 +38,12 @@ class plugin(object):
                 text = '%s\n\n%s\n\n%s\n%s\n\n%s' % (
                     greeting, notice, help, about, donations)
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             donations_explanation = self.bot.trans.plugins.about.strings.donations_explanation
             supporters_title = self.bot.trans.plugins.about.strings.supporters
             supporters = ''
-            for uid in self.bot.users:
-                if has_tag(self.bot, uid, 'supporter') or has_tag(self.bot, uid, 'supporter:?'):
+            for uid in sorted(get_tagged(self.bot, 'supporter') | get_tagged(self.bot, 'supporter:?')):
+                if uid in self.bot.users:
                     supporters += '\n • %s' % self.bot.users[uid].first_name
                     if 'last_name' in self.bot.users[uid] and self.bot.users[uid].last_name:
                         supporters += ' %s' % self.bot.users[uid].last_name
@@ -67,7 +67,7 @@ class plugin(object):
         # Update group data #
         gid = str(m.conversation.id)
         if m.conversation.id < 0:
-            if not self.bot.groups:
+            if self.bot.groups is None:
                 self.bot.groups = {}
             if gid in self.bot.groups:
                 self.bot.groups[gid]['title'] = m.conversation.title
@@ -88,7 +88,7 @@ class plugin(object):
             return
 
         uid = str(m.sender.id)
-        if not self.bot.users:
+        if self.bot.users is None:
             self.bot.users = {}
         if uid in self.bot.users:
             self.bot.users[uid]['first_name'] = m.sender.first_name
@@ -26,7 +26,7 @@ class plugin(object):
             return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
         # List all administration commands. #
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             text = self.bot.trans.plugins.admin.strings.commands
             for command in self.commands:
                 # Adds the command and parameters#
@@ -50,19 +50,19 @@ class plugin(object):
             ok = self.bot.send_message(m, text, extra={'format': 'HTML'})
 
         # Title #
-        if is_command(self, 2, m.content):
+        if is_command(self, 2, m):
             if self.check_permissions(m):
                 ok = self.bot.bindings.rename_conversation(
                     m.conversation.id, input)
 
         # Description #
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             if self.check_permissions(m):
                 ok = self.bot.bindings.change_conversation_description(
                     m.conversation.id, input)
 
         # Photo #
-        elif is_command(self, 4, m.content):
+        elif is_command(self, 4, m):
             if self.check_permissions(m):
                 if m.reply and m.reply.type == 'photo':
                     photo = self.bot.bindings.get_file(m.reply.content)
@@ -74,28 +74,28 @@ class plugin(object):
                             m.conversation.id, m.reply.content)
 
         # Promote #
-        elif is_command(self, 5, m.content):
+        elif is_command(self, 5, m):
             if self.check_permissions(m):
                 target = get_target(self.bot, m, get_input(m))
                 ok = self.bot.bindings.promote_conversation_member(
                     m.conversation.id, target)
 
         # Kick #
-        elif is_command(self, 6, m.content):
+        elif is_command(self, 6, m):
             if self.check_permissions(m):
                 target = get_target(self.bot, m, get_input(m))
                 ok = self.bot.bindings.kick_conversation_member(
                     m.conversation.id, target)
 
         # Unban #
-        elif is_command(self, 7, m.content):
+        elif is_command(self, 7, m):
             if self.check_permissions(m):
                 target = get_target(self.bot, m, get_input(m))
                 ok = self.bot.bindings.unban_conversation_member(
                     m.conversation.id, target)
 
         # Delete message #
-        elif is_command(self, 8, m.content):
+        elif is_command(self, 8, m):
             if self.check_permissions(m):
                 self.bot.bindings.delete_message(m.conversation.id, m.id)
                 if m.reply:
@@ -103,20 +103,20 @@ class plugin(object):
                         m.conversation.id, m.reply.id)
 
         # Pin #
-        elif is_command(self, 9, m.content):
+        elif is_command(self, 9, m):
             if self.check_permissions(m):
                 if m.reply:
                     ok = self.bot.send_message(m, 'pinChatMessage', 'api', extra={
                                                'message_id':  m.reply.id})
 
         # Unpin #
-        elif is_command(self, 10, m.content):
+        elif is_command(self, 10, m):
             if self.check_permissions(m):
                 if m.reply:
                     ok = self.bot.send_message(m, 'unpinChatMessage', 'api')
 
         # Custom title #
-        elif is_command(self, 11, m.content):
+        elif is_command(self, 11, m):
             if self.check_permissions(m):
                 if m.reply:
                     target = m.reply.sender.id
@@ -126,8 +126,8 @@ class plugin(object):
                                            'user_id': target, 'custom_title': input})
 
         # Leave #
-        elif is_command(self, 12, m.content):
-            if not is_admin(self.bot, m.sender.id) and not is_mod(self.bot, m.sender.id, m.conversation.id):
+        elif is_command(self, 12, m):
+            if not is_admin(self.bot, m.sender.id, m) and not is_mod(self.bot, m.sender.id, m.conversation.id, m):
                 self.bot.send_message(
                     m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
             else:
@@ -144,7 +144,7 @@ class plugin(object):
                 m, self.bot.trans.errors.admin_required, extra={'format': 'HTML'})
             return False
 
-        if not is_admin(self.bot, m.sender.id) and not is_mod(self.bot, m.sender.id, m.conversation.id):
+        if not is_admin(self.bot, m.sender.id, m) and not is_mod(self.bot, m.sender.id, m.conversation.id, m):
             self.bot.send_message(
                 m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
             return False
@@ -15,6 +15,7 @@ class plugin(object):
     def __init__(self, bot):
         self.bot = bot
         self.commands = self.bot.trans.plugins.administration.commands
+        self.subscriptions = {'types': ['notification']}
 
     # Plugin action #
     def run(self, m):
@@ -23,7 +24,7 @@ class plugin(object):
         gid = str(m.conversation.id)
 
         # List all administration commands. #
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             text = self.bot.trans.plugins.administration.strings.commands
             for command in self.commands:
                 # Adds the command and parameters#
@@ -51,7 +52,7 @@ class plugin(object):
             return self.bot.send_message(m, text, extra={'format': 'HTML'})
 
         # List all groups. #
-        if is_command(self, 2, m.content):
+        if is_command(self, 2, m):
             text = self.bot.trans.plugins.administration.strings.groups
             if len(self.bot.administration) > 0:
                 for gid, attr in self.bot.administration.items():
@@ -71,7 +72,7 @@ class plugin(object):
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': False})
 
         # Join a group. #
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             if not input:
                 return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
@@ -112,13 +113,13 @@ class plugin(object):
                     return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': False})
 
         # Information about a group. #
-        elif is_command(self, 4, m.content) or is_command(self, 16, m.content):
+        elif is_command(self, 4, m) or is_command(self, 16, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
             if not gid in self.bot.administration:
-                if is_command(self, 4, m.content):
+                if is_command(self, 4, m):
                     return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.not_added % m.conversation.title, extra={'format': 'HTML'})
-                elif is_command(self, 16, m.content):
+                elif is_command(self, 16, m):
                     return
 
             text = '<b>%s</b>' % self.bot.groups[gid].title
@@ -135,7 +136,7 @@ class plugin(object):
                     text += '\n %s. <i>%s</i>' % (i, rule)
                     i += 1
 
-            if is_command(self, 4, m.content):
+            if is_command(self, 4, m):
                 if not self.bot.administration[gid].link:
                     text += '\n\n%s' % self.bot.trans.plugins.administration.strings.nolink
                 else:
@@ -144,7 +145,7 @@ class plugin(object):
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': False})
 
         # Rules of a group. #
-        elif is_command(self, 5, m.content):
+        elif is_command(self, 5, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
             if not gid in self.bot.administration:
@@ -170,14 +171,14 @@ class plugin(object):
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': False})
 
         # Set rules #
-        elif is_command(self, 6, m.content):
+        elif is_command(self, 6, m):
             if not input:
                 return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
-            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid):
+            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid, m):
                 return self.bot.send_message(m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
 
             if gid in self.bot.administration:
@@ -189,14 +190,14 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.not_added % m.conversation.title, extra={'format': 'HTML'})
 
         # Set rule #
-        elif is_command(self, 7, m.content):
+        elif is_command(self, 7, m):
             if not input:
                 return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
-            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid):
+            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid, m):
                 return self.bot.send_message(m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
 
             if gid in self.bot.administration:
@@ -216,14 +217,14 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.set % m.conversation.title, extra={'format': 'HTML'})
 
         # Remove rule #
-        elif is_command(self, 8, m.content):
+        elif is_command(self, 8, m):
             if not input:
                 return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
-            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid):
+            if not is_admin(self.bot, uid, m) and not is_mod(self.bot, uid, gid, m):
                 return self.bot.send_message(m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
 
             if gid in self.bot.administration:
@@ -242,7 +243,7 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.set % m.conversation.title, extra={'format': 'HTML'})
 
         # Add mod #
-        elif is_command(self, 9, m.content):
+        elif is_command(self, 9, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -252,7 +253,7 @@ class plugin(object):
             set_tag(self.bot, m.sender.id, 'mod:%s' % gid)
 
         # Remove mod #
-        elif is_command(self, 10, m.content):
+        elif is_command(self, 10, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -262,7 +263,7 @@ class plugin(object):
             del_tag(self.bot, m.sender.id, 'mod:%s' % gid)
 
         # Add group #
-        elif is_command(self, 11, m.content):
+        elif is_command(self, 11, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -284,7 +285,7 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.already_added % m.conversation.title, extra={'format': 'HTML'})
 
         # Remove group #
-        elif is_command(self, 12, m.content):
+        elif is_command(self, 12, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -299,7 +300,7 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.not_added % m.conversation.title, extra={'format': 'HTML'})
 
         # Set alias #
-        elif is_command(self, 13, m.content):
+        elif is_command(self, 13, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -315,7 +316,7 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.not_added % m.conversation.title, extra={'format': 'HTML'})
 
         # Set link #
-        elif is_command(self, 14, m.content):
+        elif is_command(self, 14, m):
             if m.conversation.id > 0:
                 return self.bot.send_message(m, self.bot.trans.errors.group_only, extra={'format': 'HTML'})
 
@@ -331,7 +332,7 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.plugins.administration.strings.not_added % m.conversation.title, extra={'format': 'HTML'})
 
         # Make public #
-        elif is_command(self, 15, m.content):
+        elif is_command(self, 15, m):
             if not input:
                 return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
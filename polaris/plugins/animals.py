@@ -14,7 +14,7 @@ class plugin(object):
         if has_tag(self.bot, m.conversation.id, 'noanimals'):
             return
 
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             url = 'https://api.thecatapi.com/v1/images/search'
             params = {
                 'api_key': self.bot.config.api_keys.cat_api,
@@ -28,7 +28,7 @@ class plugin(object):
             else:
                 return self.bot.send_message(m, self.bot.trans.errors.connection_error)
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             url = 'https://dog.ceo/api/breeds/image/random'
 
             data = send_request(url, bot=self.bot)
@@ -2,7 +2,7 @@ import logging
 import re
 from re import IGNORECASE, compile
 
-from polaris.utils import (del_tag, fix_telegram_link, get_full_name, has_tag,
+from polaris.utils import (del_tag, fix_telegram_link, get_full_name,
                            im_group_admin, is_admin, is_trusted, set_data,
                            set_tag)
 
@@ -20,7 +20,7 @@ class plugin(object):
         spam_types = ['spam', 'arab', 'russian']
 
         for spam_type in spam_types:
-            if has_tag(self.bot, m.sender.id, spam_type):
+            if m.context.has_tag(m.sender.id, spam_type):
                 if not is_admin(self.bot, m.sender.id, m):
                     self.kick_spammer(m, spam_type, 'tag')
                 elif is_trusted(self.bot, m.sender.id, m):
@@ -30,7 +30,7 @@ class plugin(object):
                     self.bot.send_admin_alert(
                         'Unmarking %s: %s [%s] from group %s [%s]' % (spam_type, name, m.sender.id, self.bot.groups[gid].title, gid))
 
-            if m.conversation.id < 0 and has_tag(self.bot, m.conversation.id, spam_type) and not has_tag(self.bot, m.conversation.id, 'safe') and not has_tag(self.bot, m.conversation.id, 'resend:?') and not has_tag(self.bot, m.conversation.id, 'fwd:?'):
+            if m.conversation.id < 0 and m.context.has_tag(m.conversation.id, spam_type) and not m.context.has_tag(m.conversation.id, 'safe') and not m.context.has_tag(m.conversation.id, 'resend:?') and not m.context.has_tag(m.conversation.id, 'fwd:?'):
                 self.kick_myself(m)
 
         if m.extra:
@@ -49,7 +49,7 @@ class plugin(object):
                 except:
                     logging.error(m.extra['caption'])
 
-        if not has_tag(self.bot, m.conversation.id, 'safe') and not has_tag(self.bot, m.conversation.id, 'resend:?') and not has_tag(self.bot, m.conversation.id, 'fwd:?'):
+        if not m.context.has_tag(m.conversation.id, 'safe') and not m.context.has_tag(m.conversation.id, 'resend:?') and not m.context.has_tag(m.conversation.id, 'fwd:?'):
             if m.type == 'text':
                 if self.detect_arab(m.content):
                     self.kick_spammer(m, 'arab', 'content')
@@ -79,7 +79,7 @@ class plugin(object):
             text = m.conversation.title
         else:
             text = m.content
-        if not has_tag(self.bot, m.sender.id, spam_type):
+        if not m.context.has_tag(m.sender.id, spam_type):
             self.bot.send_admin_alert(
                 'Marked as {}: {} [{}] from group {} [{}] for {}: {}'.format(spam_type, name, m.sender.id, self.bot.groups[gid].title, gid, content, text))
             set_tag(self.bot, m.sender.id, spam_type)
@@ -94,10 +94,10 @@ class plugin(object):
                 set_tag(self.bot, gid, spam_type)
                 self.bot.send_admin_alert(
                     'Marked group as %s: %s [%s]' % (spam_type, self.bot.groups[gid].title, gid))
-                if not has_tag(self.bot, m.conversation.id, 'safe') and not has_tag(self.bot, gid, 'resend:?') and not has_tag(self.bot, gid, 'fwd:?'):
+                if not m.context.has_tag(m.conversation.id, 'safe') and not m.context.has_tag(gid, 'resend:?') and not m.context.has_tag(gid, 'fwd:?'):
                     self.kick_myself(m)
 
-        if im_group_admin(self.bot, m) and has_tag(self.bot, m.conversation.id, 'anti' + spam_type):
+        if im_group_admin(self.bot, m) and m.context.has_tag(m.conversation.id, 'anti' + spam_type):
             self.bot.bindings.kick_conversation_member(
                 m.conversation.id, m.sender.id)
             self.bot.send_admin_alert(
@@ -1,7 +1,6 @@
-from polaris.utils import has_tag, wait_until_received
+from polaris.utils import get_tagged, wait_until_received
 from polaris.types import Message, Conversation
 from random import randint
-from datetime import datetime
 import logging
 
 
@@ -10,14 +9,16 @@ class plugin(object):
     def __init__(self, bot):
         self.bot = bot
 
-    def cron(self):
-        if datetime.now().minute == 0 and datetime.now().second < 8:
-            # self.bot.tags = wait_until_received('tags/' + self.bot.name)
+    def schedule(self):
+        self.bot.scheduler.cron('@hourly', self.post)
 
-            topics = ['bdsm']
+    def post(self):
+        # self.bot.tags = wait_until_received('tags/' + self.bot.name)
 
-            for topic in topics:
-                self.send_random_message_to_conversation(topic)
+        topics = ['bdsm']
+
+        for topic in topics:
+            self.send_random_message_to_conversation(topic)
 
     def send_random_message_to_conversation(self, topic = '?'):
         try:
@@ -33,11 +34,4 @@ class plugin(object):
             logging.info('Exception found: ' + str(e))
 
     def get_conversations_to_post(self, topic = '?'):
-        conversations = []
-
-        if self.bot.users:
-            for cid in self.bot.tags:
-                if has_tag(self.bot, cid, 'autopost:' + topic) or has_tag(self.bot, cid, 'autopost'):
-                    conversations.append(cid)
-
-        return conversations
+        return sorted(get_tagged(self.bot, 'autopost:' + topic) | get_tagged(self.bot, 'autopost'))
@@ -1,4 +1,4 @@
-from polaris.utils import (del_tag, first_word, get_input, has_tag, is_admin,
+from polaris.utils import (del_tag, first_word, get_input, is_admin,
                            is_command, is_mod, is_trusted, set_tag)
 
 
@@ -21,11 +21,10 @@ class plugin(object):
         config = {}
 
         for param in enabled:
-            config[param] = not has_tag(
-                self.bot, m.conversation.id, 'no' + param)
+            config[param] = not m.context.has_tag(m.conversation.id, 'no' + param)
 
         for param in disabled:
-            config[param] = has_tag(self.bot, m.conversation.id, param)
+            config[param] = m.context.has_tag(m.conversation.id, param)
 
         text = ''
         if not input:
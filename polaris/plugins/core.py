@@ -62,24 +62,24 @@ class plugin(object):
         text = self.bot.trans.errors.no_results
 
         # Shutdown
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             self.bot.stop()
             text = self.bot.trans.plugins.core.strings.shutting_down
 
         # Reload plugins
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             self.bot.plugins = self.bot.init_plugins()
             text = self.bot.trans.plugins.core.strings.reloading_plugins
 
         # Reload database
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             self.bot.get_database()
             text = self.bot.trans.plugins.core.strings.reloading_database
 
         # Send messages
-        elif is_command(self, 4, m.content):
+        elif is_command(self, 4, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
             target = get_target(self.bot, m, input)
             message = all_but_first_word(input)
@@ -88,17 +88,17 @@ class plugin(object):
             return self.bot.send_message(r, message)
 
         # Run shell commands
-        elif is_command(self, 5, m.content):
+        elif is_command(self, 5, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
             code = '$ %s\n\n%s' % (input, subprocess.getoutput(input))
             return self.bot.send_message(m, '<code class="language-shell">%s</code>' % code, extra={'format': 'HTML'})
 
         # Run python code
-        elif is_command(self, 6, m.content):
+        elif is_command(self, 6, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             cout = StringIO()
@@ -122,9 +122,9 @@ class plugin(object):
             sys.stderr = sys.__stderr__
 
         # Change name
-        elif is_command(self, 7, m.content):
+        elif is_command(self, 7, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             ok = self.bot.bindings.server_request(
                 'setName',  {'first_name': input, 'last_name': '☆'})
 
@@ -132,9 +132,9 @@ class plugin(object):
                 text = self.bot.trans.errors.failed
 
         # Change bio
-        elif is_command(self, 8, m.content):
+        elif is_command(self, 8, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             ok = self.bot.bindings.server_request(
                 'setBio',  {'bio': input})
 
@@ -142,7 +142,7 @@ class plugin(object):
                 text = self.bot.trans.errors.failed
 
         # Change photo
-        elif is_command(self, 9, m.content):
+        elif is_command(self, 9, m):
             ok = False
             if m.reply and m.reply.type == 'photo':
                 photo = self.bot.bindings.get_file(m.reply.content)
@@ -157,9 +157,9 @@ class plugin(object):
                 text = self.bot.trans.errors.failed
 
         # Create webhook
-        elif is_command(self, 10, m.content) and self.bot.config.bindings == 'discord':
+        elif is_command(self, 10, m) and self.bot.config.bindings == 'discord':
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             self.bot.bindings.create_webhook(m.conversation.id, input)
             text = 'Created webhook: "{}"'.format(input)
 
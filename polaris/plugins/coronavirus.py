@@ -1,6 +1,7 @@
-import requests
 from bs4 import BeautifulSoup
 
+from polaris.network import client as http
+from polaris.network import get_cache_key, responses
 from polaris.utils import generate_command_help, get_input
 
 
@@ -20,14 +21,15 @@ class plugin(object):
             url += 'country/' + country.lower().lstrip()
 
         else:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
 
-        res = requests.get(url)
+        # The page is only updated a few times a day. #
+        text = responses.get(get_cache_key('GET', url), 1800, lambda: self.get_page(url))
 
-        if res.status_code != 200:
+        if text is None:
             return self.bot.send_message(m, self.bot.trans.errors.connection_error, extra={'format': 'HTML'})
 
-        soup = BeautifulSoup(res.text, 'html.parser')
+        soup = BeautifulSoup(text, 'html.parser')
 
         try:
             counters = soup.findAll(class_='maincounter-number')
@@ -52,3 +54,13 @@ class plugin(object):
         except Exception as e:
             self.bot.send_message(
                 m, self.bot.trans.errors.no_results, extra={'format': 'HTML'})
+
+    def get_page(self, url):
+        try:
+            res = http.request('GET', url)
+        except Exception:
+            return None, False
+
+        if res.status_code != 200:
+            return None, False
+        return res.text, True
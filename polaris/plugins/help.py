@@ -17,7 +17,7 @@ class plugin(object):
         input = get_input(m)
         commands = []
 
-        if is_command(self, 2, m.content):
+        if is_command(self, 2, m):
             text = ''
         else:
             text = self.bot.trans.plugins.help.strings.commands
@@ -28,7 +28,7 @@ class plugin(object):
                 for command in plugin.commands:
                     command = DictObject(command)
                     # Adds the command and parameters#
-                    if is_command(self, 2, m.content):
+                    if is_command(self, 2, m):
                         show = False
                         if 'parameters' in command and command.parameters:
                             allOptional = True
@@ -80,7 +80,7 @@ class plugin(object):
                                 else:
                                     text += '\n   <i>No description</i>'
 
-        if is_command(self, 2, m.content):
+        if is_command(self, 2, m):
             self.bot.send_message(m, 'setMyCommands', 'api', extra={
                                   'commands': json.dumps(commands)})
 
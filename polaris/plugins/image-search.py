@@ -18,7 +18,7 @@ class plugin(object):
     def run(self, m):
         input = get_input(m, ignore_reply=False)
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         url = 'https://duckduckgo.com/'
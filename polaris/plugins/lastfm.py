@@ -17,7 +17,7 @@ class plugin(object):
 
     # Plugin action #
     def run(self, m):
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             username = get_input(m)
 
             if not username:
@@ -40,7 +40,7 @@ class plugin(object):
                 'user': username
             }
 
-            lastfm = send_request(url, params=params, bot=self.bot)
+            lastfm = send_request(url, params=params, bot=self.bot, cache=30)
 
             # If the user didn't have any tracks or doesn't exist return No Results error. #
             try:
@@ -82,7 +82,7 @@ class plugin(object):
                 'key': self.bot.config.api_keys.google_developer_console
             }
 
-            youtube = send_request(url, params=params, bot=self.bot)
+            youtube = send_request(url, params=params, bot=self.bot, cache=3600)
 
             if not 'error' in youtube and len(youtube['items']) > 0:
                 text += '\n\n🌐 %s\n%s\nhttps://youtu.be/%s' % (
@@ -91,10 +91,10 @@ class plugin(object):
             self.bot.send_message(
                 m, text, extra={'format': 'HTML', 'preview': False})
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             input = get_input(m)
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             # set_setting(self.bot, m.sender.id, 'lastfm.username', input)
@@ -3,8 +3,8 @@ from time import time
 
 from polaris.utils import (all_but_first_word, del_setting, download,
                            first_word, generate_command_help, get_input,
-                           get_setting, has_tag, is_command, send_request,
-                           set_setting)
+                           get_setting, has_tag, is_command, run_concurrently,
+                           send_request, set_setting)
 
 
 class plugin(object):
@@ -54,7 +54,7 @@ class plugin(object):
             uid = str(m.sender.id)
 
         # Get character data
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             summoner_name = None
 
             if not input:
@@ -67,7 +67,7 @@ class plugin(object):
                         summoner_name = summoner_info.split('/')[1]
 
                 if not summoner_name:
-                    return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                    return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
 
             else:
                 if first_word(input).lower() in self.regions:
@@ -81,9 +81,10 @@ class plugin(object):
             if not summoner or 'status' in summoner and summoner['status']['status_code'] != 200:
                 return self.bot.send_message(m, self.bot.trans.errors.connection_error, extra={'format': 'HTML'})
 
-            account = self.account_by_puuid(summoner.puuid)
-            masteries = self.champion_masteries(summoner.id)
-            ranked = self.league_entries(summoner.id)
+            account, masteries, ranked = run_concurrently(
+                lambda: self.account_by_puuid(summoner.puuid),
+                lambda: self.champion_masteries(summoner.id),
+                lambda: self.league_entries(summoner.id))
 
             if self.latest_version:
                 icon_url = "http://ddragon.leagueoflegends.com/cdn/{}/img/profileicon/{}.png".format(
@@ -125,7 +126,7 @@ class plugin(object):
                     'caption': text, 'format': 'HTML', 'preview': True})
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': True})
 
-    def api_request(self, method, params={}, regional=False):
+    def api_request(self, method, params={}, regional=False, cache=None):
         if regional:
             endpoint = 'https://%s.%s' % (self.region['region'], self.base_url)
         else:
@@ -136,26 +137,26 @@ class plugin(object):
             'X-Riot-Token': self.bot.config.api_keys.riot_api
         }
 
-        return send_request(endpoint + method, params, headers=headers)
+        return send_request(endpoint + method, params, headers=headers, cache=cache)
 
     def summoner_by_name(self, summoner_name):
-        return self.api_request('/lol/summoner/v4/summoners/by-name/{}'.format(summoner_name))
+        return self.api_request('/lol/summoner/v4/summoners/by-name/{}'.format(summoner_name), cache=600)
 
     def account_by_puuid(self, puuid):
-        return self.api_request('/riot/account/v1/accounts/by-puuid/{}'.format(puuid), regional=True)
+        return self.api_request('/riot/account/v1/accounts/by-puuid/{}'.format(puuid), regional=True, cache=3600)
 
     def champion_masteries(self, encryptedSummonerId):
-        return self.api_request('/lol/champion-mastery/v4/champion-masteries/by-summoner/{}'.format(encryptedSummonerId))
+        return self.api_request('/lol/champion-mastery/v4/champion-masteries/by-summoner/{}'.format(encryptedSummonerId), cache=300)
 
     def league_entries(self, encryptedSummonerId):
-        return self.api_request('/lol/league/v4/entries/by-summoner/{}'.format(encryptedSummonerId))
+        return self.api_request('/lol/league/v4/entries/by-summoner/{}'.format(encryptedSummonerId), cache=300)
 
     def status(self):
-        return self.api_request('/lol/status/v3/shard-data')
+        return self.api_request('/lol/status/v3/shard-data', cache=60)
 
     def ddragon_versions(self):
         data = send_request(
-            'https://ddragon.leagueoflegends.com/api/versions.json')
+            'https://ddragon.leagueoflegends.com/api/versions.json', cache=3600)
         if data:
             return data[0]
 
@@ -163,7 +164,7 @@ class plugin(object):
 
     def ddragon_champions(self):
         data = send_request(
-            'http://ddragon.leagueoflegends.com/cdn/{}/data/{}/champion.json'.format(self.ddragon_versions(), self.bot.config.locale))
+            'http://ddragon.leagueoflegends.com/cdn/{}/data/{}/champion.json'.format(self.ddragon_versions(), self.bot.config.locale), cache=86400)
         if data:
             return data.data
 
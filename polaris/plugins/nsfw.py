@@ -21,9 +21,9 @@ class plugin(object):
         hentai = '-1001495126561'
         porn = '-1001409180171'
 
-        if is_command(self, 2, m.content):
+        if is_command(self, 2, m):
             cid = hentai
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             cid = porn
         else:
             cid = nsfw
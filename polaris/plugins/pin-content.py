@@ -21,7 +21,7 @@ class plugin(object):
         input = get_input(m)
 
         # List all pins #
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             pins = []
             for pin in self.bot.pins:
                 if 'creator' in self.bot.pins[pin] and self.bot.pins[pin].creator == m.sender.id:
@@ -42,9 +42,9 @@ class plugin(object):
                 return self.bot.send_message(m, self.bot.trans.errors.unknown, extra={'format': 'HTML'})
 
         # Add a pin #
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             if input.startswith('#'):
@@ -74,9 +74,9 @@ class plugin(object):
             return self.bot.send_message(m, self.bot.trans.plugins.pins.strings.pinned % input, extra={'format': 'HTML'})
 
         # Remove a pin #
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             if input.startswith('#'):
@@ -36,7 +36,7 @@ class plugin(object):
         text = None
 
         # Pole ranking
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             if time_in_range(time(1, 0, 0), time(2, 0, 0), now.time()):
                 type = 1
             elif time_in_range(time(12, 0, 0), time(13, 0, 0), now.time()):
@@ -171,7 +171,7 @@ class plugin(object):
                         text += poles_andaluzas
 
         # Pole
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             if self.has_pole(gid, uid, date):
                 return
 
@@ -201,7 +201,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_pole % user
 
         # Subole
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             if self.has_pole(gid, uid, date):
                 return
 
@@ -236,7 +236,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_subpole % user
 
         # Fail
-        elif is_command(self, 4, m.content):
+        elif is_command(self, 4, m):
             if self.has_pole(gid, uid, date):
                 return
 
@@ -270,7 +270,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_fail % user
 
         # Pole canaria
-        elif is_command(self, 5, m.content):
+        elif is_command(self, 5, m):
             if self.has_pole(gid, uid, date, 1):
                 return
 
@@ -302,7 +302,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_pole_canaria % user
 
         # Pole andaluza
-        elif is_command(self, 6, m.content):
+        elif is_command(self, 6, m):
             if self.has_pole(gid, uid, date, 1):
                 return
 
@@ -337,7 +337,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_pole_andaluza % user
 
         # Hierro
-        elif is_command(self, 7, m.content):
+        elif is_command(self, 7, m):
             if self.has_pole(gid, uid, date):
                 return
 
@@ -371,7 +371,7 @@ class plugin(object):
             text = self.bot.trans.plugins.pole.strings.got_iron % user
 
         # Pole reset
-        elif is_command(self, 8, m.content):
+        elif is_command(self, 8, m):
             if has_tag(self.bot, m.conversation.id, 'polereset'):
                 if is_trusted(self.bot, m.sender.id, m):
                     delete_data('poles/%s/%s' % (self.bot.name, gid))
@@ -9,7 +9,7 @@ from firebase_admin import db
 from polaris.types import AutosaveDict, Conversation, Message
 from polaris.utils import (all_but_first_word, catch_exception, first_word,
                            generate_command_help, get_input, init_if_empty,
-                           is_int, set_data, wait_until_received)
+                           is_int, set_data)
 
 
 class plugin(object):
@@ -25,7 +25,7 @@ class plugin(object):
     def run(self, m):
         input = get_input(m, ignore_reply=False)
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         delay = first_word(input)
@@ -50,10 +50,10 @@ class plugin(object):
         if m.sender.username:
             reminder.username = m.sender.username
 
-        self.bot.reminders = wait_until_received('reminders/' + self.bot.name)
         self.sort_reminders()
         self.bot.reminders['list'].append(reminder)
         self.sort_reminders()
+        self.schedule()
 
         if unit == 's':
             delay = delay.replace('s', ' seconds')
@@ -69,8 +69,14 @@ class plugin(object):
 
         return self.bot.send_message(m, message, extra={'format': 'HTML'})
 
+    # The reminders are only checked when the next one is due. #
+    def schedule(self):
+        if self.bot.reminders and 'list' in self.bot.reminders and self.bot.reminders['list']:
+            self.bot.scheduler.at(self.bot.reminders['list'][0].alarm, self.cron)
+        else:
+            self.bot.scheduler.cancel('reminders.cron')
+
     def cron(self):
-        self.bot.reminders = wait_until_received('reminders/' + self.bot.name)
         if not 'list' in self.bot.reminders or not self.bot.reminders['list']:
             self.bot.reminders['list'] = []
 
@@ -84,7 +90,9 @@ class plugin(object):
             self.bot.send_message(m, text, extra={'format': 'HTML'})
             self.bot.reminders['list'].remove(reminder)
             self.sort_reminders()
-            set_data('reminders/%s' % self.bot.name, self.bot.reminders)
+            set_data('reminders/%s/list' % self.bot.name, self.bot.reminders['list'])
+
+        self.schedule()
 
     @staticmethod
     def to_seconds(delaytime, unit):
@@ -106,4 +114,4 @@ class plugin(object):
             self.bot.reminders['list'] = sorted(
                 self.bot.reminders['list'], key=lambda k: k.alarm)
 
-        set_data('reminders/%s' % self.bot.name, self.bot.reminders)
+        set_data('reminders/%s/list' % self.bot.name, self.bot.reminders['list'])
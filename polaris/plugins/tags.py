@@ -20,7 +20,7 @@ class plugin(object):
             return self.bot.send_message(m, self.bot.trans.errors.permission_required, extra={'format': 'HTML'})
 
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         if not m.reply:
@@ -44,14 +44,14 @@ class plugin(object):
             return self.bot.send_message(m, self.bot.trans.errors.no_results, extra={'format': 'HTML'})
 
         # Adds a tag to user or group. #
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             for tag in tags:
                 if not has_tag(self.bot, target, tag):
                     set_tag(self.bot, target, tag)
             return self.bot.send_message(m, self.bot.trans.plugins.tags.strings.tagged % (name, tags), extra={'format': 'HTML'})
 
         # Removes a tag from user or group. #
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             for tag in tags:
                 if has_tag(self.bot, target, tag):
                     del_tag(self.bot, target, tag)
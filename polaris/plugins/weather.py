@@ -4,7 +4,7 @@ from DictObject import DictObject
 
 from polaris.utils import (catch_exception, download, generate_command_help,
                            get_coords, get_input, get_streetview, is_command,
-                           remove_html, send_request)
+                           remove_html, run_concurrently, send_request)
 
 
 class plugin(object):
@@ -18,7 +18,7 @@ class plugin(object):
     def run(self, m):
         input = get_input(m, ignore_reply=False)
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         status, values = get_coords(input, self.bot)
@@ -41,7 +41,10 @@ class plugin(object):
             'lang': 'es'
         }
 
-        data = send_request(url, params, bot=self.bot)
+        # The Street View image is downloaded while the weather is requested. #
+        data, photo = run_concurrently(
+            lambda: send_request(url, params, bot=self.bot, cache=600),
+            lambda: self.get_photo(m, lat, lon))
         logging.info(data)
         if not data or data.cod != 200:
             return self.bot.send_message(m, self.bot.trans.errors.no_results, extra={'format': 'HTML'})
@@ -64,22 +67,15 @@ class plugin(object):
         # except:
         #     pass
 
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             message = u'%s\n%s %s%s\n🌡%sºC 💧%s%% 🌬%s m/s' % (
                 remove_html(title), weather_icon, weather_string, feelslike, temp, humidity, wind)
-            try:
-                photo = get_streetview(
-                    lat, lon, self.bot.config.api_keys.google_developer_console)
-            except Exception as e:
-                catch_exception(e, self.bot)
-                photo = None
-
             if photo:
                 return self.bot.send_message(m, photo, 'photo', extra={'caption': message})
             else:
                 return self.bot.send_message(m, message, extra={'format': 'HTML'})
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             return self.bot.send_message(m, self.bot.trans.errors.not_implemented, extra={'format': 'HTML'})
             # message = self.bot.trans.plugins.weather.strings.titleforecast % (locality, country)
             # for day in forecast:
@@ -93,6 +89,17 @@ class plugin(object):
 
             # return self.bot.send_message(m, message, extra={'format': 'HTML'})
 
+    def get_photo(self, m, lat, lon):
+        if not is_command(self, 1, m):
+            return None
+
+        try:
+            return get_streetview(
+                lat, lon, self.bot.config.api_keys.google_developer_console)
+        except Exception as e:
+            catch_exception(e, self.bot)
+            return None
+
     @staticmethod
     def get_weather_icon(icon):
         weather_emoji = DictObject()
@@ -17,7 +17,7 @@ class plugin(object):
     def run(self, m):
         input = get_input(m, ignore_reply=False)
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         url = 'https://duckduckgo.com/'
@@ -61,7 +61,7 @@ class plugin(object):
         if len(data.results) == 0:
             return self.bot.send_message(m, self.bot.trans.errors.no_results, extra={'format': 'HTML'})
 
-        if not is_command(self, 2, m.content):
+        if not is_command(self, 2, m):
             text = self.bot.trans.plugins.web_search.strings.results % input
             limit = 8
             for item in data.results:
@@ -20,7 +20,7 @@ class plugin(object):
             uid = str(m.sender.id)
 
         # Get character data
-        if is_command(self, 1, m.content) or is_command(self, 2, m.content) or is_command(self, 3, m.content):
+        if is_command(self, 1, m) or is_command(self, 2, m) or is_command(self, 3, m):
             if not input:
                 wow = get_setting(self.bot, uid, 'wow')
                 if wow:
@@ -32,19 +32,19 @@ class plugin(object):
                 realm = ' '.join(input.split()[:-1])
                 character = input.split()[-1]
 
-            if is_command(self, 1, m.content):
+            if is_command(self, 1, m):
                 region = 'eu'
                 locale = 'en_GB'
                 if self.bot.config.translation != 'default':
                     locale = 'es_ES'
 
-            elif is_command(self, 2, m.content):
+            elif is_command(self, 2, m):
                 region = 'us'
                 locale = 'en_US'
                 if self.bot.config.translation != 'default':
                     locale = 'es_MX'
 
-            elif is_command(self, 3, m.content):
+            elif is_command(self, 3, m):
                 set_setting(self.bot, uid, 'wow', '%s/%s' % (realm, character))
                 text = self.bot.trans.plugins.world_of_warcraft.strings.character_set % (character.title(), realm.title())
                 return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': True})
@@ -56,7 +56,7 @@ class plugin(object):
                 'apikey': self.bot.config.api_keys.battle_net
             }
 
-            data = send_request(url, params)
+            data = send_request(url, params, cache=600)
 
             if not data or 'status' in data:
                 return self.bot.send_message(m, self.bot.trans.errors.no_results, extra={'format': 'HTML'})
@@ -83,15 +83,15 @@ class plugin(object):
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': True})
 
         # Reset character
-        elif is_command(self, 4, m.content):
+        elif is_command(self, 4, m):
             del_setting(self.bot, uid, 'wow')
             text = self.bot.trans.plugins.world_of_warcraft.strings.character_reset
             return self.bot.send_message(m, text, extra={'format': 'HTML', 'preview': True})
 
         # Token price
-        elif is_command(self, 5, m.content):
+        elif is_command(self, 5, m):
             url = 'https://wowtokenprices.com/current_prices.json'
-            data = send_request(url)
+            data = send_request(url, cache=600)
 
             if data:
                 text = self.bot.trans.plugins.world_of_warcraft.strings.token_title
@@ -117,7 +117,7 @@ class plugin(object):
             'apikey': self.bot.config.api_keys.battle_net
         }
 
-        data = send_request(url, params)
+        data = send_request(url, params, cache=86400)
         for class_ in data.classes:
             if class_.id == class_id:
                 return class_.name
@@ -134,7 +134,7 @@ class plugin(object):
             'apikey': self.bot.config.api_keys.battle_net
         }
 
-        data = send_request(url, params)
+        data = send_request(url, params, cache=86400)
         for race in data.races:
             if race.id == race_id:
                 return race.name
@@ -14,7 +14,7 @@ class plugin(object):
     def run(self, m):
         input = get_input(m, ignore_reply=False)
         if not input:
-            return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+            return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
             # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
         url = 'https://www.googleapis.com/youtube/v3/search'
@@ -26,18 +26,18 @@ class plugin(object):
             'key': self.bot.config.api_keys.google_developer_console
         }
 
-        data = send_request(url, params, bot=self.bot)
+        data = send_request(url, params, bot=self.bot, cache=3600)
 
         if 'error' in data or int(data.pageInfo.totalResults) == 0:
             return self.bot.send_message(m, self.bot.trans.errors.no_results)
 
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             text = 'https://youtu.be/%s' % data['items'][0].id.videoId
 
             self.bot.send_message(
                 m, text, extra={'format': 'HTML', 'preview': True})
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             text = self.bot.trans.plugins.youtube_search.strings.results % input
             for item in data['items']:
                 if len(item.snippet.title) > 26:
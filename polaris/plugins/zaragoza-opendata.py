@@ -42,16 +42,16 @@ class plugin(object):
         input = get_input(m)
         baseurl = 'http://www.zaragoza.es/api'
 
-        if is_command(self, 1, m.content):
+        if is_command(self, 1, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             url = 'http://api.drk.cat/zgzpls/bus/stations'
             params = {
                 'number': input
             }
-            data = send_request(url, params=params)
+            data = send_request(url, params=params, cache=30)
 
             if not data or 'errors' in data:
                 if data and 'errors' in data and 'status' in data.errors and data.errors.status == '404 Not Found':
@@ -73,9 +73,9 @@ class plugin(object):
 
             return self.bot.send_message(m, text, extra={'format': 'HTML'})
 
-        elif is_command(self, 2, m.content):
+        elif is_command(self, 2, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             url = 'http://api.drk.cat/zgzpls/tram/stations'
@@ -89,7 +89,7 @@ class plugin(object):
                     'street': input
                 }
 
-            data = send_request(url, params=params)
+            data = send_request(url, params=params, cache=30)
 
             if not data or 'errors' in data:
                 if data and 'errors' in data and 'status' in data.errors and data.errors.status == '404 Not Found':
@@ -111,9 +111,9 @@ class plugin(object):
 
             return self.bot.send_message(m, text, extra={'format': 'HTML'})
 
-        elif is_command(self, 3, m.content):
+        elif is_command(self, 3, m):
             if not input:
-                return self.bot.send_message(m, generate_command_help(self, m.content), extra={'format': 'HTML'})
+                return self.bot.send_message(m, generate_command_help(self, m), extra={'format': 'HTML'})
                 # return self.bot.send_message(m, self.bot.trans.errors.missing_parameter, extra={'format': 'HTML'})
 
             url = baseurl + '/recurso/urbanismo-infraestructuras/estacion-bicicleta/' + \
@@ -123,7 +123,7 @@ class plugin(object):
                 'srsname': 'utm30n'
             }
 
-            data = send_request(url, params=params)
+            data = send_request(url, params=params, cache=30)
 
             if not data or 'error' in data or 'errors' in data:
                 if data and 'error' in data and data.error == 'Parametros incorrectos':
@@ -0,0 +1,80 @@
+from polaris.utils import has_tag, is_int
+
+
+# Plugins may declare which messages their always hook wants, for example: #
+# self.subscriptions = {'types': ['photo', 'text'], 'urls': True, 'caption': True, 'groups': True, 'tags': ['resend:?']} #
+# Every declared key must match, 'urls' and 'caption' match if any of them is in the message. #
+# 'extra' matches if any of its keys is in the extra of the message. #
+# A list of subscriptions gets the messages that match any of them. #
+class RoutingTable(object):
+    def __init__(self, bot, plugins):
+        self.bot = bot
+        self.plugins = plugins
+        self.typed = {}
+        self.untyped = []
+        self.routes = {}
+
+        for index, plugin in enumerate(plugins):
+            if not hasattr(plugin, 'always'):
+                continue
+
+            subscriptions = plugin.subscriptions if hasattr(plugin, 'subscriptions') else None
+            for subscription in (subscriptions if isinstance(subscriptions, list) else [subscriptions]):
+                self.add(index, subscription)
+
+    def add(self, index, subscriptions):
+        if subscriptions and 'types' in subscriptions and subscriptions['types']:
+            for type in subscriptions['types']:
+                if type not in self.typed:
+                    self.typed[type] = []
+                self.typed[type].append((index, subscriptions))
+        else:
+            self.untyped.append((index, subscriptions))
+
+    # The hooks of every message type are merged once, in the order of the plugins. #
+    def get_route(self, type):
+        if type not in self.routes:
+            self.routes[type] = sorted(self.untyped + self.typed.get(type, []), key=lambda route: route[0])
+        return self.routes[type]
+
+    def matches(self, msg, subscriptions):
+        if not subscriptions:
+            return True
+
+        if 'groups' in subscriptions and subscriptions['groups']:
+            if not msg.conversation or not is_int(msg.conversation.id) or int(msg.conversation.id) >= 0:
+                return False
+
+        wants_urls = 'urls' in subscriptions and subscriptions['urls']
+        wants_caption = 'caption' in subscriptions and subscriptions['caption']
+        if wants_urls or wants_caption:
+            has_urls = msg.extra and 'urls' in msg.extra and msg.extra['urls']
+            has_caption = msg.extra and 'caption' in msg.extra and msg.extra['caption']
+            if not ((wants_urls and has_urls) or (wants_caption and has_caption)):
+                return False
+
+        if 'extra' in subscriptions and subscriptions['extra']:
+            if not msg.extra or not any(key in msg.extra for key in subscriptions['extra']):
+                return False
+
+        if 'tags' in subscriptions and subscriptions['tags']:
+            if not msg.conversation or not any(self.has_tag(msg, tag) for tag in subscriptions['tags']):
+                return False
+
+        return True
+
+    def has_tag(self, msg, tag):
+        if msg.context:
+            return msg.context.has_tag(msg.conversation.id, tag)
+        return has_tag(self.bot, msg.conversation.id, tag)
+
+    # Returns the indexes of the plugins whose always hook must receive the message. #
+    def get_hooks(self, msg):
+        hooks = set()
+        for index, subscriptions in self.get_route(msg.type):
+            if index not in hooks and self.matches(msg, subscriptions):
+                hooks.add(index)
+        return hooks
+
+    def is_stale(self, plugins):
+        return plugins is not self.plugins
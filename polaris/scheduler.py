@@ -0,0 +1,257 @@
+import heapq
+import itertools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import Queue
+from threading import Condition, Thread
+from time import time
+
+from polaris.utils import catch_exception, get_plugin_name, run_coroutine
+
+CRON_ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *'
+}
+
+
+class CronExpression(object):
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError('Invalid cron expression: {}'.format(expression))
+
+        self.minutes = self.parse_field(fields[0], 0, 59)
+        self.hours = self.parse_field(fields[1], 0, 23)
+        self.days = self.parse_field(fields[2], 1, 31)
+        self.months = self.parse_field(fields[3], 1, 12)
+        self.weekdays = set(day % 7 for day in self.parse_field(fields[4], 0, 7))
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def parse_field(field, minimum, maximum):
+        values = set()
+        for part in field.split(','):
+            step = None
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+
+            if part == '*':
+                start, end = minimum, maximum
+            elif '-' in part:
+                start, end = [int(value) for value in part.split('-', 1)]
+            elif step:
+                start, end = int(part), maximum
+            else:
+                start = end = int(part)
+
+            if start < minimum or end > maximum or start > end or (step is not None and step < 1):
+                raise ValueError('Invalid cron field: {}'.format(field))
+            values.update(range(start, end + 1, step or 1))
+        return values
+
+    def matches_day(self, date):
+        day = date.day in self.days
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        # Like in crontab, if both day fields are restricted any of them can match. #
+        if not self.any_day and not self.any_weekday:
+            return day or weekday
+        return day and weekday
+
+    # Returns the timestamp of the first matching minute after the given one. #
+    def next(self, after):
+        date = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = date + timedelta(days=366 * 5)
+
+        while date < limit:
+            if date.month not in self.months:
+                date = (date.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.matches_day(date):
+                date = date.replace(hour=0, minute=0) + timedelta(days=1)
+            elif date.hour not in self.hours:
+                date = date.replace(minute=0) + timedelta(hours=1)
+            elif date.minute not in self.minutes:
+                date += timedelta(minutes=1)
+            else:
+                return date.timestamp()
+        return None
+
+    def __str__(self):
+        return self.expression
+
+
+class Job(object):
+    def __init__(self, function, when=None, interval=None, cron=None, args=(), name=None):
+        # Plugin methods are stored by name, so the jobs can be sent to the cron process. #
+        if hasattr(function, '__self__') and type(function.__self__).__name__ == 'plugin':
+            self.plugin = get_plugin_name(function.__self__)
+            self.method = function.__name__
+            self.function = None
+        else:
+            self.plugin = None
+            self.method = None
+            self.function = function
+
+        if not name and self.plugin:
+            name = '{}.{}'.format(self.plugin, self.method)
+
+        self.interval = interval
+        self.cron = CronExpression(cron) if cron else None
+        self.args = args
+        self.name = name
+        self.when = self.cron.next(time()) if self.cron and when is None else when
+        self.cancelled = False
+        self.running = False
+
+    def get_next(self, now):
+        if self.interval:
+            when = self.when + self.interval
+            return when if when > now else now + self.interval
+        elif self.cron:
+            return self.cron.next(now)
+        return None
+
+    def __str__(self):
+        return '{} [{}]'.format(self.name, self.cron or self.interval or self.when)
+
+
+class Scheduler(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.requests = Queue()
+        self.owner = None
+        self.heap = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.condition = Condition()
+        self.executor = None
+
+    # METHODS TO REGISTER JOBS #
+
+    def at(self, when, function, *args, name=None):
+        return self.add(Job(function, when=when, args=args, name=name))
+
+    def after(self, delay, function, *args, name=None):
+        return self.at(time() + delay, function, *args, name=name)
+
+    def every(self, interval, function, *args, name=None, now=False):
+        return self.add(Job(function, when=time() if now else time() + interval,
+                            interval=interval, args=args, name=name))
+
+    def cron(self, expression, function, *args, name=None):
+        return self.add(Job(function, cron=expression, args=args, name=name))
+
+    def cancel(self, name):
+        return self.add(Job(None, name=name, when=None))
+
+    # Jobs registered from other processes are sent to the process that runs the scheduler. #
+    def add(self, job):
+        if self.owner != os.getpid():
+            self.requests.put(job)
+            return job
+
+        with self.condition:
+            if job.name and job.name in self.jobs:
+                self.jobs[job.name].cancelled = True
+                del self.jobs[job.name]
+
+            if job.when is not None:
+                if job.name:
+                    self.jobs[job.name] = job
+                heapq.heappush(self.heap, (job.when, next(self.counter), job))
+            self.condition.notify()
+        return job
+
+    def receive_requests(self):
+        while self.bot.started:
+            try:
+                self.add(self.requests.get())
+            except Exception as e:
+                catch_exception(e, self.bot)
+
+    # RUNNING THE JOBS #
+
+    def register_plugins(self):
+        for plugin in self.bot.plugins:
+            try:
+                if hasattr(plugin, 'schedule'):
+                    plugin.schedule()
+
+                # Plugins that only have a cron method keep being called every 5 seconds. #
+                elif hasattr(plugin, 'cron'):
+                    self.every(5, plugin.cron, now=True)
+
+            except Exception as e:
+                catch_exception(e, self.bot)
+
+    def run(self):
+        logging.debug('Starting scheduler...')
+        self.owner = os.getpid()
+        self.executor = ThreadPoolExecutor(max_workers=self.bot.get_config_number('scheduler_workers', 4))
+        Thread(target=self.receive_requests, daemon=True).start()
+        self.register_plugins()
+
+        while self.bot.started:
+            with self.condition:
+                # Sleeps until the next job is due or a new job is added, never polls. #
+                while not self.heap or self.heap[0][0] > time():
+                    self.condition.wait(self.heap[0][0] - time() if self.heap else None)
+
+                when, count, job = heapq.heappop(self.heap)
+                if job.cancelled:
+                    continue
+
+                now = time()
+                next_time = job.get_next(now)
+                if next_time is not None:
+                    job.when = next_time
+                    heapq.heappush(self.heap, (next_time, next(self.counter), job))
+                elif job.name and self.jobs.get(job.name) is job:
+                    del self.jobs[job.name]
+
+                # A slow periodic job is skipped instead of piling up, the rest keep running. #
+                if job.running:
+                    logging.info('Skipping job {}, it is still running'.format(job))
+                    continue
+                job.running = True
+
+            self.executor.submit(self.execute, job)
+
+    def get_function(self, job):
+        if job.function:
+            return job.function
+
+        for plugin in self.bot.plugins:
+            if get_plugin_name(plugin) == job.plugin:
+                return getattr(plugin, job.method)
+        return None
+
+    def execute(self, job):
+        try:
+            function = self.get_function(job)
+            if function and job.plugin:
+                self.bot.bulkheads.call(function, *job.args)
+            elif function:
+                result = function(*job.args)
+                if hasattr(result, '__await__'):
+                    run_coroutine(result)
+            else:
+                logging.error('Job {} has no function'.format(job))
+
+        except KeyboardInterrupt:
+            pass
+
+        except Exception as e:
+            catch_exception(e, self.bot)
+
+        finally:
+            job.running = False
@@ -0,0 +1,260 @@
+import atexit
+import copy
+import logging
+import mmap
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from time import time
+
+import msgpack
+
+from polaris.database import client as database
+from polaris.database import get_storage, join_path, split_path, write_buffer
+from polaris.utils import init_if_empty, wait_until_received
+
+# Changes are fetched from a bit before the snapshot, in case the clocks of the processes differ. #
+SYNC_MARGIN = 60
+
+
+# Sets or deletes (value is None) a path inside a tree, empty parents are removed like in Firebase. #
+def set_path(node, keys, value):
+    if not keys:
+        return value
+
+    if isinstance(node, list):
+        node = dict((str(index), item) for index, item in enumerate(node))
+    elif not isinstance(node, dict):
+        node = {}
+
+    child = set_path(node.get(keys[0]), keys[1:], value) if len(keys) > 1 else value
+    if child is None or child == {}:
+        node.pop(keys[0], None)
+    else:
+        node[keys[0]] = child
+    return node
+
+
+# A tree of the database saved to disk as msgpack, with the time it was synced. #
+# Bots that share a tree, like their translation, share its snapshot. #
+class Snapshot(object):
+    def __init__(self, path, file):
+        self.path = path
+        self.file = file
+        self.time = 0
+        self.data = None
+        self.dirty = False
+        self.written = {}
+        self.lock = Lock()
+        self.sync_lock = Lock()
+        self.save_lock = Lock()
+
+    def load(self):
+        try:
+            with open(self.file, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                snapshot = msgpack.unpackb(data, raw=False, strict_map_key=False)
+            self.time = snapshot['time']
+            self.data = snapshot['data']
+        except (OSError, ValueError, KeyError, TypeError, msgpack.UnpackException) as e:
+            logging.debug('No snapshot of {}: {}'.format(self.path, e))
+            self.time = 0
+            self.data = None
+
+    # Saves are made one at a time, so an older copy never replaces a newer one. #
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                data = msgpack.packb({'time': self.time, 'data': self.data}, use_bin_type=True)
+                self.dirty = False
+
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            # Written to another file first, so a crash never leaves half a snapshot. #
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(self.file),
+                                                     prefix=os.path.basename(self.file) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(data)
+                os.replace(temporary, self.file)
+            except Exception:
+                os.remove(temporary)
+                raise
+
+    def apply(self, keys, value):
+        with self.lock:
+            self.data = set_path(self.data, keys, value)
+            self.dirty = True
+
+    # Children written by the bot, their next entry in the index isn't read back. #
+    def write(self, keys, value):
+        self.apply(keys, value)
+        with self.lock:
+            self.written[keys[0] if keys else '*'] = time()
+
+    def is_written(self, key):
+        with self.lock:
+            written = self.written.pop(key, None)
+        return written is not None and written > time() - SYNC_MARGIN
+
+    def reload(self, storage):
+        data = database.call(storage.get, self.path)
+        with self.lock:
+            self.data = data
+            self.dirty = True
+
+    def sync(self, storage, executor):
+        started = time()
+        if self.data is None:
+            self.reload(storage)
+        else:
+            changes = database.call(storage.since, join_path('changes', self.path), self.time - SYNC_MARGIN) or {}
+            if '*' in changes:
+                self.reload(storage)
+            else:
+                keys = list(changes)
+                values = executor.map(lambda key: database.call(storage.get, join_path(self.path, key)), keys)
+                for key, value in zip(keys, values):
+                    self.apply([key], value)
+                logging.debug('Synced {} changes of {}'.format(len(keys), self.path))
+        self.time = started
+
+
+# Trees are loaded from their snapshots and only their changed children are downloaded. #
+# The process that created the snapshots keeps them current and saves them every few seconds. #
+# The writes of the bot are applied as they are, the ones of other bots are read when the index of changes tells. #
+# Only the writes of WriteBuffer are in the index, so the trees are downloaded again every check_interval seconds #
+# to catch the ones made from the console or by other tools. #
+class Snapshots(object):
+    def __init__(self, directory=None, interval=30, workers=8, check_interval=3600):
+        self.directory = directory or os.environ.get('POLARIS_SNAPSHOTS', 'data/snapshots')
+        self.interval = interval
+        self.workers = workers
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+        self.snapshots = {}
+        self.subscriptions = {}
+        self.event = Event()
+        self.thread = None
+        self.lock = Lock()
+        write_buffer.hooks.append(self.write)
+
+    def configure(self, check_interval):
+        self.check_interval = check_interval
+
+    # Local backends are already on disk. #
+    def is_enabled(self):
+        return getattr(get_storage(), 'remote', False)
+
+    def get(self, path):
+        if not self.is_enabled():
+            return wait_until_received(path)
+
+        if write_buffer.has_pending(path):
+            write_buffer.flush()
+
+        with self.lock:
+            if path not in self.snapshots:
+                self.snapshots[path] = Snapshot(path, os.path.join(self.directory, '{}.msgpack'.format(path.replace('/', '.'))))
+            snapshot = self.snapshots[path]
+
+        # Bots started at the same time sync a shared tree one after the other. #
+        with snapshot.sync_lock:
+            if not snapshot.time:
+                snapshot.load()
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                snapshot.sync(get_storage(), executor)
+
+        # The tree is loaded even if its snapshot can't be saved. #
+        try:
+            snapshot.save()
+        except OSError as e:
+            logging.warning('Unable to save the snapshot of {}: {}'.format(path, e))
+
+        if os.getpid() == self.pid:
+            self.subscribe(snapshot)
+        with snapshot.lock:
+            return init_if_empty(copy.deepcopy(snapshot.data))
+
+    def write(self, path, value):
+        if os.getpid() != self.pid:
+            return
+
+        keys = split_path(path)
+        with self.lock:
+            snapshots = list(self.snapshots.values())
+        for snapshot in snapshots:
+            tree_keys = split_path(snapshot.path)
+            if keys[:len(tree_keys)] == tree_keys and snapshot.data is not None:
+                snapshot.write(keys[len(tree_keys):], copy.deepcopy(value))
+
+    def subscribe(self, snapshot):
+        with self.lock:
+            if snapshot.path in self.subscriptions:
+                return
+            self.subscriptions[snapshot.path] = None
+
+        index = join_path('changes', snapshot.path)
+        state = {'first': True}
+
+        def on_change(path, value):
+            keys = split_path(path)[len(split_path(index)):]
+            if keys:
+                changes = {keys[0]: value}
+            # The first event is the whole index, already synced. #
+            elif state['first']:
+                changes = {}
+            else:
+                changes = value if isinstance(value, dict) else {}
+            state['first'] = False
+
+            try:
+                for key, changed in changes.items():
+                    # The bot wrote it, the snapshot already has its value. #
+                    if snapshot.is_written(key):
+                        pass
+                    elif key == '*':
+                        snapshot.reload(get_storage())
+                    else:
+                        snapshot.apply([key], database.call(get_storage().get, join_path(snapshot.path, key)))
+                    if isinstance(changed, (int, float)):
+                        snapshot.time = max(snapshot.time, changed)
+            except Exception as e:
+                logging.warning('Unable to update the snapshot of {}: {}'.format(snapshot.path, e))
+
+        self.subscriptions[snapshot.path] = get_storage().subscribe(index, on_change)
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if not self.thread:
+                self.thread = Thread(target=self.worker, daemon=True)
+                self.thread.start()
+                atexit.register(self.save)
+
+    def worker(self):
+        checked = time()
+        while not self.event.wait(self.interval):
+            if checked < time() - self.check_interval:
+                self.check()
+                checked = time()
+            self.save()
+
+    def check(self):
+        for path in list(self.subscriptions):
+            try:
+                self.snapshots[path].reload(get_storage())
+            except Exception as e:
+                logging.warning('Unable to check the snapshot of {}: {}'.format(path, e))
+
+    def save(self):
+        with self.lock:
+            snapshots = list(self.snapshots.values())
+        for snapshot in snapshots:
+            if snapshot.dirty:
+                try:
+                    snapshot.save()
+                except Exception as e:
+                    logging.warning('Unable to save the snapshot of {}: {}'.format(snapshot.path, e))
+
+
+snapshots = Snapshots()
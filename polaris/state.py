@@ -0,0 +1,251 @@
+import logging
+import os
+from collections import OrderedDict
+from multiprocessing.connection import Client, Listener
+from threading import Lock, RLock, Thread
+
+from DictObject import DictObject
+
+from polaris.utils import init_if_empty
+
+SHARED_STORES = ['users', 'groups', 'steps', 'tags', 'settings', 'administration', 'pins', 'reminders', 'poles']
+
+# Cached keys that aren't in the store. #
+MISSING = object()
+
+
+# Sets or deletes (value is None) a path of a tree in place, only the nodes of the path are visited. #
+# The tree is returned, it's a new one only if the whole tree is replaced or it wasn't a DictObject. #
+def replace_path(tree, keys, value):
+    if not keys:
+        return init_if_empty(value)
+
+    if not isinstance(tree, DictObject):
+        tree = DictObject(tree) if isinstance(tree, dict) else DictObject()
+
+    node = tree
+    for key in keys[:-1]:
+        if not isinstance(node.get(key), dict):
+            # Nothing to delete. #
+            if value is None:
+                return tree
+            node[key] = DictObject()
+        node = node[key]
+
+    if value is None:
+        node.pop(keys[-1], None)
+    else:
+        node[keys[-1]] = DictObject.objectify(value)
+    return tree
+
+
+# The process that starts the bot owns its stores, its jobs use them through a Unix socket. #
+class StateServer(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.listener = None
+        self.authkey = os.urandom(32)
+        # The stores are changed in place, they aren't sent while they change. #
+        self.lock = RLock()
+
+    def start(self):
+        if not self.listener:
+            self.listener = Listener(family='AF_UNIX', authkey=self.authkey)
+            Thread(target=self.worker, daemon=True).start()
+
+    def worker(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except Exception as e:
+                logging.warning('Unable to accept a state connection: {}'.format(e))
+                continue
+            Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+    def serve(self, connection):
+        try:
+            while True:
+                request = connection.recv()
+                try:
+                    with self.lock:
+                        connection.send((True, self.handle(*request)))
+                except Exception as e:
+                    connection.send((False, e))
+        except (EOFError, OSError):
+            pass
+
+    def handle(self, operation, attribute, *args):
+        store = getattr(self.bot, attribute)
+        if operation == 'get':
+            return (True, store[args[0]]) if args[0] in store else (False, None)
+
+        elif operation == 'tree':
+            return store
+
+        elif operation == 'len':
+            return len(store)
+
+        elif operation == 'write':
+            keys, value = args
+            with self.lock:
+                setattr(self.bot, attribute, replace_path(getattr(self.bot, attribute, None), keys, value))
+            self.bot.changes.broadcast(attribute, keys, value)
+            self.bot.changes.notify(attribute, keys, value)
+
+        else:
+            raise ValueError('Unknown state operation: {}'.format(operation))
+
+    # Called in the jobs, the stores are replaced by clients and the forked copies are freed. #
+    def connect(self):
+        client = StateClient(self.listener.address, self.authkey)
+        size = self.bot.get_config_number('state_cache_size', 1000)
+        for attribute in SHARED_STORES:
+            setattr(self.bot, attribute, SharedStore(client, attribute, size))
+
+
+class StateClient(object):
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self.connection = None
+        self.lock = Lock()
+
+    def request(self, *request):
+        with self.lock:
+            if not self.connection:
+                self.connection = Client(self.address, authkey=self.authkey)
+            self.connection.send(request)
+            success, result = self.connection.recv()
+
+        if not success:
+            raise result
+        return result
+
+
+# Works like the dict of the store, with the last used keys cached. #
+# Changes are made locally, they reach the server when they are written with set_data. #
+class SharedStore(object):
+    def __init__(self, client, attribute, size=1000):
+        self.client = client
+        self.attribute = attribute
+        self.size = size
+        self.cache = OrderedDict()
+        self.tree = None
+        self.version = 0
+        self.lock = RLock()
+
+    def remember(self, key, value, version=None):
+        with self.lock:
+            # A change arrived while the value was requested, so it may be old. #
+            if version is not None and version != self.version:
+                return
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+            if self.tree is not None:
+                if value is MISSING:
+                    self.tree.pop(key, None)
+                else:
+                    self.tree[key] = value
+
+    def fetch(self, key):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            if self.tree is not None:
+                return self.tree.get(key, MISSING)
+            version = self.version
+
+        found, value = self.client.request('get', self.attribute, key)
+        value = value if found else MISSING
+        self.remember(key, value, version)
+        return value
+
+    def get_tree(self):
+        with self.lock:
+            if self.tree is not None:
+                return self.tree
+            version = self.version
+
+        tree = self.client.request('tree', self.attribute)
+        with self.lock:
+            # Keys changed locally and not written yet are kept. #
+            for key, value in self.cache.items():
+                if value is MISSING:
+                    tree.pop(key, None)
+                else:
+                    tree[key] = value
+            if version == self.version:
+                self.tree = tree
+        return tree
+
+    def invalidate(self, keys):
+        with self.lock:
+            if keys:
+                self.cache.pop(keys[0], None)
+            else:
+                self.cache.clear()
+            self.tree = None
+            self.version += 1
+
+    def write(self, keys, value):
+        self.client.request('write', self.attribute, keys, value)
+
+    def __getitem__(self, key):
+        value = self.fetch(key)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.remember(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.remember(key, MISSING)
+
+    def __contains__(self, key):
+        return self.fetch(key) is not MISSING
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def get(self, key, default=None):
+        value = self.fetch(key)
+        return default if value is MISSING else value
+
+    def pop(self, key, default=None):
+        value = self.fetch(key)
+        if value is not MISSING:
+            self.remember(key, MISSING)
+            return value
+        return default
+
+    def __len__(self):
+        with self.lock:
+            if self.tree is not None:
+                return len(self.tree)
+        return self.client.request('len', self.attribute)
+
+    def __iter__(self):
+        return iter(list(self.get_tree()))
+
+    def keys(self):
+        return list(self.get_tree().keys())
+
+    def values(self):
+        return list(self.get_tree().values())
+
+    def items(self):
+        return list(self.get_tree().items())
+
+    def copy(self):
+        return dict(self.get_tree())
@@ -0,0 +1,37 @@
+import firebase_admin
+from firebase_admin import credentials, db
+
+from polaris.database import join_path
+
+
+class storage(object):
+    def __init__(self, path='serviceAccountKey.json'):
+        self.remote = True
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(path), {
+                'databaseURL': 'https://polaris-bot.firebaseio.com/',
+                'storageBucket': 'polaris-bot.appspot.com'
+            })
+
+    def get(self, path):
+        return db.reference(path).get()
+
+    def set(self, path, value):
+        db.reference(path).set(value)
+
+    # Multi-path update, every key is a path that is set to its value. #
+    def update(self, values):
+        db.reference('/').update(values)
+
+    def delete(self, path):
+        db.reference(path).delete()
+
+    def query(self, path, prefix):
+        return db.reference(path).order_by_key().start_at(prefix).end_at(prefix + '\uf8ff').get()
+
+    # Children whose value is a time after the given one, needs ".indexOn": ".value" in the rules. #
+    def since(self, path, time):
+        return db.reference(path).order_by_value().start_at(time).get()
+
+    def subscribe(self, path, callback):
+        return db.reference(path).listen(lambda event: callback(join_path(path, event.path), event.data))
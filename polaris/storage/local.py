@@ -0,0 +1,137 @@
+import copy
+import fcntl
+import os
+from contextlib import contextmanager
+from threading import RLock
+
+from polaris.database import (Subscription, build_tree, flatten, is_list,
+                              join_path, split_path)
+from polaris.types import AutosaveDict
+
+
+# The whole tree is a JSON file, every process reloads it when another one has changed it. #
+class storage(object):
+    def __init__(self, path='data/polaris.json', interval=1):
+        self.path = path
+        self.interval = interval
+        self.mtime = None
+        self.lock = RLock()
+        self.data = AutosaveDict(path, autosafe=False, load_now=False)
+        self.reload()
+
+    def get_mtime(self):
+        return os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else None
+
+    def reload(self):
+        with self.lock:
+            mtime = self.get_mtime()
+            if mtime != self.mtime:
+                self.mtime = mtime
+                if mtime:
+                    self.data.load_database()
+
+    # Writes are serialized between processes with a lock file. #
+    @contextmanager
+    def transaction(self):
+        if os.path.dirname(self.path) and not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+
+        with self.lock, open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.mtime = None
+                self.reload()
+                yield
+                self.data.store_database()
+                self.mtime = self.get_mtime()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def find(self, keys):
+        node = self.data
+        for key in keys:
+            if isinstance(node, list) and key.isdigit() and int(key) < len(node):
+                node = node[int(key)]
+            elif isinstance(node, dict) and key in node:
+                node = node[key]
+            else:
+                return None
+        return node
+
+    def write(self, path, value):
+        # Empty nodes aren't stored, like in Firebase. #
+        value = build_tree('', flatten('', value))
+        keys = split_path(path)
+        if not keys:
+            self.data.clear()
+            self.data.update(value or {})
+            return
+
+        parents = [self.data]
+        for key in keys[:-1]:
+            node = parents[-1]
+            if isinstance(node.get(key), list):
+                node[key] = dict((str(index), item) for index, item in enumerate(node[key]))
+            elif not isinstance(node.get(key), dict):
+                node[key] = {}
+            parents.append(node[key])
+
+        if value is None:
+            parents[-1].pop(keys[-1], None)
+        else:
+            parents[-1][keys[-1]] = value
+
+        # Empty parents are removed and the ones that became lists are converted back. #
+        for depth in range(len(parents) - 1, 0, -1):
+            node = parents[depth]
+            if not node:
+                parents[depth - 1].pop(keys[depth - 1], None)
+            elif is_list(node):
+                parents[depth - 1][keys[depth - 1]] = [node[str(index)] for index in range(len(node))]
+
+    def get(self, path):
+        with self.lock:
+            self.reload()
+            return copy.deepcopy(self.find(split_path(path)))
+
+    def set(self, path, value):
+        with self.transaction():
+            self.write(path, value)
+
+    # Multi-path update, every key is a path that is set to its value. #
+    def update(self, values):
+        with self.transaction():
+            for path, value in values.items():
+                self.write(path, value)
+
+    def delete(self, path):
+        with self.transaction():
+            self.write(path, None)
+
+    def query(self, path, prefix):
+        value = self.get(path)
+        if isinstance(value, list):
+            value = dict((str(index), item) for index, item in enumerate(value))
+        if not isinstance(value, dict):
+            return {}
+        return dict((key, item) for key, item in value.items() if key.startswith(prefix))
+
+    # Children whose value is a time after the given one. #
+    def since(self, path, time):
+        value = self.get(path)
+        if not isinstance(value, dict):
+            return {}
+        return dict((key, item) for key, item in value.items() if isinstance(item, (int, float)) and item >= time)
+
+    def subscribe(self, path, callback):
+        path = join_path(path)
+        state = {'value': self.get(path)}
+
+        def check():
+            value = self.get(path)
+            if value != state['value']:
+                state['value'] = value
+                callback(path, value)
+
+        return Subscription(check, self.interval)
+
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+from threading import local
+
+from polaris.database import (Subscription, build_tree, flatten, is_inside,
+                              join_path, split_path)
+
+
+# The first text after every text that starts with the prefix, None if there isn't one. #
+# Texts are compared by their UTF-8 bytes, the same order as their code points. #
+def get_upper_bound(prefix):
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            # Surrogates can't be encoded. #
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+
+# Every leaf of the tree is a row indexed by its path, so a subtree is a range of the primary key. #
+# Descendants of 'a/b' are between 'a/b/' and 'a/b0', since '0' comes after '/'. #
+class storage(object):
+    def __init__(self, path='data/polaris.sqlite', interval=1):
+        self.path = path
+        self.interval = interval
+        self.pid = None
+        self.local = None
+
+        if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        connection = self.get_connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID')
+        connection.execute('CREATE TABLE IF NOT EXISTS changes (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL)')
+
+    # Connections can't be shared between processes or threads. #
+    def get_connection(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.local = local()
+
+        if not hasattr(self.local, 'connection'):
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return self.local.connection
+
+    def select(self, path, start, end):
+        if end is None:
+            rows = self.get_connection().execute(
+                'SELECT path, value FROM nodes WHERE path = ? OR path >= ? ORDER BY path', (path, start))
+        else:
+            rows = self.get_connection().execute(
+                'SELECT path, value FROM nodes WHERE path = ? OR (path >= ? AND path < ?) ORDER BY path', (path, start, end))
+        return build_tree(path, [(row[0], json.loads(row[1])) for row in rows])
+
+    def get(self, path):
+        path = join_path(path)
+        if not path:
+            return self.select('', '', None)
+        return self.select(path, path + '/', path + '0')
+
+    def write(self, connection, path, value):
+        path = join_path(path)
+        if path:
+            connection.execute('DELETE FROM nodes WHERE path = ? OR (path >= ? AND path < ?)', (path, path + '/', path + '0'))
+            keys = split_path(path)
+            connection.executemany('DELETE FROM nodes WHERE path = ?',
+                                   [('/'.join(keys[:depth]),) for depth in range(1, len(keys))])
+        else:
+            connection.execute('DELETE FROM nodes')
+
+        connection.executemany('INSERT INTO nodes (path, value) VALUES (?, ?)',
+                               [(leaf_path, json.dumps(leaf)) for leaf_path, leaf in flatten(path, value)])
+        connection.execute('INSERT INTO changes (path) VALUES (?)', (path,))
+
+    def transaction(self, values):
+        connection = self.get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for path, value in values:
+                self.write(connection, path, value)
+            # Only the recent changes are needed by the subscriptions. #
+            connection.execute('DELETE FROM changes WHERE id <= last_insert_rowid() - 10000')
+            connection.execute('COMMIT')
+        except:
+            connection.execute('ROLLBACK')
+            raise
+
+    def set(self, path, value):
+        self.transaction([(path, value)])
+
+    # Multi-path update, every key is a path that is set to its value. #
+    def update(self, values):
+        self.transaction(values.items())
+
+    def delete(self, path):
+        self.transaction([(path, None)])
+
+    def query(self, path, prefix):
+        path = join_path(path)
+        if prefix:
+            start = join_path(path, prefix)
+        else:
+            start = path + '/' if path else ''
+        return self.select(path, start, get_upper_bound(start)) or {}
+
+    # Children whose value is a time after the given one. #
+    def since(self, path, time):
+        value = self.get(path)
+        if not isinstance(value, dict):
+            return {}
+        return dict((key, item) for key, item in value.items() if isinstance(item, (int, float)) and item >= time)
+
+    def subscribe(self, path, callback):
+        path = join_path(path)
+        state = {'last': self.get_connection().execute('SELECT COALESCE(MAX(id), 0) FROM changes').fetchone()[0]}
+
+        def check():
+            rows = self.get_connection().execute(
+                'SELECT id, path FROM changes WHERE id > ? ORDER BY id', (state['last'],)).fetchall()
+            for id, changed in rows:
+                state['last'] = id
+                if is_inside(changed, path):
+                    callback(changed, self.get(changed))
+                elif is_inside(path, changed):
+                    callback(path, self.get(path))
+
+        return Subscription(check, self.interval)
@@ -0,0 +1,112 @@
+from threading import RLock
+
+from polaris.database import split_path, write_buffer
+
+
+# Every prefix of a tag that ends in ':', so 'resend:-100:1' gives 'resend:' and 'resend:-100:'. #
+def get_prefixes(tag):
+    return [tag[:index + 1] for index, char in enumerate(tag) if char == ':']
+
+
+# The tags of every target as a set, and the targets of every tag and tag prefix. #
+# The lists of bot.tags are still the stored data, the index follows their writes. #
+class TagIndex(object):
+    def __init__(self, bot):
+        self.bot = bot
+        self.tags = None
+        self.targets = {}
+        self.prefixes = {}
+        self.source = None
+        self.lock = RLock()
+        write_buffer.hooks.append(self.on_write)
+        bot.changes.hooks.append(self.on_change)
+
+    def check(self):
+        # The whole store was replaced, like in a reload of the database. #
+        if self.tags is None or self.bot.tags is not self.source:
+            self.build()
+
+    def build(self):
+        with self.lock:
+            self.tags = {}
+            self.targets = {}
+            self.prefixes = {}
+            self.source = self.bot.tags
+            for target in list(self.source or {}):
+                self.add(target, self.source.get(target))
+
+    def add(self, target, tags):
+        tags = set(tag for tag in tags or [] if tag)
+        if not tags:
+            return
+
+        self.tags[target] = tags
+        for tag in tags:
+            self.targets.setdefault(tag, set()).add(target)
+            for prefix in get_prefixes(tag):
+                self.prefixes.setdefault(prefix, set()).add(target)
+
+    def remove(self, target):
+        for tag in self.tags.pop(target, set()):
+            for key, index in [(tag, self.targets)] + [(prefix, self.prefixes) for prefix in get_prefixes(tag)]:
+                if key in index:
+                    index[key].discard(target)
+                    if not index[key]:
+                        del index[key]
+
+    def update(self, target, tags):
+        with self.lock:
+            if self.tags is None:
+                return
+            self.remove(target)
+            self.add(target, tags)
+
+    def on_write(self, path, value):
+        keys = split_path(path)
+        if keys[:2] != ['tags', self.bot.name]:
+            return
+
+        if len(keys) == 2:
+            self.tags = None
+        else:
+            self.update(keys[2], self.bot.tags.get(keys[2]) if len(keys) > 3 else value)
+
+    def on_change(self, attribute, keys, value):
+        if attribute != 'tags':
+            return
+
+        if not keys:
+            self.tags = None
+        else:
+            self.update(keys[0], self.bot.tags.get(keys[0]) if len(keys) > 1 else value)
+            self.source = self.bot.tags
+
+    def has(self, target, tag):
+        self.check()
+        target = str(target)
+        if '?' not in tag:
+            return tag in self.tags.get(target, ())
+
+        prefix = tag.split('?')[0]
+        if prefix.endswith(':'):
+            return target in self.prefixes.get(prefix, ())
+        return any(target_tag.startswith(prefix) for target_tag in self.tags.get(target, ()))
+
+    def get_matches(self, target, tag):
+        self.check()
+        prefix = tag.split('?')[0]
+        return sorted(target_tag for target_tag in self.tags.get(str(target), ()) if target_tag.startswith(prefix))
+
+    # Targets with the tag, a tag ending in ':?' is a direct lookup of its prefix. #
+    def find(self, tag):
+        self.check()
+        if '?' not in tag:
+            return set(self.targets.get(tag, ()))
+
+        prefix = tag.split('?')[0]
+        if prefix.endswith(':'):
+            return set(self.prefixes.get(prefix, ()))
+
+        with self.lock:
+            return set(target for target_tag, targets in self.targets.items()
+                       if target_tag.startswith(prefix) for target in targets)
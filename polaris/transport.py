@@ -0,0 +1,299 @@
+import atexit
+import logging
+import os
+import pickle
+import struct
+import zlib
+from multiprocessing import Condition, Lock, Queue, Semaphore, Value
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Full
+from time import time
+
+import msgpack
+from DictObject import DictObject
+
+from polaris.triggers import TriggerMatch
+from polaris.types import Conversation, Message, User
+
+# Known types are sent as plain arrays with the values of their slots, the first item tells the type. #
+WIRE_TYPES = [User, Conversation, Message, TriggerMatch]
+WIRE_EXTENSION = 1
+DICT_OBJECT_EXTENSION = 2
+TUPLE_EXTENSION = 3
+PICKLE_EXTENSION = 127
+
+
+def to_wire(obj):
+    cls = type(obj)
+    if cls is Message:
+        return [2, obj.id, to_wire(obj.conversation), to_wire(obj.sender), obj.content, obj.type, obj.date,
+                to_wire(obj.reply) if obj.reply else None, obj.extra, to_wire(obj.match) if obj.match else None]
+    elif cls is User:
+        return [0, obj.id, obj.first_name, obj.last_name, obj.username, obj.is_bot, obj.extra]
+    elif cls is Conversation:
+        return [1, obj.id, obj.title, obj.extra]
+    elif cls is TriggerMatch:
+        return [3, obj.plugin, obj.index, obj.trigger, obj.input, obj.input_reply]
+    return obj
+
+
+def from_wire(data):
+    if not isinstance(data, list):
+        return data
+
+    cls = WIRE_TYPES[data[0]]
+    obj = cls.__new__(cls)
+    for slot, value in zip(cls.__slots__, data[1:]):
+        setattr(obj, slot, value)
+
+    if cls is Message:
+        obj.context = None
+        obj.conversation = from_wire(obj.conversation)
+        obj.sender = from_wire(obj.sender)
+        obj.reply = from_wire(obj.reply)
+        obj.match = from_wire(obj.match)
+    return obj
+
+
+# Objects inside the extra dicts that msgpack doesn't know are still sent, as extensions. #
+# Types are packed strictly, so a DictObject or a tuple comes back as it was and not as a dict or a list. #
+def encode_object(obj):
+    if type(obj) in WIRE_TYPES:
+        return msgpack.ExtType(WIRE_EXTENSION, pack_message(obj))
+    elif type(obj) is DictObject:
+        return msgpack.ExtType(DICT_OBJECT_EXTENSION, pack(dict(obj)))
+    elif type(obj) is tuple:
+        return msgpack.ExtType(TUPLE_EXTENSION, pack(list(obj)))
+    return msgpack.ExtType(PICKLE_EXTENSION, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def decode_object(code, data):
+    if code == WIRE_EXTENSION:
+        return unpack_message(data)
+    elif code == DICT_OBJECT_EXTENSION:
+        return DictObject(unpack(data))
+    elif code == TUPLE_EXTENSION:
+        return tuple(unpack(data))
+    elif code == PICKLE_EXTENSION:
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)
+
+
+def pack(obj):
+    return msgpack.packb(obj, default=encode_object, use_bin_type=True, strict_types=True)
+
+
+def unpack(data):
+    return msgpack.unpackb(data, ext_hook=decode_object, raw=False, strict_map_key=False)
+
+
+def pack_message(msg):
+    return pack(to_wire(msg))
+
+
+def unpack_message(data):
+    return from_wire(unpack(data))
+
+
+# A bounded queue of bytes in shared memory, with the same interface of multiprocessing.Queue. #
+class RingBuffer(object):
+    HEADER = struct.Struct('<QQQ')
+    LENGTH = struct.Struct('<I')
+
+    def __init__(self, size=4 * 1024 * 1024, maxsize=0):
+        self.size = size
+        self.maxsize = maxsize
+        self.memory = SharedMemory(create=True, size=self.HEADER.size + size)
+        self.memory.buf[:self.HEADER.size] = self.HEADER.pack(0, 0, 0)
+        self.lock = Lock()
+        # Writers waiting for room are woken when a message is read. #
+        self.space = Condition(self.lock)
+        self.items = Semaphore(0)
+        self.owner = os.getpid()
+        atexit.register(self.close)
+
+    def get_header(self):
+        return self.HEADER.unpack(bytes(self.memory.buf[:self.HEADER.size]))
+
+    def set_header(self, head, tail, count):
+        self.memory.buf[:self.HEADER.size] = self.HEADER.pack(head, tail, count)
+
+    def write(self, position, data):
+        start = self.HEADER.size + position % self.size
+        first = min(len(data), self.HEADER.size + self.size - start)
+        self.memory.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.memory.buf[self.HEADER.size:self.HEADER.size + len(data) - first] = data[first:]
+
+    def read(self, position, length):
+        start = self.HEADER.size + position % self.size
+        first = min(length, self.HEADER.size + self.size - start)
+        data = bytes(self.memory.buf[start:start + first])
+        if first < length:
+            data += bytes(self.memory.buf[self.HEADER.size:self.HEADER.size + length - first])
+        return data
+
+    # Called with the lock held. #
+    def try_put(self, record):
+        head, tail, count = self.get_header()
+        if tail - head + len(record) > self.size or (self.maxsize > 0 and count >= self.maxsize):
+            return False
+
+        self.write(tail, record)
+        self.set_header(head, tail + len(record), count + 1)
+        return True
+
+    def put(self, data, block=True, timeout=None):
+        record = self.LENGTH.pack(len(data)) + data
+        if len(record) > self.size:
+            raise ValueError('Message of {} bytes is bigger than the ring buffer'.format(len(data)))
+
+        deadline = time() + timeout if timeout is not None else None
+        with self.space:
+            while not self.try_put(record):
+                remaining = deadline - time() if deadline is not None else None
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Full
+                self.space.wait(remaining)
+        self.items.release()
+
+    def put_nowait(self, data):
+        return self.put(data, False)
+
+    def get(self, block=True, timeout=None):
+        if not self.items.acquire(block, timeout):
+            raise Empty
+
+        with self.space:
+            head, tail, count = self.get_header()
+            length = self.LENGTH.unpack(self.read(head, self.LENGTH.size))[0]
+            data = self.read(head + self.LENGTH.size, length)
+            self.set_header(head + self.LENGTH.size + length, tail, count - 1)
+            self.space.notify_all()
+        return data
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def qsize(self):
+        return self.get_header()[2]
+
+    def close(self):
+        if os.getpid() == self.owner and self.memory:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+# A queue of messages that sends them with the configured transport. #
+class MessageQueue(object):
+    def __init__(self, maxsize=0, transport='msgpack', buffer_size=4 * 1024 * 1024):
+        self.transport = transport
+        if transport == 'shared_memory':
+            self.queue = RingBuffer(buffer_size, maxsize)
+        else:
+            self.queue = Queue(maxsize)
+
+    def dumps(self, msg):
+        if self.transport == 'pickle':
+            return msg
+        return pack_message(msg)
+
+    def loads(self, data):
+        if self.transport == 'pickle':
+            return data
+        return unpack_message(data)
+
+    def put(self, msg, block=True, timeout=None):
+        self.queue.put(self.dumps(msg), block, timeout)
+
+    def put_nowait(self, msg):
+        return self.put(msg, False)
+
+    def get(self, block=True, timeout=None):
+        return self.loads(self.queue.get(block, timeout))
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+# Routes the messages of every conversation to the same queue, so they are handled in order. #
+# Every shard has a priority lane and a passive lane, both bounded so an overload drops messages early. #
+# A priority message goes to the passive lane while an earlier message of its conversation is still there, #
+# so the messages of a conversation are never reordered. Only the conversations of this process are known. #
+class ShardedQueue(object):
+    def __init__(self, size=1, high_water=0, priority_high_water=0, max_age=None, priority=None, transport='msgpack', buffer_size=4 * 1024 * 1024):
+        self.size = max(1, int(size))
+        self.max_age = max_age
+        self.priority = priority
+        self.lanes = [(MessageQueue(priority_high_water, transport, buffer_size),
+                       MessageQueue(high_water, transport, buffer_size)) for _ in range(self.size)]
+        # Messages put in every lane, and in any lane, so the handler blocks until there is one. #
+        self.queued = [(Semaphore(0), Semaphore(0)) for _ in range(self.size)]
+        self.available = [Semaphore(0) for _ in range(self.size)]
+        # Messages put and taken from the passive lane of every shard. #
+        self.passive_put = [Value('Q', 0) for _ in range(self.size)]
+        self.passive_taken = [Value('Q', 0) for _ in range(self.size)]
+        self.last_passive = {}
+        self.dropped = 0
+
+    def get_shard(self, msg):
+        if self.size == 1 or not msg.conversation:
+            return 0
+        return zlib.crc32(str(msg.conversation.id).encode()) % self.size
+
+    def is_expired(self, msg):
+        return self.max_age is not None and msg.type != 'inline_query' and msg.date < time() - self.max_age
+
+    def drop(self, msg, reason):
+        self.dropped += 1
+        logging.debug('Dropped message {} ({})'.format(msg, reason))
+        if self.dropped % 100 == 1:
+            logging.warning('Inbox overloaded, {} messages dropped'.format(self.dropped))
+        return False
+
+    def is_waiting(self, shard, conversation):
+        return self.last_passive.get((shard, conversation), 0) > self.passive_taken[shard].value
+
+    def put(self, msg):
+        if self.is_expired(msg):
+            return self.drop(msg, 'expired')
+
+        shard = self.get_shard(msg)
+        conversation = msg.conversation.id if msg.conversation else None
+        lane = 0 if self.priority and self.priority(msg) and not self.is_waiting(shard, conversation) else 1
+        try:
+            if lane == 0:
+                self.lanes[shard][lane].put_nowait(msg)
+            else:
+                with self.passive_put[shard].get_lock():
+                    self.lanes[shard][lane].put_nowait(msg)
+                    self.passive_put[shard].value += 1
+                    self.last_passive[(shard, conversation)] = self.passive_put[shard].value
+        except Full:
+            return self.drop(msg, 'full')
+
+        self.queued[shard][lane].release()
+        self.available[shard].release()
+        if len(self.last_passive) > 10000:
+            self.last_passive = dict((key, number) for key, number in self.last_passive.items()
+                                     if number > self.passive_taken[key[0]].value)
+        return True
+
+    # The lane of the message is counted before it is announced, so its get waits only while it reaches the queue. #
+    def get(self, shard=0):
+        self.available[shard].acquire()
+        if self.queued[shard][0].acquire(False):
+            return self.lanes[shard][0].get()
+
+        self.queued[shard][1].acquire()
+        msg = self.lanes[shard][1].get()
+        with self.passive_taken[shard].get_lock():
+            self.passive_taken[shard].value += 1
+        return msg
+
+    def qsize(self):
+        return sum(lane.qsize() for lanes in self.lanes for lane in lanes)
@@ -0,0 +1,269 @@
+import logging
+import re
+
+from polaris.utils import get_plugin_name
+
+# Commands that always keep the default '/' start symbol when written literally. #
+DEFAULT_COMMANDS = ['/start', '/help', '/config']
+
+# Commands made only by a plain word can be found by the first word of the message. #
+LITERAL_COMMAND = re.compile(r'^/[a-z0-9_]+$')
+
+# Patterns using backreferences can't be merged into a single regex. #
+BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+def trigger_start(command, mode, keep_default=False, prefix='/'):
+    # If the commands are not /start or /help, set the correct command start symbol. #
+    if mode == 'default' or (mode == 'prefix' and keep_default):
+        return command.replace('/', '^/')
+    elif mode == 'inline':
+        return command.replace('/', '^')
+    else:
+        return command.replace('/', '^' + prefix)
+
+
+def build_trigger(command, parameters, mode, space, friendly=False, keep_default=False, prefix='/'):
+    trigger = trigger_start(command, mode, keep_default, prefix)
+
+    if mode != 'default' and not friendly:
+        if not parameters and trigger.startswith('^'):
+            trigger += '$'
+        elif parameters and not space:
+            trigger += '$'
+        elif parameters and space:
+            trigger += ' '
+
+    return trigger
+
+
+class TriggerMatch(object):
+    __slots__ = ('plugin', 'index', 'trigger', 'input', 'input_reply')
+
+    def __init__(self, plugin, index, trigger, input=None, input_reply=None):
+        self.plugin = plugin
+        self.index = index
+        self.trigger = trigger
+        self.input = input
+        self.input_reply = input_reply
+
+    def __str__(self):
+        return '{}:{} [{}]'.format(self.plugin, self.index + 1, self.trigger)
+
+
+class Trigger(object):
+    def __init__(self, plugin, order, command, parameters, friendly=False, keep_default=False, prefix='/'):
+        self.plugin = plugin
+        self.plugin_name = get_plugin_name(plugin)
+        self.order = order
+        self.command = command.lower()
+        self.parameters = parameters
+        self.friendly = friendly
+        self.keep_default = keep_default
+        self.prefix = prefix
+        self.default = self.command in DEFAULT_COMMANDS
+
+        if not friendly and not self.default and LITERAL_COMMAND.search(self.command):
+            self.key = self.command[1:]
+        else:
+            self.key = None
+
+        # Every variant of the trigger is compiled once, the message only selects one. #
+        self.patterns = {}
+        modes = ['inline', 'prefix']
+        if self.default:
+            modes.append('default')
+
+        for mode in modes:
+            for space in [False, True]:
+                trigger = build_trigger(self.command, parameters, mode, space, friendly, keep_default, prefix)
+                self.patterns[(mode, space)] = (trigger,
+                                                re.compile(trigger, flags=re.IGNORECASE),
+                                                re.compile(trigger + '(.+)$', flags=re.IGNORECASE))
+
+    def get_pattern(self, message):
+        if self.default and self.command in message.content:
+            mode = 'default'
+        elif message.type == 'inline_query':
+            mode = 'inline'
+        else:
+            mode = 'prefix'
+
+        return self.patterns[(mode, ' ' in message.content)]
+
+    # Returns the matched command with its input, or None if it doesn't match. #
+    def search(self, message):
+        trigger, pattern, input_pattern = self.get_pattern(message)
+        if not pattern.search(message.content):
+            return None
+
+        input = None
+        input_reply = None
+        if message.type == 'text' or message.type == 'inline_query':
+            # Get the text that is next to the pattern
+            input_match = input_pattern.search(message.content)
+            if input_match and input_match.group(1):
+                input = input_match.group(1)
+
+            if message.reply and message.reply.content:
+                input_match = input_pattern.search(
+                    str(message.content) + ' ' + str(message.reply.content))
+                if input_match and input_match.group(1):
+                    input_reply = input_match.group(1)
+            elif input:
+                input_reply = input
+
+        return TriggerMatch(self.plugin_name, self.order[1], trigger, input, input_reply)
+
+    # Returns every pattern that is implied by any variant of the trigger. #
+    def loose_patterns(self):
+        patterns = []
+        for mode, space in self.patterns:
+            trigger = trigger_start(self.command, mode, self.keep_default, self.prefix)
+            if trigger not in patterns:
+                patterns.append(trigger)
+        return patterns
+
+
+class TriggerIndex(object):
+    def __init__(self, bot, plugins):
+        self.bot = bot
+        self.plugins = plugins
+        self.prefix = bot.config.prefix
+        self.username = bot.info.username
+        self.signature = self.get_signature()
+        self.prefix_pattern = re.compile('^' + self.prefix, flags=re.IGNORECASE)
+
+        self.keyed = {}
+        self.free = []
+        self.unfiltered = []
+        self.free_pattern = None
+        self.count = 0
+
+        for index, plugin in enumerate(plugins):
+            if not hasattr(plugin, 'commands'):
+                continue
+
+            for position, command in enumerate(plugin.commands):
+                if 'parameters' not in command:
+                    command['parameters'] = None
+
+                variants = []
+                if 'command' in command:
+                    variants.append((command['command'], False, False))
+                    if 'keep_default' in command and command['keep_default']:
+                        variants.append((command['command'], False, True))
+
+                if 'friendly' in command:
+                    variants.append((command['friendly'], True, False))
+
+                if 'shortcut' in command:
+                    variants.append((command['shortcut'], False, False))
+                    if 'keep_default' in command and command['keep_default']:
+                        variants.append((command['shortcut'], False, True))
+
+                for variant, (text, friendly, keep_default) in enumerate(variants):
+                    if not isinstance(text, str):
+                        continue
+
+                    try:
+                        trigger = Trigger(plugin, (index, position, variant), text,
+                                          command['parameters'], friendly, keep_default, self.prefix)
+                    except re.error as e:
+                        logging.error('  [Invalid trigger] {} - {}'.format(text, str(e)))
+                        continue
+
+                    self.add(trigger)
+
+        self.compile_free_pattern()
+        logging.debug('  Compiled {} triggers'.format(self.count))
+
+    def add(self, trigger):
+        self.count += 1
+        if trigger.key:
+            if trigger.key not in self.keyed:
+                self.keyed[trigger.key] = []
+            self.keyed[trigger.key].append(trigger)
+
+        elif all(self.can_merge(pattern) for pattern in trigger.loose_patterns()):
+            self.free.append(trigger)
+
+        else:
+            self.unfiltered.append(trigger)
+
+    @staticmethod
+    def can_merge(pattern):
+        if BACKREFERENCE.search(pattern):
+            return False
+        try:
+            re.compile('(?:)|(?:{})'.format(pattern))
+            return True
+        except re.error:
+            return False
+
+    # Free-form triggers are only tested when at least one of them can match. #
+    def compile_free_pattern(self):
+        patterns = []
+        for trigger in self.free:
+            for pattern in trigger.loose_patterns():
+                if pattern not in patterns:
+                    patterns.append(pattern)
+
+        if not patterns:
+            return
+
+        try:
+            self.free_pattern = re.compile('|'.join('(?:{})'.format(pattern) for pattern in patterns),
+                                           flags=re.IGNORECASE)
+        except re.error:
+            self.unfiltered.extend(self.free)
+            self.free = []
+
+    def get_signature(self):
+        return [(id(plugin.commands), len(plugin.commands)) if hasattr(plugin, 'commands') else None
+                for plugin in self.plugins]
+
+    def is_stale(self, plugins):
+        return (plugins is not self.plugins
+                or self.prefix != self.bot.config.prefix
+                or self.username != self.bot.info.username
+                or self.signature != self.get_signature())
+
+    def get_keys(self, message):
+        words = message.content.split(None, 1)
+        if not words:
+            return []
+
+        word = words[0].lower()
+        if message.type == 'inline_query':
+            return [word]
+
+        keys = []
+        match = self.prefix_pattern.search(word)
+        if match:
+            keys.append(word[match.end():])
+        if word.startswith('/') and word[1:] not in keys:
+            keys.append(word[1:])
+        return keys
+
+    # Returns the candidate triggers of the message grouped by plugin index, in the original order. #
+    def get_candidates(self, message, friendly=True):
+        candidates = []
+        for key in self.get_keys(message):
+            if key in self.keyed:
+                candidates.extend(self.keyed[key])
+
+        if self.free and self.free_pattern.search(message.content):
+            candidates.extend(self.free)
+
+        candidates.extend(self.unfiltered)
+
+        grouped = {}
+        for trigger in sorted(candidates, key=lambda t: t.order):
+            if trigger.friendly and not friendly:
+                continue
+            if trigger.order[0] not in grouped:
+                grouped[trigger.order[0]] = []
+            grouped[trigger.order[0]].append(trigger)
+
+        return grouped
@@ -7,6 +7,8 @@ from DictObject import DictObject
 
 
 class User(object):
+    __slots__ = ('id', 'first_name', 'last_name', 'username', 'is_bot', 'extra')
+
     def __init__(self, id, first_name=None, last_name=None, username=None, is_bot=False, extra=None):
         self.id = id
         self.first_name = first_name
@@ -20,6 +22,8 @@ class User(object):
 
 
 class Conversation(object):
+    __slots__ = ('id', 'title', 'extra')
+
     def __init__(self, id, title=None, extra=None):
         self.id = id
         self.title = title
@@ -30,6 +34,8 @@ class Conversation(object):
 
 
 class Message(object):
+    __slots__ = ('id', 'conversation', 'sender', 'content', 'type', 'date', 'reply', 'extra', 'match', 'context')
+
     def __init__(self, id, conversation, sender, content, type='text', date=time(), reply=None, extra=None):
         self.id = id
         self.conversation = conversation
@@ -39,6 +45,17 @@ class Message(object):
         self.date = date
         self.reply = reply
         self.extra = extra
+        self.match = None
+        self.context = None
+
+    # The context belongs to the process that handles the message, it's never copied nor sent. #
+    def __getstate__(self):
+        return dict((slot, getattr(self, slot)) for slot in self.__slots__ if slot != 'context')
+
+    def __setstate__(self, state):
+        self.context = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
     def __str__(self):
         return '[{}] {}'.format(self.type, self.content)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import mimetypes
@@ -6,39 +7,48 @@ import re
 import subprocess
 import tempfile
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from html.parser import HTMLParser
 from re import IGNORECASE, compile
-from time import sleep
+from threading import Lock
+from time import time
 
+import aiohttp
 import magic
-import requests
 from DictObject import DictObject
-from firebase_admin import db
 
-from polaris.types import AutosaveDict
+from polaris.database import client as database
+from polaris.database import get_storage, write_buffer
+from polaris.media import CHUNK_SIZE, media
+from polaris.media import get_extension as get_mime_extension
+from polaris.network import client as http
+from polaris.network import get_cache_key, responses
+from polaris.types import AutosaveDict, Message
 
 
-def set_input(message, trigger):
+def set_input(message, match):
+    message.match = match
+
     if message.type == 'text' or message.type == 'inline_query':
-        # Get the text that is next to the pattern
-        input_match = re.compile(
-            trigger + '(.+)$', flags=re.IGNORECASE).search(message.content)
-        if input_match and input_match.group(1):
-            message.extra['input'] = input_match.group(1)
-
-        # Get the text that is next to the pattern
-        if message.reply and message.reply.content:
-            input_match = re.compile(trigger + '(.+)$', flags=re.IGNORECASE).search(
-                str(message.content) + ' ' + str(message.reply.content))
-            if input_match and input_match.group(1):
-                message.extra['input_reply'] = input_match.group(1)
-        elif 'input' in message.extra:
-            message.extra['input_reply'] = message.extra['input']
+        if message.extra is None:
+            message.extra = {}
+
+        if match.input:
+            message.extra['input'] = match.input
+
+        if match.input_reply:
+            message.extra['input_reply'] = match.input_reply
 
     return message
 
 
 def get_input(message, ignore_reply=True):
+    if message.match:
+        if ignore_reply:
+            return message.match.input
+        else:
+            return message.match.input_reply
+
     if message.extra:
         if ignore_reply and 'input' in message.extra:
             return message.extra['input']
@@ -63,6 +73,11 @@ def get_input_legacy(message, ignore_reply=True):
 
 
 def get_command_index(plugin, text):
+    if isinstance(text, Message):
+        if text.match and text.match.plugin == get_plugin_name(plugin):
+            return text.match.index
+        text = text.content
+
     if isinstance(text, str) and text.endswith('@' + plugin.bot.info.username) and ' ' not in text:
         text = text.replace('@' + plugin.bot.info.username, '')
 
@@ -112,6 +127,12 @@ def get_command(message, bot):
 
 
 def is_command(plugin, number, text):
+    # The command matched by the dispatcher is already known. #
+    if isinstance(text, Message):
+        if text.match and text.match.plugin == get_plugin_name(plugin):
+            return text.match.index == number - 1
+        text = text.content
+
     if isinstance(text, str) and text.endswith('@' + plugin.bot.info.username) and ' ' not in text:
         text = text.replace('@' + plugin.bot.info.username, '')
 
@@ -190,43 +211,24 @@ def del_setting(bot, uid, key):
 
 
 def has_tag(bot, target, tag, return_match=False):
-    if not isinstance(target, str):
-        target = str(target)
-    tags = []
-    if target in bot.tags and '?' in tag:
-        for target_tag in bot.tags[target]:
-            if not target_tag:
-                bot.tags[target].remove(target_tag)
-                set_data('tags/{}/{}'.format(bot.name, target),
-                         bot.tags[target])
-
-            if target_tag and target_tag.startswith(tag.split('?')[0]):
-                if return_match:
-                    tags.append(target_tag)
-                else:
-                    return True
-
-        if return_match:
-            return tags
-        else:
-            return False
+    if return_match and '?' in tag:
+        return bot.tag_index.get_matches(target, tag)
+    return bot.tag_index.has(target, tag)
 
-    elif target in bot.tags and tag in bot.tags[target]:
-        return True
 
-    else:
-        return False
+# Targets with the tag, 'tag:?' finds the targets with any tag starting with 'tag:'. #
+def get_tagged(bot, tag):
+    return bot.tag_index.find(tag)
 
 
 def set_tag(bot, target, tag):
     if not isinstance(target, str):
         target = str(target)
 
-    if not target in bot.tags:
-        bot.tags[target] = []
-
-    if not tag in bot.tags[target]:
-        bot.tags[target].append(tag)
+    if not has_tag(bot, target, tag):
+        tags = [target_tag for target_tag in bot.tags.get(target) or [] if target_tag]
+        tags.append(tag)
+        bot.tags[target] = tags
         set_data('tags/{}/{}'.format(bot.name, target), bot.tags[target])
         return True
 
@@ -235,25 +237,23 @@ def del_tag(bot, target, tag):
     if not isinstance(target, str):
         target = str(target)
 
-    if target in bot.tags and '?' in tag:
-        for target_tag in bot.tags[target]:
-            if target_tag.startswith(tag.split('?')[0]):
-                bot.tags[target].remove(target_tag)
-                set_data('tags/{}/{}'.format(bot.name, target),
-                         bot.tags[target])
-                break
+    # 'tag:?' deletes every tag starting with 'tag:'. #
+    if '?' in tag:
+        tags = set(has_tag(bot, target, tag, return_match=True))
+    else:
+        tags = set([tag]) if has_tag(bot, target, tag) else set()
 
-    elif target in bot.tags and tag in bot.tags[target]:
-        bot.tags[target].remove(tag)
+    if tags:
+        bot.tags[target] = [target_tag for target_tag in bot.tags[target] if target_tag and target_tag not in tags]
         set_data('tags/{}/{}'.format(bot.name, target), bot.tags[target])
 
 
 def is_group_admin(bot, uid, m=None):
+    if m and m.context:
+        return m.context.is_group_admin(uid)
+
     if m and m.conversation.id < 0:
-        chat_admins = bot.get_chat_admins(m.conversation.id)
-        for admin in chat_admins:
-            if uid == str(admin.id):
-                return True
+        return str(uid) in bot.chat_admins.get_ids(m.conversation.id)
 
     return False
 
@@ -273,6 +273,9 @@ def is_trusted(bot, uid, m=None):
     if not isinstance(uid, str):
         uid = str(uid)
 
+    if m and m.context:
+        return m.context.is_trusted(uid)
+
     return has_tag(bot, uid, 'trusted')
 
 
@@ -280,6 +283,9 @@ def is_admin(bot, uid, m=None):
     if not isinstance(uid, str):
         uid = str(uid)
 
+    if m and m.context:
+        return m.context.is_admin(uid)
+
     if is_owner(bot, uid):
         return True
 
@@ -292,10 +298,13 @@ def is_admin(bot, uid, m=None):
     return False
 
 
-def is_mod(bot, uid, gid):
+def is_mod(bot, uid, gid, m=None):
     if not isinstance(uid, str):
         uid = str(uid)
 
+    if m and m.context:
+        return m.context.is_mod(uid, gid)
+
     if has_tag(bot, uid, 'globalmod') or has_tag(bot, uid, 'mod:{}'.format(gid)):
         return True
 
@@ -454,49 +463,134 @@ def load_plugin_list():
     return sorted(plugin_list)
 
 
-def send_request(url, params=None, headers=None, files=None, data=None, post=False, parse=True, verify=True, bot=None, return_error_response=False):
+# Responses of GET and POST requests without files are kept for the seconds given in cache. #
+def send_request(url, params=None, headers=None, files=None, data=None, post=False, parse=True, verify=True, bot=None, return_error_response=False, timeout=None, cache=None):
+    if cache and not files:
+        key = get_cache_key('POST' if post else 'GET', url, params, data, headers, parse)
+        return responses.get(key, cache, lambda: fetch_response(url, params, headers, files, data, post, parse, verify, bot, timeout))
+    return fetch_response(url, params, headers, files, data, post, parse, verify, bot, timeout)[0]
+
+
+# The result of the request, and if it was successful and can be cached. #
+def fetch_response(url, params=None, headers=None, files=None, data=None, post=False, parse=True, verify=True, bot=None, timeout=None):
     try:
-        if post:
-            r = requests.post(url, params=params, headers=headers,
-                              files=files, data=data, timeout=100, verify=verify)
-        else:
-            r = requests.get(url, params=params, headers=headers,
-                             files=files, data=data, timeout=100, verify=verify)
-    except:
-        logging.error('Error making request to: {}'.format(url))
+        r = http.request('POST' if post else 'GET', url, params=params, headers=headers,
+                         files=files, data=data, timeout=timeout, verify=verify)
+    except Exception as e:
+        logging.error('Error making request to: {} ({})'.format(url, e))
         if bot:
             bot.send_alert('Error making request to: {}'.format(url))
-        if verify:
-            return send_request(url, params, headers, files, data, post, parse, False, bot)
-        else:
-            return None
+        return None, False
 
     if r.status_code != 200:
         logging.error(r.text)
         if bot:
             bot.send_alert(r.text)
 
-        while r.status_code == 429:
-            sleep(5)
-            return send_request(url, params, headers, files, data, post, parse, bot=bot)
+    return parse_response(r.status_code, r.text, r.url, parse)
+
+
+def parse_response(status, text, final_url, parse):
     try:
         if parse:
             try:
-                result = json.loads(r.text)
+                result = json.loads(text)
                 if isinstance(result, dict):
-                    return DictObject(result)
-                return result
+                    return DictObject(result), status == 200
+                return result, status == 200
             except Exception as e:
-                logging.error(r.text)
+                logging.error(text)
                 catch_exception(e)
-                return r.text
+                return text, False
 
         else:
-            return r.url
+            return final_url, status == 200
     except Exception as e:
-        logging.error(r.text)
+        logging.error(text)
         catch_exception(e)
-        return None
+        return None, False
+
+
+async def send_request_async(url, params=None, headers=None, files=None, data=None, post=False, parse=True, verify=True, bot=None, return_error_response=False, timeout=None, cache=None):
+    if cache and not files:
+        key = get_cache_key('POST' if post else 'GET', url, params, data, headers, parse)
+        return await responses.get_async(key, cache, lambda: fetch_response_async(url, params, headers, files, data, post, parse, verify, bot, timeout))
+    return (await fetch_response_async(url, params, headers, files, data, post, parse, verify, bot, timeout))[0]
+
+
+async def fetch_response_async(url, params=None, headers=None, files=None, data=None, post=False, parse=True, verify=True, bot=None, timeout=None):
+    if files:
+        form = aiohttp.FormData(data or {})
+        for name, file in files.items():
+            form.add_field(name, file)
+        data = form
+
+    try:
+        status, text, final_url = await http.request_async('POST' if post else 'GET', url, timeout=timeout, retry=not files,
+                                                           params=params, headers=headers, data=data, ssl=None if verify else False)
+    except Exception as e:
+        logging.error('Error making request to: {} ({})'.format(url, e))
+        if bot:
+            bot.send_alert('Error making request to: {}'.format(url))
+        return None, False
+
+    if status != 200:
+        logging.error(text)
+        if bot:
+            bot.send_alert(text)
+
+    return parse_response(status, text, final_url, parse)
+
+
+# Runs a coroutine from synchronous code, even if this thread is already running an event loop. #
+async def run_and_close(coroutine):
+    try:
+        return await coroutine
+    finally:
+        await http.close_async_session()
+
+
+# The loop only lasts for the coroutine, so the HTTP session it opened is closed with it. #
+def run_coroutine(coroutine):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_and_close(coroutine))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run_and_close(coroutine)).result()
+
+
+# Threads of run_concurrently, created for every process the first time they are used. #
+concurrent_executors = {}
+concurrent_lock = Lock()
+
+
+def get_concurrent_executor():
+    with concurrent_lock:
+        if os.getpid() not in concurrent_executors:
+            concurrent_executors[os.getpid()] = ThreadPoolExecutor(max_workers=16, thread_name_prefix='concurrent')
+        return concurrent_executors[os.getpid()]
+
+
+# Makes independent calls at the same time and returns their results in order. #
+# Calls that fail or don't finish before the timeout return None, so a slow service doesn't hold the others. #
+def run_concurrently(*functions, timeout=30):
+    futures = [get_concurrent_executor().submit(function) for function in functions]
+    done, pending = wait(futures, timeout=timeout)
+
+    results = []
+    for function, future in zip(functions, futures):
+        if future in pending:
+            future.cancel()
+            logging.warning('{} took more than {} seconds'.format(getattr(function, '__name__', function), timeout))
+            results.append(None)
+        elif future.exception():
+            logging.warning('{} failed: {}'.format(getattr(function, '__name__', function), future.exception()))
+            results.append(None)
+        else:
+            results.append(future.result())
+    return results
 
 
 def get_coords(input, bot=None):
@@ -542,43 +636,44 @@ def get_streetview(latitude, longitude, key, size='640x320', fov=90, heading=235
     return download(url, params=params)
 
 
-def download(url, params=None, headers=None, method='get', extension=None, verify=True):
+# Headers that change the file the server sends, the rest don't split the cache. #
+DOWNLOAD_CACHE_HEADERS = ['accept', 'accept-language', 'authorization', 'cookie']
+
+
+def get_download_key(method, url, params=None, headers=None):
+    headers = dict((name.lower(), value) for name, value in (headers or {}).items()
+                   if name.lower() in DOWNLOAD_CACHE_HEADERS)
+    return get_cache_key(method.upper(), url, params, headers=headers or None)
+
+
+# Downloads are kept in the media cache, by the url, params and headers or by the key given. #
+# cache is the seconds a download is reused, True for the max age of the media cache and False to always download it. #
+def download(url, params=None, headers=None, method='get', extension=None, verify=True, key=None, cache=True):
+    key = key or get_download_key(method, url, params, headers)
+    if cache is not False:
+        path = media.get(key, media.max_age if cache is True else cache)
+        if path:
+            return path
+
     try:
-        if method == 'post':
-            res = requests.post(url, params=params,
-                                headers=headers, stream=True, verify=verify)
-        else:
-            res = requests.get(url, params=params,
-                               headers=headers, stream=True, verify=verify)
-        if not extension:
-            extension = get_extension(url)
-        f = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
-        for chunk in res.iter_content(chunk_size=1024):
-            if chunk:
-                f.write(chunk)
+        res = http.request('POST' if method == 'post' else 'GET', url, params=params,
+                           headers=headers, stream=True, verify=verify)
+        with res:
+            if res.status_code != 200:
+                logging.error('Error downloading {}: {}'.format(url, res.status_code))
+                return None
+
+            if not extension:
+                extension = get_extension(url) or get_mime_extension(res.headers.get('Content-Type'))
+            return media.store(res.iter_content(chunk_size=CHUNK_SIZE), key if cache is not False else None, extension)
     except Exception as e:
         logging.error(e)
-        if verify:
-            return download(url, params, headers, method, extension, False)
-        else:
-            return None
         return None
-    f.seek(0)
-    if not extension:
-        f.name = fix_extension(f.name)
-    return f.name
 
 
 def save_to_file(res):
-    ext = os.path.splitext(res.url)[1].split('?')[0]
-    f = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-    for chunk in res.iter_content(chunk_size=1024):
-        if chunk:
-            f.write(chunk)
-    f.seek(0)
-    if not ext:
-        f.name = fix_extension(f.name)
-    return open(f.name, 'rb')
+    extension = get_extension(res.url) or get_mime_extension(res.headers.get('Content-Type'))
+    return media.open(media.store(res.iter_content(chunk_size=CHUNK_SIZE), extension=extension))
 
 
 def get_extension(path):
@@ -610,6 +705,12 @@ def get_short_url(long_url, api_key):
 
 
 def mp3_to_ogg(input):
+    # Files of the media cache are named by their content, so their conversion can be kept too. #
+    key = 'ogg:' + os.path.basename(input) if os.path.dirname(input) == media.directory else None
+    output = media.get(key) if key else None
+    if output:
+        return output
+
     try:
         output = tempfile.NamedTemporaryFile(delete=False, suffix='.ogg').name
         with open(os.devnull, "w") as DEVNULL:
@@ -618,7 +719,7 @@ def mp3_to_ogg(input):
                     'libopus', '-b:a', '16k', '-y', output],
                 stdout=DEVNULL)
 
-        return output
+        return media.store_file(output, key, '.ogg', move=True)
     except Exception as e:
         logging.info('ffmpeg -i ' + input +
                      '-ac 1 -c:a opus -b:a 16k -y ' + output)
@@ -696,13 +797,7 @@ def get_target(bot, m, input):
             if bot.info.username.lower() == target[1:].lower():
                 return str(bot.info.id)
 
-            for uid in bot.users:
-                if 'username' in bot.users[uid] and isinstance(bot.users[uid].username, str) and bot.users[uid].username.lower() == target[1:].lower():
-                    return str(uid)
-
-            for gid in bot.groups:
-                if 'username' in bot.groups[gid] and isinstance(bot.groups[gid].username, str) and bot.groups[gid].username.lower() == target[1:].lower():
-                    return str(uid)
+            return bot.name_index.find_username(target[1:])
 
         elif target.startswith('<@'):
             return re.sub(r'<@!?([\d]+)>', r'\1', target, flags=re.MULTILINE)
@@ -711,18 +806,7 @@ def get_target(bot, m, input):
             return str(m.conversation.id)
 
         else:
-            for gid in bot.groups:
-                if re.compile(target, flags=re.IGNORECASE).search(bot.groups[gid].title):
-                    return gid
-
-            for uid in bot.users:
-                name = ''
-                if 'first_name' in bot.users[uid]:
-                    name += bot.users[uid].first_name
-                if 'last_name' in bot.users[uid]:
-                    name += bot.users[uid].last_name
-                if re.compile(target, flags=re.IGNORECASE).search(name):
-                    return uid
+            return bot.name_index.search(target)
 
     elif m.reply:
         return str(m.reply.sender.id)
@@ -745,48 +829,74 @@ def init_if_empty(_dict):
         return {}
 
 
-def catch_exception(exception, bot=None):
+# Time of the last alert sent for every origin and the number of alerts skipped since then. #
+last_alerts = {}
+last_alerts_lock = Lock()
+
+
+# Returns the name of the last plugin in the traceback, or 'core' if it didn't happen in a plugin. #
+def get_exception_origin(exception):
+    origin = 'core'
+    for frame, line in traceback.walk_tb(exception.__traceback__):
+        path = frame.f_code.co_filename
+        if os.path.basename(os.path.dirname(path)) == 'plugins':
+            origin = os.path.splitext(os.path.basename(path))[0]
+    return origin
+
+
+def catch_exception(exception, bot=None, origin=None):
     logging.info('Catched exception: ' + exception.__class__.__name__)
     logging.exception(traceback.format_exc())
     if bot:
-        bot.send_alert(traceback.format_exc())
+        # Alerts are rate limited by origin, so a broken plugin doesn't flood the alerts conversation. #
+        if not origin:
+            origin = get_exception_origin(exception)
+        interval = bot.get_config_number('alerts_interval', 60) if hasattr(bot, 'get_config_number') else 60
+        # Plugins fail in several threads at the same time. #
+        with last_alerts_lock:
+            last_alert, skipped = last_alerts.get(origin, (0, 0))
+
+            if time() - last_alert < interval:
+                last_alerts[origin] = (last_alert, skipped + 1)
+                return
+
+            last_alerts[origin] = (time(), 0)
+        text = traceback.format_exc()
+        if skipped:
+            text += '\n{} similar alerts from {} were skipped'.format(skipped, origin)
+        bot.send_alert(text)
 
 
 def wait_until_received(path):
-    while True:
-        try:
-            data = init_if_empty(db.reference(path).get())
-            break
-        except:
-            continue
-    return data
-
-
-def set_data(path, value):
-    while True:
-        try:
-            db.reference(path).set(value)
-            break
-        except:
-            continue
-
-
-def update_data(path, value):
-    while True:
-        try:
-            db.reference(path).update(value)
-            break
-        except:
-            continue
-
-
-def delete_data(path):
-    while True:
-        try:
-            db.reference(path).delete()
-            break
-        except:
-            continue
+    # Pending writes of this process must be read back. #
+    if write_buffer.has_pending(path):
+        write_buffer.flush()
+
+    return init_if_empty(database.call(get_storage().get, path))
+
+
+# Writes are buffered and coalesced, write_through sends them before returning. #
+def set_data(path, value, write_through=False):
+    write_buffer.add(path, value)
+    if write_through:
+        write_buffer.flush()
+
+
+def update_data(path, value, write_through=False):
+    for key in value:
+        write_buffer.add('{}/{}'.format(path, key), value[key])
+    if write_through:
+        write_buffer.flush()
+
+
+def delete_data(path, write_through=False):
+    write_buffer.add(path, None)
+    if write_through:
+        write_buffer.flush()
+
+
+def flush_data():
+    write_buffer.flush()
 
 
 def set_logger(debug=False):
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from multiprocessing import Event, Process
+from time import sleep, time
+
+import pytest
+from DictObject import DictObject
+
+from polaris.bot import Bot
+from polaris.bulkheads import Bulkheads
+from polaris.transport import ShardedQueue
+from polaris.types import Conversation, Message, User
+
+
+class Snapshots(object):
+    def __init__(self):
+        self.saved = 0
+
+    def save(self):
+        self.saved += 1
+
+
+def get_bot():
+    bot = Bot.__new__(Bot)
+    bot.name = 'bot'
+    bot.config = DictObject(stop_timeout=1)
+    bot.started = True
+    bot.snapshots = Snapshots()
+    bot.stop_requested = Event()
+    bot.stop_watcher = None
+    bot.jobs = [Process(target=sleep, args=(30,), daemon=True)]
+    bot.pid = os.getpid()
+    return bot
+
+
+def test_stop_from_a_job():
+    bot = get_bot()
+    bot.watch_stop()
+    bot.jobs[0].start()
+
+    # /shutdown runs in one of the jobs, that can't join the rest. #
+    job = Process(target=bot.stop)
+    job.start()
+    job.join(5)
+
+    started = time()
+    while not bot.snapshots.saved and time() - started < 5:
+        sleep(0.01)
+
+    assert job.exitcode == 0
+    assert not bot.started
+    assert not bot.jobs[0].is_alive()
+    assert bot.snapshots.saved == 1
+
+
+def test_stop_from_the_parent():
+    bot = get_bot()
+    bot.jobs[0].start()
+    bot.stop()
+
+    assert not bot.started
+    assert not bot.jobs[0].is_alive()
+    assert bot.snapshots.saved == 1
+
+
+class Plugin(object):
+    __module__ = 'polaris.plugins.test'
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.commands = [{'command': '/echo', 'parameters': [{'text': True}]}, {'command': '/fail'}]
+        self.calls = []
+
+    def always(self, m):
+        self.calls.append(('always', m.content))
+
+    def run(self, m):
+        self.calls.append(('run', m.content))
+        if m.content == '/fail':
+            raise ValueError()
+
+
+def get_dispatch_bot():
+    bot = Bot.__new__(Bot)
+    bot.name = 'bot'
+    bot.config = DictObject(prefix='/', owner=1, alerts_conversation_id=-2, admin_conversation_id=-3)
+    bot.info = User(100, 'Bot', None, 'polarisbot', True)
+    bot.tags = {}
+    bot.steps = {}
+    bot.triggers = None
+    bot.routes = None
+    bot.loop = None
+    bot.inbox = ShardedQueue()
+    bot.bulkheads = Bulkheads(bot)
+    bot.sent = []
+    bot.send_message = lambda msg, content, *args, **kwargs: bot.sent.append(content)
+    bot.send_alert = lambda text: None
+    bot.trans = DictObject(errors={'exception_found': 'error'})
+    bot.plugins = [Plugin(bot)]
+    return bot
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_dispatch(mode):
+    bot = get_dispatch_bot()
+    for content in ['/echo hello', 'hello', '/fail']:
+        msg = Message(None, Conversation(2, 'John'), User(2, 'John'), content, date=time())
+        if mode == 'sync':
+            bot.on_message_receive(msg)
+        else:
+            asyncio.run(bot.on_message_receive_async(msg))
+
+    assert bot.plugins[0].calls == [('always', '/echo hello'), ('run', '/echo hello'), ('always', 'hello'),
+                                    ('always', '/fail'), ('run', '/fail')]
+    assert bot.sent == ['error']
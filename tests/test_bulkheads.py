@@ -0,0 +1,35 @@
+import asyncio
+from time import sleep, time
+
+from polaris.bulkheads import Bulkhead
+
+
+def test_waiting_call_starts_when_a_worker_is_free():
+    bulkhead = Bulkhead(None, 'test', workers=1, timeout=5)
+    started = {}
+    ended = {}
+
+    def work(name):
+        started[name] = time()
+        sleep(0.125)
+        ended[name] = time()
+        return name
+
+    async def main():
+        return await asyncio.gather(bulkhead.call_async(None, work, 'first'),
+                                    bulkhead.call_async(None, work, 'second'))
+
+    assert asyncio.run(main()) == ['first', 'second']
+    assert started['second'] - ended['first'] < 0.02
+
+
+def test_waiting_call_times_out():
+    bulkhead = Bulkhead(None, 'test', workers=1, timeout=0.1)
+    bulkhead.slots.acquire()
+
+    async def main():
+        return await bulkhead.acquire_async()
+
+    started = time()
+    assert not asyncio.run(main())
+    assert 0.1 <= time() - started < 0.2
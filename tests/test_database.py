@@ -0,0 +1,166 @@
+import os
+
+import pytest
+
+from polaris import database
+from polaris.database import WriteBuffer, build_tree, flatten
+
+
+class MemoryStorage(object):
+    def __init__(self, remote=False, failures=0):
+        self.remote = remote
+        self.failures = failures
+        self.updates = []
+
+    def update(self, values):
+        if self.failures:
+            self.failures -= 1
+            raise TypeError('Rejected update')
+        self.updates.append(dict(values))
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = MemoryStorage()
+    monkeypatch.setattr(database, 'storage', storage)
+    return storage
+
+
+def test_merge_keeps_last_value():
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1/first_name', 'John')
+    buffer.merge('users/bot/1/first_name', 'Jane')
+
+    assert buffer.pending == {'users/bot/1/first_name': 'Jane'}
+
+
+def test_merge_normalizes_paths():
+    buffer = WriteBuffer()
+    buffer.merge('/users/bot/1/', {'first_name': 'John'})
+
+    assert buffer.pending == {'users/bot/1': {'first_name': 'John'}}
+
+
+def test_merge_into_pending_parent():
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1', {'first_name': 'John', 'last_name': 'Doe'})
+    buffer.merge('users/bot/1/first_name', 'Jane')
+    buffer.merge('users/bot/1/last_name', None)
+
+    assert buffer.pending == {'users/bot/1': {'first_name': 'Jane'}}
+
+
+def test_merge_parent_replaces_children():
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1/first_name', 'John')
+    buffer.merge('users/bot/10/first_name', 'Joe')
+    buffer.merge('users/bot/1', None)
+
+    assert buffer.pending == {'users/bot/1': None, 'users/bot/10/first_name': 'Joe'}
+
+
+def test_merge_does_not_change_written_value():
+    value = {'first_name': 'John'}
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1', value)
+    buffer.merge('users/bot/1/first_name', 'Jane')
+
+    assert value == {'first_name': 'John'}
+
+
+def test_merge_into_pending_list():
+    buffer = WriteBuffer()
+    buffer.merge('tags/bot/1', ['admin', 'trusted', 'muted'])
+    buffer.merge('tags/bot/1/1', 'moderator')
+    buffer.merge('tags/bot/1/3', 'spam')
+    buffer.merge('tags/bot/1/3', None)
+    buffer.merge('tags/bot/2', [{'name': 'john'}])
+    buffer.merge('tags/bot/2/0/name', 'jane')
+
+    assert buffer.pending == {'tags/bot/1': ['admin', 'moderator', 'muted'], 'tags/bot/2': [{'name': 'jane'}]}
+
+
+def test_merge_into_pending_list_by_key():
+    buffer = WriteBuffer()
+    buffer.merge('tags/bot/1', ['admin', 'trusted'])
+    buffer.merge('tags/bot/1/5', 'muted')
+
+    assert buffer.pending == {'tags/bot/1': {'0': 'admin', '1': 'trusted', '5': 'muted'}}
+
+
+def test_has_pending():
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1/first_name', 'John')
+
+    assert buffer.has_pending('users/bot/1')
+    assert buffer.has_pending('users/bot/1/first_name')
+    assert not buffer.has_pending('users/bot/10')
+
+
+def test_flush_sends_one_update(storage):
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1/first_name', 'John')
+    buffer.merge('tags/bot/1', ['trusted'])
+    buffer.flush()
+    buffer.flush()
+
+    assert storage.updates == [{'users/bot/1/first_name': 'John', 'tags/bot/1': ['trusted']}]
+    assert buffer.pending == {}
+
+
+def test_flush_records_changes_in_remote_storage(storage):
+    storage.remote = True
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1/first_name', 'John')
+    buffer.merge('pins/bot', None)
+    buffer.flush()
+
+    update = storage.updates[0]
+    assert update['users/bot/1/first_name'] == 'John'
+    assert update['pins/bot'] is None
+    assert isinstance(update['changes/users/bot/1'], float)
+    assert isinstance(update['changes/pins/bot/*'], float)
+
+
+def test_failed_flush_keeps_newer_writes(storage):
+    storage.failures = 1
+    buffer = WriteBuffer()
+    buffer.merge('users/bot/1', {'first_name': 'John'})
+
+    with pytest.raises(TypeError):
+        buffer.flush()
+    assert buffer.pending == {'users/bot/1': {'first_name': 'John'}}
+
+    buffer.merge('users/bot/1/first_name', 'Jane')
+    buffer.flush()
+    assert storage.updates == [{'users/bot/1': {'first_name': 'Jane'}}]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='Needs fork')
+def test_forked_process_starts_empty(storage):
+    database.write_buffer.merge('users/bot/1/first_name', 'John')
+    read, write = os.pipe()
+    try:
+        # The parent is holding the lock while it forks, the child must not wait for it. #
+        with database.write_buffer.flush_lock:
+            pid = os.fork()
+            if pid == 0:
+                empty = not database.write_buffer.pending and database.write_buffer.flush_lock.acquire(timeout=1)
+                os.write(write, b'1' if empty else b'0')
+                os._exit(0)
+            os.waitpid(pid, 0)
+
+        assert os.read(read, 1) == b'1'
+        assert database.write_buffer.pending == {'users/bot/1/first_name': 'John'}
+    finally:
+        database.write_buffer.pending = {}
+        os.close(read)
+        os.close(write)
+
+
+def test_flatten_and_build_tree():
+    value = {'a': {'b': 1, 'c': [1, 2]}, 'd': None}
+    leaves = sorted(flatten('root', value))
+
+    assert leaves == [('root/a/b', 1), ('root/a/c/0', 1), ('root/a/c/1', 2)]
+    assert build_tree('root', leaves) == {'a': {'b': 1, 'c': [1, 2]}}
@@ -0,0 +1,40 @@
+import os
+from time import time
+
+from polaris.media import MediaCache
+from polaris.utils import get_download_key
+
+
+def test_get_max_age(tmp_path):
+    cache = MediaCache(str(tmp_path))
+    path = cache.store([b'content'], 'key', '.txt')
+
+    assert cache.get('key') == path
+    assert cache.get('key', 60) == path
+    assert cache.get('other', 60) is None
+
+    downloaded = time() - 120
+    os.utime(cache.get_key_path('key'), (downloaded, downloaded))
+
+    assert cache.get('key', 60) is None
+    assert cache.get('key', 300) == path
+    assert cache.get('key') == path
+
+
+def test_download_key_headers():
+    url = 'https://example.com/file'
+    key = get_download_key('get', url, {'q': 'polaris'})
+
+    assert get_download_key('GET', url, {'q': 'polaris'}, {'User-Agent': 'polaris'}) == key
+    assert get_download_key('get', url, {'q': 'polaris'}, {'Authorization': 'a'}) != key
+    assert get_download_key('get', url, {'q': 'polaris'}, {'Authorization': 'a'}) != get_download_key('get', url, {'q': 'polaris'}, {'authorization': 'b'})
+    assert get_download_key('get', url, {'q': 'polaris'}, {'Accept': 'image/png'}) != key
+
+
+def test_invalid_remote_id():
+    assert MediaCache.is_invalid_remote_id('Bad Request: wrong file identifier/HTTP URL specified')
+    assert MediaCache.is_invalid_remote_id('Bad Request: FILE_REFERENCE_EXPIRED')
+    assert MediaCache.is_invalid_remote_id('Wrong remote file identifier specified: can\'t unserialize it')
+    assert not MediaCache.is_invalid_remote_id('Forbidden: bot was blocked by the user')
+    assert not MediaCache.is_invalid_remote_id('Too Many Requests: retry after 5')
+    assert not MediaCache.is_invalid_remote_id(None)
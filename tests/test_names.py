@@ -0,0 +1,80 @@
+from time import time
+
+import pytest
+from DictObject import DictObject
+
+from polaris.names import NameIndex, NameTable
+
+
+class ChangeFeed(object):
+    def __init__(self):
+        self.hooks = []
+
+
+class Bot(object):
+    def __init__(self, users, groups):
+        self.name = 'bot'
+        self.changes = ChangeFeed()
+        self.users = DictObject(users)
+        self.groups = DictObject(groups)
+
+
+@pytest.fixture
+def index():
+    return NameIndex(Bot({
+        '1': {'first_name': 'John', 'last_name': 'Doe', 'username': 'JohnDoe'},
+        '2': {'first_name': 'a.b (c)', 'username': 'dots'},
+        '3': {'first_name': 'a' * 30},
+        '4': {'first_name': 'Zoë'}
+    }, {
+        '-1': {'title': 'Polaris Group', 'username': 'polaris'},
+        '-2': {'title': 'John fans'}
+    }))
+
+
+def test_find_username(index):
+    assert index.find_username('johndoe') == '1'
+    assert index.find_username('POLARIS') == '-1'
+    assert index.find_username('nobody') is None
+
+
+def test_search_groups_before_users(index):
+    assert index.search('john') == '-2'
+    assert index.search('doe') == '1'
+    assert index.search('polaris') == '-1'
+    assert index.search('nobody') is None
+
+
+def test_search_short_and_case_folded_text(index):
+    assert index.search('jo') == '-2'
+    assert index.search('ZOË') == '4'
+
+
+def test_search_is_literal(index):
+    assert index.search('a.b (c)') == '2'
+    assert index.search('b (c') == '2'
+    assert index.search('a.c') is None
+    assert index.search('j.hn') is None
+    assert index.search('^john') is None
+    assert index.search('[') is None
+
+
+@pytest.mark.parametrize('pattern', ['((a+))+$', '(a|aa)+$', '(a+)+b', '(.*a){20}', '(?:a?){30}a{30}'])
+def test_search_hostile_patterns(index, pattern):
+    started = time()
+
+    assert index.search(pattern) is None
+    assert time() - started < 0.1
+
+
+def test_table_updates():
+    table = NameTable('users')
+    table.add('1', {'first_name': 'John', 'username': 'john'})
+    table.add('2', {'first_name': 'Jane'})
+    table.remove('1')
+    table.add('1', {'first_name': 'Joe', 'username': 'joe'})
+
+    assert table.search('john') is None
+    assert table.find_username('john') is None
+    assert table.find_username('joe') == '1'
+    assert table.search('jane') == '2'
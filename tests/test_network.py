@@ -0,0 +1,62 @@
+from polaris.network import ResponseCache, client, get_cache_key
+from polaris.utils import run_coroutine
+
+
+def test_run_coroutine_closes_session():
+    async def request():
+        return await client.get_async_session()
+
+    session = run_coroutine(request())
+
+    assert session.closed
+    assert len(client.async_sessions) == 0
+
+
+def test_run_coroutine_closes_session_on_error():
+    sessions = []
+
+    async def request():
+        sessions.append(await client.get_async_session())
+        raise ValueError()
+
+    try:
+        run_coroutine(request())
+    except ValueError:
+        pass
+
+    assert sessions[0].closed
+
+
+def test_cache_key_parse():
+    assert get_cache_key('GET', 'https://example.com') != get_cache_key('GET', 'https://example.com', parse=False)
+
+
+def test_responses_saved_by_every_process(tmp_path):
+    file = str(tmp_path / 'responses.msgpack')
+    first = ResponseCache(file=file)
+    second = ResponseCache(file=file)
+    first.store('a', 60, {'value': 1})
+    second.store('b', 60, 'text')
+    first.save()
+    second.save()
+
+    loaded = ResponseCache(file=file)
+    loaded.load()
+
+    assert loaded.lookup('a') == ('fresh', {'value': 1})
+    assert loaded.lookup('b') == ('fresh', 'text')
+
+
+def test_responses_keep_the_newest(tmp_path):
+    file = str(tmp_path / 'responses.msgpack')
+    first = ResponseCache(file=file)
+    second = ResponseCache(file=file)
+    first.store('a', 60, 'old')
+    second.store('a', 120, 'new')
+    second.save()
+    first.save()
+
+    loaded = ResponseCache(size=1, file=file)
+    loaded.load()
+
+    assert loaded.lookup('a') == ('fresh', 'new')
@@ -0,0 +1,53 @@
+from DictObject import DictObject
+
+from polaris.routing import RoutingTable
+from polaris.types import Conversation, Message, User
+
+
+class Plugin(object):
+    def __init__(self, subscriptions=None):
+        if subscriptions is not None:
+            self.subscriptions = subscriptions
+
+    def always(self, m):
+        pass
+
+
+class Context(object):
+    def __init__(self, tags):
+        self.tags = tags
+
+    def has_tag(self, target, tag):
+        return tag in self.tags.get(str(target), [])
+
+
+def get_message(type='text', extra=None, tags=None):
+    msg = Message(None, Conversation(-1, 'Group'), User(1, 'John'), 'hello', type, extra=DictObject(extra or {}))
+    msg.context = Context(tags or {})
+    return msg
+
+
+def test_hooks_by_subscription():
+    routes = RoutingTable(None, [
+        Plugin(),
+        Plugin({'types': ['photo']}),
+        Plugin({'types': ['text'], 'tags': ['resend:?']}),
+        Plugin({'types': ['text'], 'urls': True})
+    ])
+
+    assert routes.get_hooks(get_message()) == {0}
+    assert routes.get_hooks(get_message('photo')) == {0, 1}
+    assert routes.get_hooks(get_message(tags={'-1': ['resend:?']})) == {0, 2}
+    assert routes.get_hooks(get_message(extra={'urls': ['https://example.com']})) == {0, 3}
+
+
+def test_hooks_by_any_subscription():
+    routes = RoutingTable(None, [Plugin([
+        {'types': ['text'], 'tags': ['resend:?']},
+        {'types': ['text'], 'extra': ['via_bot_user_id']}
+    ])])
+
+    assert routes.get_hooks(get_message()) == set()
+    assert routes.get_hooks(get_message(tags={'-1': ['resend:?']})) == {0}
+    assert routes.get_hooks(get_message(extra={'via_bot_user_id': 2})) == {0}
+    assert routes.get_hooks(get_message('photo', extra={'via_bot_user_id': 2})) == set()
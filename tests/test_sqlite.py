@@ -0,0 +1,95 @@
+import pytest
+
+from polaris.storage.sqlite import get_upper_bound, storage
+
+
+@pytest.fixture
+def db(tmp_path):
+    return storage(str(tmp_path / 'polaris.sqlite'))
+
+
+def test_get_and_set(db):
+    db.set('users/bot/1', {'first_name': 'John', 'tags': ['a', 'b']})
+
+    assert db.get('users/bot/1') == {'first_name': 'John', 'tags': ['a', 'b']}
+    assert db.get('users/bot/1/first_name') == 'John'
+    assert db.get('users/bot') == {'1': {'first_name': 'John', 'tags': ['a', 'b']}}
+    assert db.get('users/bot/2') is None
+
+
+def test_get_excludes_siblings_with_same_start(db):
+    db.update({'users/bot/1/first_name': 'John', 'users/bot/10/first_name': 'Joe', 'users/bot/1-a': 'x'})
+
+    assert db.get('users/bot/1') == {'first_name': 'John'}
+
+
+def test_get_root(db):
+    db.update({'users/bot/1/first_name': 'John', 'groups/bot/-1/title': 'Group'})
+
+    assert db.get('') == {'users': {'bot': {'1': {'first_name': 'John'}}}, 'groups': {'bot': {'-1': {'title': 'Group'}}}}
+
+
+def test_update_replaces_paths(db):
+    db.set('users/bot/1', {'first_name': 'John', 'last_name': 'Doe'})
+    db.update({'users/bot/1': {'first_name': 'Jane'}, 'users/bot/2/first_name': 'Joe'})
+
+    assert db.get('users/bot') == {'1': {'first_name': 'Jane'}, '2': {'first_name': 'Joe'}}
+
+
+def test_update_replaces_leaf_parent(db):
+    db.set('settings/bot/1', 'value')
+    db.update({'settings/bot/1/language': 'en'})
+
+    assert db.get('settings/bot/1') == {'language': 'en'}
+
+
+def test_delete(db):
+    db.update({'users/bot/1/first_name': 'John', 'users/bot/2/first_name': 'Joe'})
+    db.delete('users/bot/1')
+    db.update({'users/bot/2/first_name': None})
+
+    assert db.get('users/bot/1') is None
+    assert db.get('users/bot') is None
+
+
+def test_query_prefix(db):
+    db.update({
+        'tags/bot/1': ['trusted'],
+        'tags/bot/12': ['muted'],
+        'tags/bot/2': ['spam'],
+        'tags/other/1': ['trusted']
+    })
+
+    assert db.query('tags/bot', '1') == {'1': ['trusted'], '12': ['muted']}
+    assert db.query('tags/bot', '') == {'1': ['trusted'], '12': ['muted'], '2': ['spam']}
+    assert db.query('tags/bot', '3') == {}
+
+
+def test_query_keys_outside_bmp(db):
+    db.update({
+        'users/bot/\U0001F600': {'first_name': 'Smile'},
+        'users/bot/\U0001F600\U0001F600': {'first_name': 'Smiles'},
+        'users/bot/\U0001F601': {'first_name': 'Grin'},
+        'users/bot/\uffff': {'first_name': 'Last'}
+    })
+
+    assert db.query('users/bot', '\U0001F600') == {'\U0001F600': {'first_name': 'Smile'},
+                                                  '\U0001F600\U0001F600': {'first_name': 'Smiles'}}
+    assert len(db.query('users/bot', '')) == 4
+    assert len(db.get('users/bot')) == 4
+    assert len(db.get('')['users']['bot']) == 4
+
+
+def test_since(db):
+    db.update({'changes/users/bot/1': 10, 'changes/users/bot/2': 20})
+
+    assert db.since('changes/users/bot', 15) == {'2': 20}
+
+
+def test_upper_bound():
+    assert get_upper_bound('a/b') == 'a/c'
+    assert get_upper_bound('a/') == 'a0'
+    assert get_upper_bound('a\ud7ff') == 'a\ue000'
+    assert get_upper_bound('a\U0010FFFF') == 'b'
+    assert get_upper_bound('\U0010FFFF') is None
+    assert get_upper_bound('') is None
@@ -0,0 +1,57 @@
+from DictObject import DictObject
+
+from polaris.state import replace_path
+
+
+def test_replace_leaf_in_place():
+    tree = DictObject({'1': {'first_name': 'John'}, '2': {'first_name': 'Joe'}})
+    user = tree['2']
+    result = replace_path(tree, ['1', 'first_name'], 'Jane')
+
+    assert result is tree
+    assert tree['1'].first_name == 'Jane'
+    assert tree['2'] is user
+
+
+def test_replace_creates_parents():
+    tree = DictObject({'1': 'value'})
+    result = replace_path(tree, ['1', 'settings', 'language'], 'en')
+
+    assert result == {'1': {'settings': {'language': 'en'}}}
+    assert type(result['1']) is DictObject
+    assert result['1'].settings.language == 'en'
+
+
+def test_replace_objectifies_value():
+    tree = replace_path(DictObject(), ['1'], {'first_name': 'John', 'tags': [{'name': 'trusted'}]})
+
+    assert type(tree['1']) is DictObject
+    assert tree['1'].first_name == 'John'
+    assert tree['1'].tags[0].name == 'trusted'
+
+
+def test_replace_deletes():
+    tree = DictObject({'1': {'first_name': 'John', 'last_name': 'Doe'}, '2': {}})
+    replace_path(tree, ['1', 'last_name'], None)
+    replace_path(tree, ['2'], None)
+    replace_path(tree, ['3', 'first_name'], None)
+
+    assert tree == {'1': {'first_name': 'John'}}
+
+
+def test_replace_whole_tree():
+    tree = DictObject({'1': {'first_name': 'John'}})
+
+    assert replace_path(tree, [], None) == {}
+    result = replace_path(tree, [], {'2': {'first_name': 'Joe'}})
+    assert result is not tree
+    assert type(result) is DictObject
+    assert result['2'].first_name == 'Joe'
+
+
+def test_replace_in_empty_store():
+    for tree in [None, {}, {'1': 'plain'}]:
+        result = replace_path(tree, ['2', 'first_name'], 'Joe')
+
+        assert type(result) is DictObject
+        assert result['2'].first_name == 'Joe'
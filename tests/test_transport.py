@@ -0,0 +1,111 @@
+from queue import Full
+from threading import Thread
+from time import sleep, time
+
+import pytest
+from DictObject import DictObject
+
+from polaris.transport import RingBuffer, ShardedQueue, pack_message, unpack_message
+from polaris.triggers import TriggerMatch
+from polaris.types import Conversation, Message, User
+
+
+def get_message():
+    sender = User(1, 'John', 'Doe', 'johndoe', False, DictObject(language_code='en'))
+    conversation = Conversation(-100, 'Group', DictObject(type='supergroup'))
+    reply = Message(41, conversation, User(2, 'Jane'), 'previous', date=1000.0)
+    return Message(42, conversation, sender, '/echo hello', date=1001.0, reply=reply,
+                   extra=DictObject(format='HTML', urls=['https://example.com'], entities={'bold': (0, 5)},
+                                    size=(640, 480), user=User(3, 'Joe')))
+
+
+def test_round_trip_keeps_types():
+    msg = get_message()
+    result = unpack_message(pack_message(msg))
+
+    assert type(result) is Message
+    assert (result.id, result.content, result.type, result.date) == (42, '/echo hello', 'text', 1001.0)
+    assert result.context is None
+    assert result.match is None
+
+    assert type(result.sender) is User
+    assert (result.sender.id, result.sender.first_name, result.sender.last_name, result.sender.username) == (1, 'John', 'Doe', 'johndoe')
+    assert type(result.sender.extra) is DictObject
+    assert result.sender.extra.language_code == 'en'
+
+    assert type(result.conversation) is Conversation
+    assert (result.conversation.id, result.conversation.title) == (-100, 'Group')
+    assert result.conversation.extra.type == 'supergroup'
+
+    assert type(result.reply) is Message
+    assert (result.reply.id, result.reply.content, result.reply.sender.first_name) == (41, 'previous', 'Jane')
+
+
+def test_round_trip_keeps_extra():
+    result = unpack_message(pack_message(get_message()))
+
+    assert type(result.extra) is DictObject
+    assert result.extra.format == 'HTML'
+    assert result.extra.urls == ['https://example.com']
+    assert type(result.extra.entities) is DictObject
+    assert result.extra.entities.bold == (0, 5)
+    assert result.extra.size == (640, 480)
+    assert type(result.extra.user) is User
+    assert result.extra.user.first_name == 'Joe'
+
+
+def test_round_trip_keeps_plain_containers():
+    msg = Message(1, Conversation(1), User(1), 'text', date=0.0,
+                  extra={'plain': {'nested': [1, 2]}, 'pair': (1, (2, 3)), 'raw': b'\x00\x01', 'set': {1, 2}})
+    result = unpack_message(pack_message(msg))
+
+    assert type(result.extra) is dict
+    assert type(result.extra['plain']) is dict
+    assert result.extra['plain'] == {'nested': [1, 2]}
+    assert result.extra['pair'] == (1, (2, 3))
+    assert result.extra['raw'] == b'\x00\x01'
+    assert result.extra['set'] == {1, 2}
+
+
+def test_round_trip_keeps_match():
+    msg = get_message()
+    msg.match = TriggerMatch('echo', 0, '^/echo (.*)$', 'hello', None)
+    result = unpack_message(pack_message(msg))
+
+    assert type(result.match) is TriggerMatch
+    assert (result.match.plugin, result.match.index, result.match.input) == ('echo', 0, 'hello')
+
+
+@pytest.mark.parametrize('transport', ['pickle', 'msgpack', 'shared_memory'])
+def test_priority_keeps_conversation_order(transport):
+    queue = ShardedQueue(priority=lambda msg: msg.content.startswith('/'), transport=transport, buffer_size=65536)
+    group = Conversation(-1, 'Group')
+    other = Conversation(-2, 'Other')
+    for content, conversation in [('hello', group), ('/ping', group), ('/ping', other), ('bye', other)]:
+        queue.put(Message(None, conversation, User(1, 'John'), content, date=time()))
+
+    received = [(msg.conversation.id, msg.content) for msg in [queue.get() for _ in range(4)]]
+
+    assert received == [(-2, '/ping'), (-1, 'hello'), (-1, '/ping'), (-2, 'bye')]
+
+    queue.put(Message(None, group, User(1, 'John'), 'later', date=time()))
+    queue.put(Message(None, group, User(1, 'John'), '/start', date=time()))
+    assert queue.get().content == 'later'
+    assert queue.get().content == '/start'
+
+    queue.put(Message(None, group, User(1, 'John'), 'again', date=time()))
+    queue.put(Message(None, other, User(1, 'John'), '/start', date=time()))
+    assert queue.get().content == '/start'
+
+
+def test_ring_buffer_waits_for_room():
+    buffer = RingBuffer(64)
+    buffer.put(b'x' * 40)
+    with pytest.raises(Full):
+        buffer.put(b'y' * 40, timeout=0.05)
+
+    Thread(target=lambda: (sleep(0.1), buffer.get()), daemon=True).start()
+    buffer.put(b'y' * 40, timeout=5)
+
+    assert buffer.get() == b'y' * 40
+    buffer.close()
@@ -0,0 +1,154 @@
+import re
+
+import pytest
+from DictObject import DictObject
+
+from polaris.triggers import TriggerIndex
+
+
+# Plugins are named by their module, like the ones loaded from polaris/plugins. #
+class Plugin(object):
+    __module__ = 'polaris.plugins.test'
+
+    def __init__(self, commands):
+        self.commands = commands
+
+
+class Bot(object):
+    def __init__(self, prefix):
+        self.config = DictObject(prefix=prefix)
+        self.info = DictObject(username='polarisbot')
+
+
+class Message(object):
+    def __init__(self, content, type='text', reply=None):
+        self.content = content
+        self.type = type
+        self.reply = reply
+
+
+PLUGINS = [
+    [{'command': '/start'}, {'command': '/help', 'parameters': [{'topic': False}]}, {'command': '/config'}],
+    [{'command': '/echo', 'parameters': [{'text': True}], 'shortcut': '/e'}],
+    [{'command': '/ping'}, {'friendly': 'ping$'}, {'friendly': '^hello'}],
+    [{'command': '/pin', 'keep_default': True}, {'command': '/pinned', 'parameters': [{'text': False}]}],
+    [{'command': '/(?:tr|translate)', 'parameters': [{'text': True}], 'friendly': 'translate (.*)'}],
+    [{'command': '/(a)\\1'}, {'command': '/[', 'friendly': '['}],
+    [{'command': 'hey', 'parameters': [{'text': True}]}, {'shortcut': 1}]
+]
+
+CONTENTS = ['/start', '/START', '/start now', 'hi /start', '/help', '/help echo', '/config', '/echo', '/echo hello',
+            '/e hello world', '/ec', 'ping', '/ping', 'say ping', 'hello there', 'Hello', '/pin', '/pin it', '/pinned',
+            '/pinned note', '/tr en hola', '/translate', 'translate this', '/aa', '/a', 'hey you', 'hey', '#echo hi',
+            '#ping', '!pin', '.e x', 'echo', 'help', 'e hello', '/', '  ', 'xx/start']
+
+
+# The triggers as check_trigger built them before they were indexed. #
+def baseline_trigger(bot, command, parameters, message, friendly=False, keep_default=False):
+    command = command.lower()
+    if ((command == '/start' and '/start' in message.content) or
+            (command == '/help' and '/help' in message.content) or
+            (command == '/config' and '/config' in message.content)):
+        return command.replace('/', '^/')
+
+    if message.type == 'inline_query':
+        trigger = command.replace('/', '^')
+    elif keep_default:
+        trigger = command.replace('/', '^/')
+    else:
+        trigger = command.replace('/', '^' + bot.config.prefix)
+
+    if not friendly:
+        if not parameters and trigger.startswith('^'):
+            trigger += '$'
+        elif parameters and ' ' not in message.content:
+            trigger += '$'
+        elif parameters and ' ' in message.content:
+            trigger += ' '
+    return trigger
+
+
+def baseline_match(bot, commands, message, friendly):
+    variants = []
+    for command in commands:
+        parameters = command.get('parameters')
+        if 'command' in command:
+            variants.append((command['command'], parameters, False, False))
+            if command.get('keep_default'):
+                variants.append((command['command'], parameters, False, True))
+        if 'friendly' in command and friendly:
+            variants.append((command['friendly'], parameters, True, False))
+        if 'shortcut' in command:
+            variants.append((command['shortcut'], parameters, False, False))
+            if command.get('keep_default'):
+                variants.append((command['shortcut'], parameters, False, True))
+
+    for text, parameters, is_friendly, keep_default in variants:
+        if not isinstance(text, str):
+            continue
+        trigger = baseline_trigger(bot, text, parameters, message, is_friendly, keep_default)
+        try:
+            if not re.compile(trigger, flags=re.IGNORECASE).search(message.content):
+                continue
+        except re.error:
+            continue
+
+        input = None
+        input_reply = None
+        input_match = re.compile(trigger + '(.+)$', flags=re.IGNORECASE).search(message.content)
+        if input_match and input_match.group(1):
+            input = input_match.group(1)
+        if message.reply and message.reply.content:
+            input_match = re.compile(trigger + '(.+)$', flags=re.IGNORECASE).search(
+                str(message.content) + ' ' + str(message.reply.content))
+            if input_match and input_match.group(1):
+                input_reply = input_match.group(1)
+        elif input:
+            input_reply = input
+        return trigger, input, input_reply
+    return None
+
+
+def index_match(index, plugin, message, friendly):
+    for trigger in index.get_candidates(message, friendly).get(plugin, []):
+        match = trigger.search(message)
+        if match:
+            return match.trigger, match.input, match.input_reply
+    return None
+
+
+@pytest.mark.parametrize('prefix', ['/', '#', '!', '.'])
+@pytest.mark.parametrize('type', ['text', 'inline_query'])
+@pytest.mark.parametrize('friendly', [True, False])
+@pytest.mark.parametrize('reply', [None, 'replied text'])
+def test_index_matches_baseline(prefix, type, friendly, reply):
+    bot = Bot(prefix)
+    plugins = [Plugin([dict(command) for command in commands]) for commands in PLUGINS]
+    index = TriggerIndex(bot, plugins)
+
+    for content in CONTENTS:
+        message = Message(content, type, Message(reply) if reply else None)
+        for position, plugin in enumerate(plugins):
+            assert index_match(index, position, message, friendly) == baseline_match(bot, plugin.commands, message, friendly), (content, position)
+
+
+def test_literal_commands_are_keyed():
+    bot = Bot('/')
+    index = TriggerIndex(bot, [Plugin([dict(command) for command in commands]) for commands in PLUGINS])
+
+    assert [trigger.command for trigger in index.keyed['echo']] == ['/echo']
+    assert 'start' not in index.keyed
+    assert index.get_candidates(Message('/echo hello')).get(2) is None
+    assert '/(a)\\1' in [trigger.command for trigger in index.unfiltered]
+
+
+def test_stale_index():
+    bot = Bot('/')
+    plugins = [Plugin([{'command': '/echo'}])]
+    index = TriggerIndex(bot, plugins)
+
+    assert not index.is_stale(plugins)
+    plugins[0].commands = plugins[0].commands + [{'command': '/ping'}]
+    assert index.is_stale(plugins)
+    bot.config.prefix = '#'
+    assert index.is_stale(plugins)